@@ -1,26 +1,94 @@
-from fastapi import FastAPI, HTTPException, File, UploadFile, Form
+from fastapi import FastAPI, HTTPException, File, UploadFile, Form, Request, Query, Response
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel, Field, validator
-from typing import Optional, List, Dict, Any, Literal
-from astronomist_agents.johannes_kepler_agent import create_agent, Runner
-from astronomist_agents.grace_hopper_agent import analyze_exoplanet_with_grace_hopper, ExoplanetCharacteristics
+from typing import Optional, List, Dict, Any, Literal, get_args
+import asyncio
+import importlib
 import json
 import os
 import logging
 import numpy as np
 import pandas as pd
-from classifiers.exoplanet_classifier import load_model, _feature_engineering, LABEL_MAP, INV_LABEL_MAP
+from dotenv import load_dotenv
+from classifiers.inference import OUTPUT_COLS
+from serving.agent_cache import AgentAnswerCache, agent_version
+from serving.agent_stream import collect_run, sse_response, sse_cached_response, MEDIA_TYPE as SSE_MEDIA_TYPE
+from serving.batching import MicroBatcher
+from serving.executor import InferenceExecutor, ExecutorBusy
+from serving.metrics import REGISTRY, MetricsMiddleware, CONTENT_TYPE as METRICS_CONTENT_TYPE
+from serving.responses import ORJSONResponse
+from serving.model_registry import ModelRegistry, UnknownModel
+from serving.result_cache import PredictionCache
+from serving.columnar import read_columns, write_columns, detect_format as columnar_format, FORMATS as COLUMNAR_FORMATS
+from serving.streaming import stream_predictions, spool, detect_format, BodyStreamingResponse, FORMATS
 
 # ---------------- Config ----------------
-MODEL_PATH = "models\exoplanet_grace_hopper.pkl"
+load_dotenv()
+# Sous-systèmes servis : "ml" (modèle chargé au démarrage) et/ou "agents" (framework agents et
+# astroquery importés à la première requête, si OPENAI_API_KEY et PERPLEXITY_API_KEY sont définies)
+API_SUBSYSTEMS = {s.strip() for s in os.getenv("API_SUBSYSTEMS", "ml,agents").split(",") if s.strip()}
+AGENT_KEYS = ("OPENAI_API_KEY", "PERPLEXITY_API_KEY")
+AGENT_MODULES = {"kepler": "astronomist_agents.johannes_kepler_agent",
+                 "grace_hopper": "astronomist_agents.grace_hopper_agent"}
+# Registre des modèles : bundles / artefacts de MODEL_DIR, chargés à la première utilisation ;
+# MODEL_PATH est le modèle par défaut (chemin, ou nom d'un modèle de MODEL_DIR)
+MODEL_DIR = os.getenv("MODEL_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "models"))
+MODEL_PATH = os.getenv("MODEL_PATH", os.path.join(MODEL_DIR, "exoplanet_grace_hopper.pkl"))
+# Plafond (Mo) des modèles chargés : au-delà, les modèles inactifs hors défaut sont déchargés (0 = illimité)
+MODEL_MEMORY_CAP_MB = float(os.getenv("MODEL_MEMORY_CAP_MB", "0"))
+# Routes /analyze/stream : commentaire SSE envoyé après ce délai sans événement (appels d'outils longs)
+AGENT_SSE_HEARTBEAT_S = float(os.getenv("AGENT_SSE_HEARTBEAT_S", "15"))
+# Cache des réponses Kepler / bibliographie (par planète, question et version de l'agent) ; 0 = désactivé
+AGENT_CACHE_SIZE = int(os.getenv("AGENT_CACHE_SIZE", "512"))
+AGENT_CACHE_TTL_S = float(os.getenv("AGENT_CACHE_TTL_S", "3600"))
 APP_TITLE = "Astronomist AI Agents & ML API"
 APP_VERSION = "1.0.0"
+# Micro-batching de /predict : taille max d'un lot et attente max (ms) après la première requête
+PREDICT_MAX_BATCH_SIZE = int(os.getenv("PREDICT_MAX_BATCH_SIZE", "64"))
+PREDICT_MAX_WAIT_MS = float(os.getenv("PREDICT_MAX_WAIT_MS", "5"))
+# /predict/stream : lignes scorées par bloc (borne la mémoire par requête)
+PREDICT_STREAM_CHUNK_ROWS = int(os.getenv("PREDICT_STREAM_CHUNK_ROWS", "10000"))
+# Cache LRU des prédictions /predict et /predict/batch (nombre de lignes ; 0 = désactivé)
+PREDICT_CACHE_SIZE = int(os.getenv("PREDICT_CACHE_SIZE", "100000"))
+# Exécuteur d'inférence : "thread" (dans le processus API) ou "process" (pool de workers, modèle
+# chargé une fois par worker) ; au plus WORKERS * QUEUE_DEPTH lots en cours au total (limite globale,
+# pas une file par worker), les suivants attendent une place jusqu'à QUEUE_TIMEOUT_S secondes avant
+# un 503 (0 = 503 immédiat)
+INFERENCE_MODE = os.getenv("INFERENCE_MODE", "thread")
+INFERENCE_WORKERS = int(os.getenv("INFERENCE_WORKERS", "2"))
+INFERENCE_QUEUE_DEPTH = int(os.getenv("INFERENCE_QUEUE_DEPTH", "4"))
+INFERENCE_QUEUE_TIMEOUT_S = float(os.getenv("INFERENCE_QUEUE_TIMEOUT_S", "30"))
 
 logger = logging.getLogger("uvicorn.error")
 
 # ---------------- Schémas ML ----------------
 MissionLiteral = Literal["KEPLER", "K2", "TESS"]
 
+# Contrôles d'ExoplanetInput, partagés avec /predict/stream et /predict/columnar. Unités : (condition,
+# message) dans l'ordre, la première vérifiée l'emporte ; les conditions valent pour un scalaire comme
+# pour un tableau float64 (NaN = valeur manquante, jamais refusée).
+MISSIONS = get_args(MissionLiteral)
+_MISSION_ERROR = f"`mission` doit être l'une de {', '.join(MISSIONS)}."
+_UNIT_CHECKS = {
+    "duration": [(lambda v: v < 0, "`duration` doit être >= 0 (heures)."),
+                 (lambda v: (v > 0) & (v < 0.05),  # ~ <3 minutes
+                  "`duration` attend des heures (si minutes, divise par 60).")],
+    "depth": [(lambda v: v <= 0, "`depth` doit être > 0 (ppm)."),
+              (lambda v: v < 1, "`depth` attend des ppm (pas une fraction/%).")],
+}
+
+def _unit_error(field, v):
+    for check, msg in _UNIT_CHECKS[field]:
+        if check(v):
+            return msg
+    return None
+
+def _duration_error(v):
+    return _unit_error("duration", v)
+
+def _depth_error(v):
+    return _unit_error("depth", v)
+
 class ExoplanetInput(BaseModel):
     mission: Optional[MissionLiteral] = Field(None, description="Mission d'origine (KEPLER/K2/TESS)")
     period: Optional[float] = Field(None, description="Période orbitale (jours)")
@@ -40,24 +108,44 @@ class ExoplanetInput(BaseModel):
 
     @validator("duration")
     def _validate_duration_hours(cls, v):
-        if v is None:
-            return v
-        if v < 0:
-            raise ValueError("`duration` doit être >= 0 (heures).")
-        if 0 < v < 0.05:  # ~ <3 minutes
-            raise ValueError("`duration` attend des heures (si minutes, divise par 60).")
+        if v is not None and _duration_error(v):
+            raise ValueError(_duration_error(v))
         return v
 
     @validator("depth")
     def _validate_depth_ppm(cls, v):
-        if v is None:
-            return v
-        if v <= 0:
-            raise ValueError("`depth` doit être > 0 (ppm).")
-        if v < 1:
-            raise ValueError("`depth` attend des ppm (pas une fraction/%).")
+        if v is not None and _depth_error(v):
+            raise ValueError(_depth_error(v))
         return v
 
+INPUT_COLUMNS = list(ExoplanetInput.__fields__)
+
+def input_row_errors(data) -> list:
+    """
+    Contrôles d'ExoplanetInput appliqués colonne par colonne à un bloc (DataFrame de /predict/stream
+    ou dict colonne → tableau de /predict/columnar) : message d'erreur ou None par ligne. Valeurs
+    manquantes acceptées ; un champ numérique illisible (NaN) est traité comme manquant.
+    """
+    n = len(data) if isinstance(data, pd.DataFrame) else len(next(iter(data.values()), ()))
+    found = []  # par champ contrôlé : message ou None par ligne
+    if "mission" in data:
+        mission = pd.Series(data["mission"], copy=False)
+        found.append(np.where((mission.notna() & ~mission.isin(MISSIONS)).to_numpy(), _MISSION_ERROR, None))
+    for field, checks in _UNIT_CHECKS.items():
+        if field not in data:
+            continue
+        v = pd.to_numeric(pd.Series(data[field], copy=False), errors="coerce").to_numpy(np.float64, na_value=np.nan)
+        msg = np.full(n, None, dtype=object)
+        with np.errstate(invalid="ignore"):
+            for check, text in checks:
+                msg[check(v) & pd.isna(msg)] = text
+        found.append(msg)
+    errors = [None] * n
+    if found:
+        for i in np.flatnonzero(np.logical_or.reduce([m.astype(bool) for m in found])):
+            errors[i] = " ".join(m[i] for m in found if m[i])
+    return errors
+
 class PredictResponse(BaseModel):
     pred_label: str
     p_FALSE_POSITIVE: float
@@ -89,7 +177,7 @@ class GraceHopperResponse(BaseModel):
     error: Optional[str] = None
     tools_used: Optional[List[str]] = None
 
-app = FastAPI(title=APP_TITLE, version=APP_VERSION)
+app = FastAPI(title=APP_TITLE, version=APP_VERSION, default_response_class=ORJSONResponse)
 
 # Autoriser le front Next.js à accéder à l'API (CORS)
 app.add_middleware(
@@ -99,228 +187,207 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+# Nombre et latence des requêtes par route, exposés sur /metrics
+app.add_middleware(MetricsMiddleware)
 
-# Variables globales pour le modèle ML
-_model = None
-_all_num_cols: List[str] = []
-_cat_cols: List[str] = []
-_label_map = {}
+# Registre des modèles ML (créé au démarrage)
+_registry: Optional[ModelRegistry] = None
 
 @app.on_event("startup")
 def _load_model_on_startup():
-    global _model, _all_num_cols, _cat_cols, _label_map
+    global _registry
+    if "ml" not in API_SUBSYSTEMS:
+        logger.info("ML routes disabled (API_SUBSYSTEMS=%s)", ",".join(sorted(API_SUBSYSTEMS)))
+        return
     try:
-        _model, _all_num_cols, _cat_cols, _label_map = load_model(MODEL_PATH)
-        logger.info("Model loaded from %s", MODEL_PATH)
+        # en mode process, les modèles ne sont chargés que dans les workers
+        _registry = ModelRegistry(MODEL_DIR, default=MODEL_PATH,
+                                  memory_cap_bytes=int(MODEL_MEMORY_CAP_MB * 2**20) or None,
+                                  load=INFERENCE_MODE != "process")
+        default = _registry.get()
+        _executor.start(default["path"], default["version"])
+        logger.info("Model %s loaded from %s (inference: %s, models: %s)",
+                    default["name"], default["path"], INFERENCE_MODE, _registry.names())
     except Exception as e:
         logger.exception("Could not load model: %s", e)
         raise
 
 # ---------------- Utils ML ----------------
-RESPONSE_COLUMNS = [
-    "pred_label",
-    "p_FALSE_POSITIVE",
-    "p_CANDIDATE",
-    "p_CONFIRMED",
-]
-
-def predict_from_df(model, all_num_cols, cat_cols, df_new: pd.DataFrame) -> pd.DataFrame:
-    """
-    Transforme un DataFrame de nouvelles exoplanètes et renvoie les prédictions
-    + probabilités dans un DataFrame enrichi.
-
-    Colonnes de sortie :
-    - pred_label
-    - p_FALSE_POSITIVE
-    - p_CANDIDATE
-    - p_CONFIRMED
-    """
-    # 1) Feature engineering de base
-    dfX = _feature_engineering(df_new.copy())
-
-    # 2) Colonnes attendues = celles vues à l'entraînement
-    expected = list(getattr(model, "feature_names_in_", [])) or list(all_num_cols) + list(cat_cols)
-
-    # 3) Encodage mission si le modèle attend des dummies mission_*
-    if "mission" in dfX.columns and any(c.startswith("mission_") for c in expected):
-        m = dfX.pop("mission").astype(str).str.upper().fillna("UNKNOWN")
-        dummies = pd.get_dummies(m, prefix="mission")
-        dfX = pd.concat([dfX, dummies], axis=1)
-
-    # 4) Ajouter colonnes manquantes avec 0
-    for c in expected:
-        if c not in dfX.columns:
-            dfX[c] = 0
-
-    # 5) Conserver l'ordre attendu
-    X = dfX[expected]
-
-    # 6) Nettoyer NaN / inf
-    X = X.replace([np.inf, -np.inf], np.nan).fillna(0)
-
-    # 7) Inférence
-    proba = model.predict_proba(X)
-    y = model.predict(X)  # garder tel quel, peut être int ou str
-
-    # Helper pour normaliser les noms de classes
-    def norm(x: str) -> str:
-        return str(x).upper().replace("_", " ").strip()
-
-    # Classes vues par le modèle
-    classes = list(getattr(model, "classes_", []))
-    cls_to_idx = {norm(c): i for i, c in enumerate(classes)} if classes else {}
-
-    # 8) Construire la colonne pred_label
-    y_labels = []
-    for yi in y:
-        if isinstance(yi, str):
-            y_labels.append(norm(yi))
-        else:
-            # yi est un entier → mapper si possible
-            if 'INV_LABEL_MAP' in globals() and yi in INV_LABEL_MAP:
-                y_labels.append(norm(INV_LABEL_MAP[yi]))
-            else:
-                y_labels.append(str(yi))
-
-    out = df_new.copy()
-    out["pred_label"] = y_labels
-
-    # 9) Colonnes de probas demandées
-    wanted = ["FALSE POSITIVE", "CANDIDATE", "CONFIRMED"]
-
-    # fallback : utiliser LABEL_MAP si pas de classes_
-    if not cls_to_idx and 'LABEL_MAP' in globals():
-        cls_to_idx = {norm(k): v for k, v in LABEL_MAP.items()}
-
-    for w in wanted:
-        col = f"p_{w.replace(' ', '_')}"
-        if w in cls_to_idx:
-            out[col] = proba[:, cls_to_idx[w]]
-        else:
-            out[col] = 0.0
-
-    return out
-
-def _predict_df(df: pd.DataFrame) -> pd.DataFrame:
-    if _model is None:
-        raise RuntimeError("Model not loaded")
-    return predict_from_df(_model, _all_num_cols, _cat_cols, df)
+RESPONSE_COLUMNS = OUTPUT_COLS
+
+def _ml() -> ModelRegistry:
+    """Registre des modèles ; 503 si les routes ML sont désactivées ou le modèle pas encore chargé."""
+    if _registry is None:
+        detail = "ML routes disabled" if "ml" not in API_SUBSYSTEMS else "Model not loaded"
+        raise HTTPException(status_code=503, detail=detail)
+    return _registry
+
+_executor = InferenceExecutor(INFERENCE_MODE, workers=INFERENCE_WORKERS, queue_depth=INFERENCE_QUEUE_DEPTH,
+                              queue_timeout=INFERENCE_QUEUE_TIMEOUT_S)
+
+async def _predict(entry: dict, data) -> dict:
+    """Colonnes de prédiction (RESPONSE_COLUMNS → tableaux) pour les lignes de `data`
+    (DataFrame ou dict colonne → tableau) avec le modèle `entry` du registre, calculées par l'exécuteur d'inférence."""
+    return await _executor.predict(entry, data)
+
+async def _predict_waiting(entry: dict, data) -> dict:
+    """Comme _predict, mais attend sans limite qu'une place se libère dans l'exécuteur (flux volumineux)."""
+    return await _executor.predict(entry, data, wait=True)
+
+# Par modèle : cache des prédictions (vidé quand sa version change) et micro-batcher de /predict
+_lanes: Dict[str, dict] = {}
+
+def _lane(name: str) -> dict:
+    lane = _lanes.get(name)
+    if lane is None:
+        cache = PredictionCache(INPUT_COLUMNS, max_entries=PREDICT_CACHE_SIZE)
+
+        async def predict_batch(df: pd.DataFrame) -> dict:
+            async with _registry.use(name) as entry:
+                return await _predict_cached(entry, df)
+
+        batcher = MicroBatcher(predict_batch, max_batch_size=PREDICT_MAX_BATCH_SIZE, max_wait_ms=PREDICT_MAX_WAIT_MS,
+                               name=name)
+        lane = _lanes.setdefault(name, {"cache": cache, "batcher": batcher})
+    return lane
+
+async def _predict_cached(entry: dict, df: pd.DataFrame) -> dict:
+    """Comme _predict, en ne calculant que les lignes absentes du cache de cette version du modèle."""
+    cache = _lane(entry["name"])["cache"]
+    cache.bind(entry["version"])
+    return await cache.apredict(df, lambda missing: _predict(entry, missing))
+
+def _unknown_model(e: UnknownModel) -> HTTPException:
+    return HTTPException(status_code=404, detail=f"Unknown model {e.args[0]!r}; available: {_registry.names()}")
+
+@app.on_event("shutdown")
+async def _stop_batcher():
+    for lane in list(_lanes.values()):
+        await lane["batcher"].stop()
+    _executor.shutdown()
 
 @app.get("/")
 async def root():
     return {"message": "Astronomist AI Agents & ML API", "status": "active"}
 
+# ---------------- Agents (chargés à la première requête) ----------------
+_agent_modules: Dict[str, Any] = {}
+_agent_versions: Dict[str, str] = {}
+_answer_cache = AgentAnswerCache(max_entries=AGENT_CACHE_SIZE, ttl_seconds=AGENT_CACHE_TTL_S)
+
+def _agents_disabled() -> Optional[str]:
+    """Raison de la désactivation des routes agents, None si elles sont disponibles."""
+    if "agents" not in API_SUBSYSTEMS:
+        return "Agent routes disabled"
+    missing = [k for k in AGENT_KEYS if not os.getenv(k)]
+    if missing:
+        return f"Agent routes disabled: {', '.join(missing)} not set"
+    return None
+
+async def _agent(name: str):
+    """Module de l'agent `name` (AGENT_MODULES), importé une fois hors de la boucle asyncio ; 503 si désactivé."""
+    reason = _agents_disabled()
+    if reason:
+        raise HTTPException(status_code=503, detail=reason)
+    module = _agent_modules.get(name)
+    if module is None:
+        try:
+            module = await asyncio.to_thread(importlib.import_module, AGENT_MODULES[name])
+        except ImportError as e:  # framework agents absent (image ML seule)
+            logger.warning("Agent %s unavailable: %s", name, e)
+            raise HTTPException(status_code=503, detail=f"Agent routes unavailable: {e}")
+        _agent_versions[name] = await asyncio.to_thread(agent_version, module)
+        _agent_modules[name] = module
+    return module
+
+def _agent_health(agent: str) -> dict:
+    reason = _agents_disabled()
+    return {"status": "disabled" if reason else "healthy", "agent": agent, "version": "1.0.0",
+            **({"reason": reason} if reason else {})}
+
+# Réponse complète en JSON (/analyze) ou au fil de l'eau en Server-Sent Events (/analyze/stream)
+SSE_RESPONSES = {200: {"content": {SSE_MEDIA_TYPE: {}},
+                       "description": "Événements delta, tool_call puis done (ou error)"}}
+
+def _kepler_query(request: ExoplanetQuery) -> str:
+    return request.query or f"Give me a synthetic sheet for exoplanet {request.planet_name} (key parameters, host star, discoveries & references)."
+
+def _bibliographic_query(request: ExoplanetQuery) -> str:
+    return f"Conduct a comprehensive bibliographic research on: {request.planet_name}. Focus on recent scientific literature, key discoveries, and research methodologies."
+
+def _run_kepler(kepler, query: str):
+    """Run streamé de l'agent Kepler sur une seule question."""
+    return kepler.Runner.run_streamed(kepler.create_agent(), [{"role": "user", "content": query}])
+
+def _answer_key(endpoint: str, request: ExoplanetQuery, query: Optional[str]) -> tuple:
+    return _answer_cache.key(endpoint, request.planet_name, query, _agent_versions.get("kepler", ""))
+
+async def _kepler_answer(kepler, key: tuple, query: str) -> AgentResponse:
+    """Réponse en cache, celle du run identique en cours, ou celle d'un nouveau run."""
+    try:
+        answer = await _answer_cache.get_or_run(key, lambda: collect_run(lambda: _run_kepler(kepler, query)))
+        return AgentResponse(success=True, result=answer["result"], tools_used=answer["tools_used"])
+    except Exception as e:
+        return AgentResponse(success=False, error=str(e))
+
+def _kepler_stream(kepler, key: tuple, query: str):
+    """Réponse en cache rejouée, sinon run en direct mis en cache à sa fin (sans coalescence)."""
+    answer = _answer_cache.lookup(key)
+    if answer is not None:
+        return sse_cached_response(answer)
+    return sse_response(lambda: _run_kepler(kepler, query), heartbeat=AGENT_SSE_HEARTBEAT_S,
+                        on_done=lambda answer: _answer_cache.put(key, answer))
+
 @app.post("/kepler/analyze", response_model=AgentResponse)
 async def analyze_exoplanet(request: ExoplanetQuery):
     """
     Analyze an exoplanet using the Johannes Kepler AI agent
     """
-    try:
-        planet_name = request.planet_name
-        custom_query = request.query or f"Give me a synthetic sheet for exoplanet {planet_name} (key parameters, host star, discoveries & references)."
-        
-        # Create the agent
-        agent = create_agent()
-        chat_history = []
-        
-        # Add the query to history
-        chat_history.append({"role": "user", "content": custom_query})
-        
-        # Run the agent
-        result = Runner.run_streamed(agent, chat_history)
-        response_content = ""
-        tools_used = []
-        
-        async for event in result.stream_events():
-            if event.type == "raw_response_event":
-                data_type = getattr(event.data, "type", None)
-                if hasattr(event.data, "delta"):
-                    if data_type == "response.output_text.delta":
-                        response_content += event.data.delta
-                        
-            elif event.type == "run_item_stream_event":
-                item = event.item
-                if item.type == "tool_call_item":
-                    tool_name = getattr(item.raw_item, "name", "Tool")
-                    if tool_name not in tools_used:
-                        tools_used.append(tool_name)
-        
-        return AgentResponse(
-            success=True,
-            result=response_content,
-            tools_used=tools_used
-        )
-        
-    except Exception as e:
-        return AgentResponse(
-            success=False,
-            error=str(e)
-        )
+    kepler = await _agent("kepler")
+    return await _kepler_answer(kepler, _answer_key("kepler", request, request.query), _kepler_query(request))
+
+@app.post("/kepler/analyze/stream", responses=SSE_RESPONSES)
+async def analyze_exoplanet_stream(request: ExoplanetQuery):
+    """
+    Same as /kepler/analyze, streamed as Server-Sent Events while the agent runs
+    """
+    kepler = await _agent("kepler")
+    return _kepler_stream(kepler, _answer_key("kepler", request, request.query), _kepler_query(request))
 
 @app.post("/bibliographic/analyze", response_model=AgentResponse)
 async def analyze_bibliographic_research(request: ExoplanetQuery):
     """
     Conduct bibliographic research using the Kepler agent
     """
-    try:
-        # Format the query for bibliographic research
-        bibliographic_query = f"Conduct a comprehensive bibliographic research on: {request.planet_name}. Focus on recent scientific literature, key discoveries, and research methodologies."
-        
-        # Create the agent
-        agent = create_agent()
-        chat_history = []
-        
-        # Add the query to history
-        chat_history.append({"role": "user", "content": bibliographic_query})
-        
-        # Run the agent
-        result = Runner.run_streamed(agent, chat_history)
-        response_content = ""
-        tools_used = []
-        
-        async for event in result.stream_events():
-            if event.type == "raw_response_event":
-                data_type = getattr(event.data, "type", None)
-                if hasattr(event.data, "delta"):
-                    if data_type == "response.output_text.delta":
-                        response_content += event.data.delta
-                        
-            elif event.type == "run_item_stream_event":
-                item = event.item
-                if item.type == "tool_call_item":
-                    tool_name = getattr(item.raw_item, "name", "Tool")
-                    if tool_name not in tools_used:
-                        tools_used.append(tool_name)
-        
-        return AgentResponse(
-            success=True,
-            result=response_content,
-            tools_used=tools_used
-        )
-        
-    except Exception as e:
-        return AgentResponse(
-            success=False,
-            error=str(e)
-        )
+    kepler = await _agent("kepler")
+    return await _kepler_answer(kepler, _answer_key("bibliographic", request, None), _bibliographic_query(request))
+
+@app.post("/bibliographic/analyze/stream", responses=SSE_RESPONSES)
+async def analyze_bibliographic_research_stream(request: ExoplanetQuery):
+    """
+    Same as /bibliographic/analyze, streamed as Server-Sent Events while the agent runs
+    """
+    kepler = await _agent("kepler")
+    return _kepler_stream(kepler, _answer_key("bibliographic", request, None), _bibliographic_query(request))
 
 @app.post("/grace-hopper/analyze", response_model=GraceHopperResponse)
 async def analyze_with_grace_hopper(request: GraceHopperRequest):
     """
     Analyze an exoplanet using the Grace Hopper AI agent
     """
+    grace_hopper = await _agent("grace_hopper")
     try:
         print("🚀 GRACE HOPPER API REQUEST RECEIVED:")
         print("📋 Raw request.characteristics:", request.characteristics)
         print("📝 Raw request.query:", request.query)
         
         # Convert the characteristics dict to ExoplanetCharacteristics model
-        characteristics = ExoplanetCharacteristics(**request.characteristics)
+        characteristics = grace_hopper.ExoplanetCharacteristics(**request.characteristics)
         
         print("✅ Converted characteristics:", characteristics.dict())
         
         # Analyze with Grace Hopper
-        result = await analyze_exoplanet_with_grace_hopper(characteristics, request.query)
+        result = await grace_hopper.analyze_exoplanet_with_grace_hopper(characteristics, request.query)
         
         return GraceHopperResponse(
             success=result["success"],
@@ -335,6 +402,19 @@ async def analyze_with_grace_hopper(request: GraceHopperRequest):
             error=str(e)
         )
 
+@app.post("/grace-hopper/analyze/stream", responses=SSE_RESPONSES)
+async def analyze_with_grace_hopper_stream(request: GraceHopperRequest):
+    """
+    Same as /grace-hopper/analyze, streamed as Server-Sent Events while the agent runs
+    """
+    grace_hopper = await _agent("grace_hopper")
+
+    def start():
+        characteristics = grace_hopper.ExoplanetCharacteristics(**request.characteristics)
+        return grace_hopper.run_grace_hopper_streamed(characteristics, request.query)
+
+    return sse_response(start, heartbeat=AGENT_SSE_HEARTBEAT_S)
+
 @app.post("/grace-hopper/analyze-with-files", response_model=GraceHopperResponse)
 async def analyze_with_files(
     characteristics: str = Form(...),
@@ -344,10 +424,11 @@ async def analyze_with_files(
     """
     Analyze an exoplanet with Grace Hopper including uploaded files
     """
+    grace_hopper = await _agent("grace_hopper")
     try:
         # Parse characteristics JSON
         char_dict = json.loads(characteristics)
-        characteristics_obj = ExoplanetCharacteristics(**char_dict)
+        characteristics_obj = grace_hopper.ExoplanetCharacteristics(**char_dict)
         
         # Prepare analysis query with file information
         query = "Please provide a comprehensive analysis of this exoplanet"
@@ -359,7 +440,7 @@ async def analyze_with_files(
         
         # For now, we'll analyze without processing the files
         # In a full implementation, you would process the files here
-        result = await analyze_exoplanet_with_grace_hopper(characteristics_obj, query)
+        result = await grace_hopper.analyze_exoplanet_with_grace_hopper(characteristics_obj, query)
         
         return GraceHopperResponse(
             success=result["success"],
@@ -379,56 +460,188 @@ async def health_check():
     """
     Health check endpoint
     """
-    return {"status": "healthy", "agent": "Johannes Kepler", "version": "1.0.0"}
+    return _agent_health("Johannes Kepler")
+
+@app.get("/agents/cache")
+def agent_cache_stats():
+    """
+    Agent answer cache: entries, hit rate and coalesced requests, in total and per route
+    """
+    return _answer_cache.stats()
 
 @app.get("/grace-hopper/health")
 async def grace_hopper_health_check():
     """
     Grace Hopper health check endpoint
     """
-    return {
-        "status": "healthy", 
-        "agent": "Grace Hopper", 
-        "version": "1.0.0"
-    }
+    return _agent_health("Grace Hopper")
 
 # ---------------- Routes ML ----------------
+MODEL_QUERY = Query(None, description="Nom du modèle (défaut : le modèle par défaut du registre, voir /model)")
+
 @app.get("/health")
 def health():
-    return {"status": "ok", "model_path": MODEL_PATH, "version": APP_VERSION}
+    default = _registry.resolve() if _registry is not None else {}
+    return {"status": "ok", "model": default.get("name"), "model_path": default.get("path"), "version": APP_VERSION,
+            "subsystems": sorted(API_SUBSYSTEMS)}
+
+@app.get("/metrics")
+def metrics():
+    """Métriques Prometheus : requêtes par route, étapes de l'inférence, taille des lots, outils des agents."""
+    return Response(REGISTRY.render(), media_type=METRICS_CONTENT_TYPE)
 
 @app.get("/model")
 def model_info():
-    return {"num_cols": _all_num_cols, "cat_cols": _cat_cols, "label_map": _label_map}
+    """Modèle par défaut (colonnes, labels) et, pour chaque modèle du registre : version, chargement, taille, requêtes."""
+    registry = _ml()
+    default = registry.resolve()
+    return {"num_cols": default["all_num_cols"], "cat_cols": default["cat_cols"], "label_map": default["label_map"],
+            **registry.stats()}
+
+@app.post("/model/default")
+async def set_default_model(name: str = Query(..., description="Nom du modèle à servir par défaut")):
+    """Bascule atomique du modèle par défaut (chargé avant la bascule ; les requêtes en cours terminent avec l'ancien)."""
+    registry = _ml()
+    try:
+        await asyncio.to_thread(registry.set_default, name)
+    except UnknownModel as e:
+        raise _unknown_model(e)
+    return {"default": name}
+
+@app.post("/model/refresh")
+async def refresh_models():
+    """Relit MODEL_DIR : modèles ajoutés, redéployés (rechargés à la prochaine requête) ou retirés."""
+    changes = await asyncio.to_thread(_ml().refresh)
+    for name in changes["removed"]:
+        lane = _lanes.pop(name, None)
+        if lane is not None:
+            await lane["batcher"].stop()
+    return changes
 
 @app.post("/predict", response_model=PredictResponse)
-def predict_one(item: ExoplanetInput):
+async def predict_one(item: ExoplanetInput, model: Optional[str] = MODEL_QUERY):
+    registry = _ml()
     try:
-        df = pd.DataFrame([item.dict(exclude_none=True)])
-        pred = _predict_df(df)
-        result = pred.iloc[0][RESPONSE_COLUMNS].to_dict()
-        return PredictResponse(**result)
+        async with registry.use(model) as entry:
+            # regroupée avec les requêtes concurrentes sur le même modèle en un seul appel
+            return PredictResponse(**await _lane(entry["name"])["batcher"].submit(item.dict(exclude_none=True)))
+    except UnknownModel as e:
+        raise _unknown_model(e)
     except ValueError as ve:
         raise HTTPException(status_code=400, detail=str(ve))
+    except ExecutorBusy as eb:
+        raise HTTPException(status_code=503, detail=str(eb), headers={"Retry-After": "1"})
     except Exception as e:
         logger.exception("Prediction error: %s", e)
         raise HTTPException(status_code=500, detail="Internal prediction error")
 
+@app.get("/predict/stats")
+def predict_stats():
+    """Histogrammes du micro-batching (taille des lots, attente en file, durée du calcul en ms) et compteurs
+    du cache du modèle par défaut (détail par modèle sous "models"), compteurs de l'exécuteur."""
+    lanes = {name: {**lane["batcher"].stats(), "cache": lane["cache"].stats()} for name, lane in list(_lanes.items())}
+    default = _registry.stats()["default"] if _registry is not None else None
+    return {**lanes.get(default, {}), "models": lanes, "executor": _executor.stats()}
+
 @app.post("/predict/batch", response_model=BatchPredictResponse)
-def predict_batch(items: List[ExoplanetInput]):
+async def predict_batch(items: List[ExoplanetInput], model: Optional[str] = MODEL_QUERY):
     if not items:
         raise HTTPException(status_code=400, detail="Empty payload")
+    registry = _ml()
     try:
-        df = pd.DataFrame([it.dict(exclude_none=True) for it in items])
-        pred = _predict_df(df)
-        results = [PredictResponse(**row[RESPONSE_COLUMNS].to_dict()) for _, row in pred.iterrows()]
-        return BatchPredictResponse(results=results)
+        df = await asyncio.to_thread(lambda: pd.DataFrame([it.dict(exclude_none=True) for it in items]))
+        async with registry.use(model) as entry:
+            pred = await _predict_cached(entry, df)
+        # sérialisé directement depuis les colonnes (un PredictResponse par ligne coûte plus que le modèle)
+        columns = [pred[c].tolist() for c in RESPONSE_COLUMNS]
+        return ORJSONResponse({"results": [dict(zip(RESPONSE_COLUMNS, row)) for row in zip(*columns)]})
+    except UnknownModel as e:
+        raise _unknown_model(e)
     except ValueError as ve:
         raise HTTPException(status_code=400, detail=str(ve))
+    except ExecutorBusy as eb:
+        raise HTTPException(status_code=503, detail=str(eb), headers={"Retry-After": "1"})
     except Exception as e:
         logger.exception("Batch prediction error: %s", e)
         raise HTTPException(status_code=500, detail="Internal prediction error")
 
+@app.post("/predict/columnar")
+async def predict_columnar(
+    request: Request,
+    output: Optional[Literal["arrow", "npz"]] = Query(None, alias="format", description="Format de sortie (défaut : celui de l'entrée)"),
+    model: Optional[str] = MODEL_QUERY,
+):
+    """
+    Scoring binaire en colonnes : corps Arrow IPC (application/vnd.apache.arrow.stream) ou .npz
+    (application/x-npz) de colonnes nommées comme ExoplanetInput ; réponse dans le même format
+    avec pred_label et les probabilités. Les contrôles de /predict (mission, unités de
+    duration/depth) s'appliquent en bloc : si des lignes les échouent, rien n'est scoré et la
+    réponse 400 liste leurs indices (`rows`) et leurs messages (`errors`).
+    """
+    registry = _ml()
+    in_format = columnar_format(request.headers.get("content-type"))
+    if in_format is None:
+        raise HTTPException(status_code=415, detail=f"Content-Type must be one of {sorted(COLUMNAR_FORMATS.values())}")
+    out_format = output or in_format
+    body = await request.body()
+    try:
+        data = await asyncio.to_thread(read_columns, body, in_format, INPUT_COLUMNS)
+        errors = input_row_errors(data)
+        invalid = [i for i, e in enumerate(errors) if e]
+        if invalid:
+            raise HTTPException(status_code=400, detail={"message": f"{len(invalid)} row(s) failing input checks",
+                                                         "rows": invalid, "errors": [errors[i] for i in invalid]})
+        async with registry.use(model) as entry:
+            pred = await _predict(entry, data)
+        content = await asyncio.to_thread(write_columns, pred, out_format)
+    except HTTPException:
+        raise
+    except UnknownModel as e:
+        raise _unknown_model(e)
+    except ValueError as ve:
+        raise HTTPException(status_code=400, detail=str(ve))
+    except ExecutorBusy as eb:
+        raise HTTPException(status_code=503, detail=str(eb), headers={"Retry-After": "1"})
+    except Exception as e:
+        logger.exception("Columnar prediction error: %s", e)
+        raise HTTPException(status_code=500, detail="Internal prediction error")
+    return Response(content, media_type=COLUMNAR_FORMATS[out_format])
+
+@app.post("/predict/stream")
+async def predict_stream(
+    request: Request,
+    output: Optional[Literal["ndjson", "csv"]] = Query(None, alias="format", description="Format de sortie (défaut : celui de l'entrée)"),
+    keep: Optional[str] = Query(None, description="Colonnes d'entrée recopiées dans la sortie, séparées par des virgules"),
+    model: Optional[str] = MODEL_QUERY,
+):
+    """
+    Prédiction en flux d'un corps NDJSON (application/x-ndjson) ou CSV (text/csv), par blocs de
+    PREDICT_STREAM_CHUNK_ROWS lignes, à mémoire bornée. Chaque ligne de sortie porte sa position
+    `row` dans l'upload, les colonnes `keep`, les prédictions et un éventuel `error` ; une ligne
+    refusée par les contrôles de /predict (mission, unités de duration/depth) n'est pas scorée.
+    """
+    registry = _ml()
+    try:
+        name = registry.resolve(model)["name"]  # modèle inconnu : 404 avant le début du flux
+    except UnknownModel as e:
+        raise _unknown_model(e)
+    in_format = detect_format(request.headers.get("content-type"))
+    out_format = output or in_format
+    keep_cols = [c.strip() for c in (keep or "").split(",") if c.strip()]
+
+    async def body():
+        # le modèle reste celui du début du flux, même si le défaut change entre-temps
+        async with registry.use(name) as entry:
+            async def predict(df):
+                return await _predict_waiting(entry, df)
+
+            async for chunk in stream_predictions(request.stream(), predict, INPUT_COLUMNS, in_format=in_format,
+                                                  out_format=out_format, chunk_rows=PREDICT_STREAM_CHUNK_ROWS,
+                                                  keep=keep_cols, validate_fn=input_row_errors):
+                yield chunk
+
+    return BodyStreamingResponse(spool(body()), media_type=FORMATS[out_format])
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
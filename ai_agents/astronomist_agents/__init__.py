@@ -1,19 +1,37 @@
 # Astronomist Agents Package
-# 
+#
 # This package contains specialized AI agents for exoplanet analysis:
 # - Johannes Kepler Agent: Comprehensive exoplanet analysis using NASA archives
 # - Grace Hopper Agent: Advanced research with ML classification capabilities
+#
+# Les re-exports sont résolus au premier accès (__getattr__) : importer le package, ou un seul de
+# ses agents, ne charge pas l'autre ni le framework d'agents.
 
-from .grace_hopper_agent import (
-    create_grace_hopper_agent,
-    analyze_exoplanet_with_grace_hopper,
-    ExoplanetCharacteristics,
-    MLPrediction
-)
+from importlib import import_module
 
-from .johannes_kepler_agent import (
-    create_agent as create_johannes_kepler_agent
-)
+# nom exporté → (module, attribut)
+_EXPORTS = {
+    "create_grace_hopper_agent": (".grace_hopper_agent", "create_grace_hopper_agent"),
+    "analyze_exoplanet_with_grace_hopper": (".grace_hopper_agent", "analyze_exoplanet_with_grace_hopper"),
+    "ExoplanetCharacteristics": (".grace_hopper_agent", "ExoplanetCharacteristics"),
+    "MLPrediction": (".grace_hopper_agent", "MLPrediction"),
+    "create_johannes_kepler_agent": (".johannes_kepler_agent", "create_agent"),
+}
+
+__all__ = list(_EXPORTS)
 
 __version__ = "1.0.0"
 __author__ = "Astronomist Team"
+
+
+def __getattr__(name):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    module, attr = _EXPORTS[name]
+    value = getattr(import_module(module, __name__), attr)
+    globals()[name] = value  # accès suivants sans passer par __getattr__
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
@@ -16,6 +16,14 @@ from agents import (
     set_tracing_disabled,
 )
 
+# Réduction des événements du run (partagée avec les routes SSE de l'API)
+if __name__ == "__main__":
+    # permet `python astronomist_agents/grace_hopper_agent.py` (imports serving.*)
+    import sys
+    from pathlib import Path
+    sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from serving.agent_stream import collect
+
 # ----------------------------
 # Chargement des variables d'environnement
 # ----------------------------
@@ -143,41 +151,36 @@ def create_grace_hopper_agent() -> Agent:
 # API Integration Functions
 # ----------------------------
 
-async def analyze_exoplanet_with_grace_hopper(characteristics: ExoplanetCharacteristics, query: str = None):
+def build_analysis_query(characteristics: ExoplanetCharacteristics, query: str = None) -> str:
     """
-    Analyze an exoplanet using the Grace Hopper AI agent
+    Build the Grace Hopper analysis prompt from the characteristics, the ML prediction and the user query
     """
-    try:
-        # Create the agent
-        agent = create_grace_hopper_agent()
-        chat_history = []
-        
-        # Prepare the analysis query
-        char_dict = characteristics.dict(exclude_none=True)
-        
-        print(f"🔬 GRACE HOPPER AGENT - Raw Characteristics (TOTAL KEYS: {len(char_dict.keys())}):")
-        if not char_dict:
-            print("❌ PROBLEM: char_dict is EMPTY!")
-            print(f"🔬 Raw characteristics object: {characteristics}")
-            print(f"🔬 characteristics.dict(): {characteristics.dict()}")
-            print(f"🔬 characteristics.dict(exclude_none=True): {characteristics.dict(exclude_none=True)}")
-        else:
-            for key, value in char_dict.items():
-                print(f"  {key}: {value} (type: {type(value)})")
-        
-        # Extract ML prediction if available
-        ml_prediction = char_dict.pop('ml_prediction', None)
-        
-        print(f"🔬 After ML extraction, remaining characteristics:")
+    # Prepare the analysis query
+    char_dict = characteristics.dict(exclude_none=True)
+    
+    print(f"🔬 GRACE HOPPER AGENT - Raw Characteristics (TOTAL KEYS: {len(char_dict.keys())}):")
+    if not char_dict:
+        print("❌ PROBLEM: char_dict is EMPTY!")
+        print(f"🔬 Raw characteristics object: {characteristics}")
+        print(f"🔬 characteristics.dict(): {characteristics.dict()}")
+        print(f"🔬 characteristics.dict(exclude_none=True): {characteristics.dict(exclude_none=True)}")
+    else:
         for key, value in char_dict.items():
-            print(f"  {key}: {value}")
-        
-        print(f"🔬 ML Prediction: {ml_prediction}")
-        
-        if query:
-            # Enhance query with ML prediction if available
-            if ml_prediction:
-                ml_context = f"""
+            print(f"  {key}: {value} (type: {type(value)})")
+    
+    # Extract ML prediction if available
+    ml_prediction = char_dict.pop('ml_prediction', None)
+    
+    print(f"🔬 After ML extraction, remaining characteristics:")
+    for key, value in char_dict.items():
+        print(f"  {key}: {value}")
+    
+    print(f"🔬 ML Prediction: {ml_prediction}")
+    
+    if query:
+        # Enhance query with ML prediction if available
+        if ml_prediction:
+            ml_context = f"""
 📊 MACHINE LEARNING CLASSIFICATION:
 - Predicted Status: {ml_prediction['pred_label']}
 - Confidence Scores:
@@ -199,14 +202,14 @@ async def analyze_exoplanet_with_grace_hopper(characteristics: ExoplanetCharacte
 - Magnitude: {char_dict.get('mag', 'Not provided')} mag
 
 🎯 ANALYSIS REQUEST: Analyze these observational characteristics for physical plausibility, then compare with ML classification for consistency evaluation."""
-                analysis_query = ml_context
-            else:
-                enhanced_query = f"{query}\n\n📊 Observational Data:\n{json.dumps(char_dict, indent=2)}\n\n🎯 ANALYSIS REQUEST: Analyze these observational characteristics for physical plausibility and exoplanet indicators."
-                analysis_query = enhanced_query
+            analysis_query = ml_context
         else:
-            # Default query - Simple and direct
-            if ml_prediction:
-                analysis_query = f"""📊 EXOPLANET VALIDATION ANALYSIS
+            enhanced_query = f"{query}\n\n📊 Observational Data:\n{json.dumps(char_dict, indent=2)}\n\n🎯 ANALYSIS REQUEST: Analyze these observational characteristics for physical plausibility and exoplanet indicators."
+            analysis_query = enhanced_query
+    else:
+        # Default query - Simple and direct
+        if ml_prediction:
+            analysis_query = f"""📊 EXOPLANET VALIDATION ANALYSIS
 
 🤖 ML CLASSIFICATION: {ml_prediction['pred_label']} ({max(ml_prediction['p_CONFIRMED'], ml_prediction['p_CANDIDATE'], ml_prediction['p_FALSE_POSITIVE'])*100:.1f}% confidence)
 
@@ -224,8 +227,8 @@ async def analyze_exoplanet_with_grace_hopper(characteristics: ExoplanetCharacte
 - Magnitude: {char_dict.get('mag', 'Not provided')} mag
 
 🎯 TASK: Analyze observational characteristics for physical plausibility first, then compare with ML classification for consistency evaluation."""
-            else:
-                analysis_query = f"""📊 EXOPLANET ANALYSIS
+        else:
+            analysis_query = f"""📊 EXOPLANET ANALYSIS
 
 📊 OBSERVATIONAL DATA:
 {json.dumps(char_dict, indent=2)}
@@ -241,33 +244,27 @@ async def analyze_exoplanet_with_grace_hopper(characteristics: ExoplanetCharacte
 - Magnitude: {char_dict.get('mag', 'Not provided')} mag
 
 🎯 TASK: Analyze these observational characteristics for physical plausibility and exoplanet indicators."""
-        
-        # Add the query to history
-        chat_history.append({"role": "user", "content": analysis_query})
-        
-        # Run the agent
-        result = Runner.run_streamed(agent, chat_history)
-        response_content = ""
-        tools_used = []
-        
-        async for event in result.stream_events():
-            if event.type == "raw_response_event":
-                data_type = getattr(event.data, "type", None)
-                if hasattr(event.data, "delta"):
-                    if data_type == "response.output_text.delta":
-                        response_content += event.data.delta
-                        
-            elif event.type == "run_item_stream_event":
-                item = event.item
-                if item.type == "tool_call_item":
-                    tool_name = getattr(item.raw_item, "name", "Tool")
-                    if tool_name not in tools_used:
-                        tools_used.append(tool_name)
-        
+    
+    return analysis_query
+
+def run_grace_hopper_streamed(characteristics: ExoplanetCharacteristics, query: str = None):
+    """
+    Start a Grace Hopper run and return its streamed result (events via stream_events())
+    """
+    agent = create_grace_hopper_agent()
+    chat_history = [{"role": "user", "content": build_analysis_query(characteristics, query)}]
+    return Runner.run_streamed(agent, chat_history)
+
+async def analyze_exoplanet_with_grace_hopper(characteristics: ExoplanetCharacteristics, query: str = None):
+    """
+    Analyze an exoplanet using the Grace Hopper AI agent
+    """
+    try:
+        answer = await collect(run_grace_hopper_streamed(characteristics, query))
         return {
             "success": True,
-            "result": response_content,
-            "tools_used": tools_used
+            "result": answer["result"],
+            "tools_used": answer["tools_used"]
         }
         
     except Exception as e:
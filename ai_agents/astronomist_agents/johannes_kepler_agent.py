@@ -20,6 +20,14 @@ from agents import (
 # Astroquery imports
 from astroquery.ipac.nexsci.nasa_exoplanet_archive import NasaExoplanetArchive
 
+# Métriques (latence et erreurs par outil, exposées sur /metrics)
+if __name__ == "__main__":
+    # permet `python astronomist_agents/johannes_kepler_agent.py` (imports serving.*)
+    import sys
+    from pathlib import Path
+    sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from serving.metrics import timed_tool
+
 # ----------------------------
 # Chargement des variables d'environnement
 # ----------------------------
@@ -45,6 +53,7 @@ class ScientificArticle(BaseModel):
     source: Optional[str]
 
 @function_tool
+@timed_tool()
 def open_science_database_research(query: str, n: int = 10) -> List[ScientificArticle]:
     """Recherche sur arXiv uniquement. Retourne les résultats sous forme de liste d’objets."""
     articles = []
@@ -79,6 +88,7 @@ def open_science_database_research(query: str, n: int = 10) -> List[ScientificAr
     return articles
 
 @function_tool
+@timed_tool(is_error=lambda r: r.startswith(("Error:", "Astrophysics Research API Error:", "Unexpected error")))
 async def sonar_intelligence_research(query: str, model: str = "sonar") -> str:
     """
     Conduct comprehensive scientific literature research on an exoplanet or a star using Perplexity AI.
@@ -177,6 +187,7 @@ async def sonar_intelligence_research(query: str, model: str = "sonar") -> str:
 # ----------------------------
 
 @function_tool
+@timed_tool(is_error=lambda r: not r["success"] and r["message"].startswith("Error"))
 def astroquery_exoplanet_lookup(planet_name: str) -> Dict:
     """
     Query exoplanet data using astroquery NasaExoplanetArchive.
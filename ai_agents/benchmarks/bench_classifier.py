@@ -0,0 +1,202 @@
+# bench_classifier.py
+# Benchmarks du pipeline classifieur sur catalogues synthétiques (classifiers.synthetic), sans réseau.
+#
+# Étapes chronométrées à chaque taille : harmonize_koi / harmonize_k2 / harmonize_toi,
+# _feature_engineering, un fold de CV (StratifiedGroupKFold par étoile), train_final_model_and_save,
+# load_model (pickle et artefact mmap) et predict_from_df. Les résultats sont écrits en JSON ;
+# --compare affiche le ratio de temps par étape face à un résultat précédent.
+#
+# Usage (depuis ai_agents/) :
+#   python benchmarks/bench_classifier.py --sizes 10000,100000
+#   python benchmarks/bench_classifier.py --compare benchmarks/results/bench_<date>.json
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import numpy as np
+import pandas as pd
+
+from classifiers.exoplanet_classifier import (
+    harmonize_koi, harmonize_k2, harmonize_toi, _feature_engineering,
+    train_final_model_and_save, load_model, predict_from_df, HGB_PARAMS,
+)
+from classifiers.synthetic import synthetic_catalogs
+
+DEFAULT_SIZES = [10_000, 100_000, 1_000_000, 10_000_000]
+STAGES = ["harmonize_koi", "harmonize_k2", "harmonize_toi", "feature_engineering", "cv_fold",
+          "train_final", "load_model_pickle", "load_model_artifact", "predict_from_df",
+          "predict_from_df_artifact"]
+
+
+def _peak_rss_mb():
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / 1024 ** 2 if sys.platform == "darwin" else rss / 1024
+
+
+def _git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"],
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def environment() -> dict:
+    import sklearn
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "sklearn": sklearn.__version__,
+        "git_commit": _git_commit(),
+    }
+
+
+def _timed(fn, repeat: int):
+    """(meilleur temps, résultat du dernier appel) sur `repeat` exécutions."""
+    best, out = None, None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        out = fn()
+        dt = time.perf_counter() - t0
+        best = dt if best is None else min(best, dt)
+    return best, out
+
+
+def _cv_fold(harm: pd.DataFrame):
+    from sklearn.ensemble import HistGradientBoostingClassifier
+    from classifiers.design_matrix import get_design_matrix
+    from classifiers.evaluation import plan_jobs, _init_worker, _run_job
+
+    dm = get_design_matrix(harm)
+    job = next(j for j in plan_jobs(dm.y, dm.groups_star, dm.mission) if j["kind"] == "cv")
+    _init_worker({"dm": dm, "clf": HistGradientBoostingClassifier(**HGB_PARAMS)}, os.cpu_count() or 1)
+    return _run_job(job)
+
+
+def run_size(n_rows: int, stages: list, repeat: int, workdir: str, seed: int = 0) -> list:
+    results = []
+
+    def record(stage, seconds, rows, **extra):
+        results.append({"n_rows": n_rows, "stage": stage, "seconds": seconds, "rows": rows,
+                        "rows_per_second": rows / seconds if seconds else None,
+                        "peak_rss_mb": _peak_rss_mb(), **extra})
+        print(f"  {stage:<26} {seconds:10.3f}s  ({rows} rows)")
+
+    t0 = time.perf_counter()
+    cats = synthetic_catalogs(n_rows, seed=seed)
+    print(f"[{n_rows} rows] synthetic catalogs generated in {time.perf_counter() - t0:.1f}s")
+
+    parts = {}
+    for name, fn in (("koi", harmonize_koi), ("k2", harmonize_k2), ("toi", harmonize_toi)):
+        seconds, parts[name] = _timed(lambda: fn(cats[name]), repeat)
+        if f"harmonize_{name}" in stages:
+            record(f"harmonize_{name}", seconds, len(cats[name]))
+    del cats
+    harm = pd.concat(parts.values(), ignore_index=True)
+    del parts
+
+    if "feature_engineering" in stages:
+        seconds, _ = _timed(lambda: _feature_engineering(harm), repeat)
+        record("feature_engineering", seconds, len(harm))
+
+    if "cv_fold" in stages:
+        seconds, res = _timed(lambda: _cv_fold(harm), repeat)
+        record("cv_fold", seconds, res["n_train"] + res["n_test"], fit_seconds=res["fit_seconds"],
+               n_iter=res["n_iter"], f1_macro=res["f1_macro"])
+
+    need_model = any(s in stages for s in STAGES[5:])
+    if not need_model:
+        return results
+
+    model_dir = os.path.join(workdir, f"n{n_rows}")
+    seconds, model_path = _timed(lambda: train_final_model_and_save(harm, model_dir=model_dir), 1)
+    if "train_final" in stages:
+        record("train_final", seconds, len(harm), bytes=os.path.getsize(model_path))
+
+    from classifiers.artifact import convert_bundle
+    artifact_dir = convert_bundle(model_path)
+
+    seconds, model = _timed(lambda: load_model(model_path), repeat)
+    if "load_model_pickle" in stages:
+        record("load_model_pickle", seconds, 1)
+    seconds, artifact = _timed(lambda: load_model(artifact_dir), repeat)
+    if "load_model_artifact" in stages:
+        record("load_model_artifact", seconds, 1)
+
+    if "predict_from_df" in stages:
+        seconds, _ = _timed(lambda: predict_from_df(model[0], model[1], model[2], harm), repeat)
+        record("predict_from_df", seconds, len(harm))
+    if "predict_from_df_artifact" in stages:
+        seconds, _ = _timed(lambda: predict_from_df(artifact[0], artifact[1], artifact[2], harm), repeat)
+        record("predict_from_df_artifact", seconds, len(harm))
+    return results
+
+
+def compare(previous: dict, current: dict):
+    """Ratio temps courant / temps précédent par (taille, étape) ; > 1 = plus lent."""
+    prev = {(r["n_rows"], r["stage"]): r["seconds"] for r in previous["results"]}
+    print(f"\nComparison with {previous.get('environment', {}).get('git_commit')} "
+          f"({previous.get('created_at')}):")
+    for r in current["results"]:
+        old = prev.get((r["n_rows"], r["stage"]))
+        if old:
+            ratio = r["seconds"] / old
+            flag = "  <-- slower" if ratio > 1.1 else ""
+            print(f"  {r['n_rows']:>10} {r['stage']:<26} {old:9.3f}s -> {r['seconds']:9.3f}s "
+                  f"x{ratio:.2f}{flag}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the exoplanet classifier pipeline on synthetic catalogs.")
+    parser.add_argument("--sizes", default=",".join(map(str, DEFAULT_SIZES)),
+                        help="Comma-separated total row counts (KOI + K2 + TOI)")
+    parser.add_argument("--stages", default=",".join(STAGES), help="Comma-separated subset of stages")
+    parser.add_argument("--repeat", type=int, default=1, help="Repetitions per stage (best time kept)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", default=None, help="Output JSON (default: benchmarks/results/bench_<UTC>.json)")
+    parser.add_argument("--compare", default=None, metavar="RESULT_JSON",
+                        help="Previous result file to compare against")
+    args = parser.parse_args()
+
+    stages = [s for s in args.stages.split(",") if s]
+    unknown = set(stages) - set(STAGES)
+    if unknown:
+        parser.error(f"unknown stages: {sorted(unknown)}")
+
+    created_at = datetime.now(timezone.utc)
+    report = {"created_at": created_at.isoformat(), "environment": environment(),
+              "params": {"sizes": [int(s) for s in args.sizes.split(",")], "stages": stages,
+                         "repeat": args.repeat, "seed": args.seed, "hgb_params": HGB_PARAMS},
+              "results": []}
+
+    with tempfile.TemporaryDirectory(prefix="bench_models_") as workdir:
+        for n in report["params"]["sizes"]:
+            report["results"].extend(run_size(n, stages, args.repeat, workdir, seed=args.seed))
+
+    out = args.out or str(Path(__file__).resolve().parent / "results"
+                          / f"bench_{created_at.strftime('%Y%m%dT%H%M%SZ')}.json")
+    os.makedirs(os.path.dirname(out), exist_ok=True)
+    with open(out, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nBenchmark results saved to: {out}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            compare(json.load(f), report)
@@ -0,0 +1,247 @@
+# bench_load.py
+# Générateur de charge hors ligne pour les routes ML (/predict, /predict/batch).
+#
+# `--concurrency` clients en boucle fermée envoient pendant `--duration` secondes des requêtes tirées
+# selon `--mix` (poids par route), avec des lots de `--batch-sizes` lignes pour /predict/batch.
+# Les lignes sont des ExoplanetInput synthétiques (classifiers.synthetic), tirées d'un pool de
+# `--pool` lignes distinctes : un petit pool mesure surtout le cache des prédictions.
+# Cibles : l'application FastAPI dans le processus (httpx.ASGITransport, sans socket), un serveur
+# uvicorn lancé sur un port local (`--target socket`), ou un serveur existant (`--url`). Sans
+# `--model`, un petit modèle est entraîné sur catalogues synthétiques : aucun accès réseau.
+# Le rapport JSON donne par route et au total : débit (requêtes et lignes/s), latences p50/p95/p99/max
+# (ms), erreurs par statut ; plus /predict/stats du serveur en fin de test.
+#
+# Usage (depuis ai_agents/) :
+#   python benchmarks/bench_load.py --concurrency 32 --duration 20
+#   python benchmarks/bench_load.py --target socket --mix predict=1,batch=1 --batch-sizes 10,100,1000
+#   python benchmarks/bench_load.py --url http://localhost:8000 --model-name exoplanet_hgb
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parents[1]
+ROUTES = {"predict": "/predict", "batch": "/predict/batch"}
+INPUT_FIELDS = ["mission", "period", "duration", "depth", "snr", "st_teff", "st_logg", "st_rad", "mag",
+                "fpflag_nt", "fpflag_ss", "fpflag_co", "fpflag_ec"]
+
+
+def parse_mix(text: str) -> dict:
+    """"predict=0.8,batch=0.2" → {"predict": 0.8, "batch": 0.2} (poids relatifs)."""
+    mix = {}
+    for part in filter(None, (p.strip() for p in text.split(","))):
+        name, _, weight = part.partition("=")
+        if name not in ROUTES:
+            raise ValueError(f"unknown route {name!r}; expected one of {sorted(ROUTES)}")
+        mix[name] = float(weight or 1)
+    if not mix or sum(mix.values()) <= 0:
+        raise ValueError("mix needs at least one route with a positive weight")
+    return mix
+
+
+def synthetic_rows(n: int, seed: int = 0) -> list:
+    """`n` dicts ExoplanetInput valides (champs manquants omis), issus des catalogues synthétiques."""
+    import pandas as pd
+    from classifiers.exoplanet_classifier import harmonize_koi, harmonize_k2, harmonize_toi
+    from classifiers.synthetic import synthetic_catalogs
+
+    cats = synthetic_catalogs(int(n * 1.3) + 100, seed=seed)
+    harm = pd.concat([harmonize_koi(cats["koi"]), harmonize_k2(cats["k2"]), harmonize_toi(cats["toi"])],
+                     ignore_index=True)
+    harm = harm[[c for c in INPUT_FIELDS if c in harm.columns]]
+    # contraintes des validateurs d'ExoplanetInput (heures, ppm)
+    harm = harm[~(harm["depth"] < 1) & ~(harm["duration"] < 0.05)].head(n)
+    records = harm.astype({"mission": object}).to_dict("records")
+    return [{k: v for k, v in r.items() if v is not None and v == v} for r in records]
+
+
+def latency_summary(latencies_s: list) -> dict:
+    if not latencies_s:
+        return {"p50_ms": None, "p95_ms": None, "p99_ms": None, "max_ms": None, "mean_ms": None}
+    ms = np.asarray(latencies_s) * 1000
+    p50, p95, p99 = np.percentile(ms, [50, 95, 99])
+    return {"p50_ms": float(p50), "p95_ms": float(p95), "p99_ms": float(p99), "max_ms": float(ms.max()),
+            "mean_ms": float(ms.mean())}
+
+
+def summarize(samples: list, elapsed: float) -> dict:
+    """samples : (route, statut, latence s, lignes) des requêtes mesurées (hors échauffement)."""
+    def block(items):
+        errors = {}
+        for _, status, _, _ in items:
+            if status != 200:
+                errors[str(status)] = errors.get(str(status), 0) + 1
+        n = len(items)
+        ok_rows = sum(rows for _, status, _, rows in items if status == 200)
+        return {"requests": n, "throughput_rps": n / elapsed if elapsed else None,
+                "rows_per_second": ok_rows / elapsed if elapsed else None,
+                "error_rate": sum(errors.values()) / n if n else None, "errors": errors,
+                **latency_summary([lat for _, _, lat, _ in items])}
+
+    routes = sorted({s[0] for s in samples})
+    return {"elapsed_seconds": elapsed, "total": block(samples),
+            "routes": {r: block([s for s in samples if s[0] == r]) for r in routes}}
+
+
+async def drive(client, rows: list, concurrency: int, duration: float, mix: dict, batch_sizes: list,
+                warmup: float = 0.0, model: str = None, seed: int = 0) -> dict:
+    """Charge en boucle fermée sur `client` (httpx.AsyncClient) ; renvoie le rapport de summarize."""
+    params = {"model": model} if model else None
+    names, weights = list(mix), list(mix.values())
+    samples = []
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+    measure_from, stop_at = start + warmup, start + warmup + duration
+
+    async def user(i: int):
+        rng = random.Random(seed * 1000 + i)
+        while loop.time() < stop_at:
+            route = rng.choices(names, weights)[0]
+            if route == "batch":
+                n = rng.choice(batch_sizes)
+                payload = [rows[rng.randrange(len(rows))] for _ in range(n)]
+            else:
+                n, payload = 1, rows[rng.randrange(len(rows))]
+            t0 = time.perf_counter()
+            try:
+                status = (await client.post(ROUTES[route], json=payload, params=params)).status_code
+            except Exception as e:  # connexion refusée, timeout...
+                status = type(e).__name__
+            latency = time.perf_counter() - t0
+            if loop.time() >= measure_from:
+                samples.append((route, status, latency, n))
+
+    await asyncio.gather(*[user(i) for i in range(concurrency)])
+    return summarize(samples, loop.time() - measure_from)
+
+
+def train_model(workdir: str, n_rows: int = 20_000) -> str:
+    import pandas as pd
+    from classifiers.exoplanet_classifier import harmonize_koi, harmonize_k2, harmonize_toi, train_final_model_and_save
+    from classifiers.synthetic import synthetic_catalogs
+
+    cats = synthetic_catalogs(n_rows, seed=1)
+    harm = pd.concat([harmonize_koi(cats["koi"]), harmonize_k2(cats["k2"]), harmonize_toi(cats["toi"])],
+                     ignore_index=True)
+    return train_final_model_and_save(harm, model_dir=workdir)
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+async def _wait_ready(url: str, timeout: float = 60.0):
+    import httpx
+
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient(base_url=url) as c:
+        while time.monotonic() < deadline:
+            try:
+                if (await c.get("/health")).status_code == 200:
+                    return
+            except httpx.TransportError:
+                pass
+            await asyncio.sleep(0.2)
+    raise TimeoutError(f"server at {url} not ready after {timeout:.0f}s")
+
+
+async def run(args, model_path: str = None) -> dict:
+    import httpx
+
+    rows = synthetic_rows(args.pool, seed=args.seed)
+    mix = parse_mix(args.mix)
+    batch_sizes = [int(b) for b in args.batch_sizes.split(",")]
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    server, api = None, None
+    try:
+        if args.url:
+            url, transport = args.url, None
+        elif args.target == "socket":
+            port = _free_port()
+            url, transport = f"http://127.0.0.1:{port}", None
+            env = {**os.environ, "MODEL_PATH": model_path, "API_SUBSYSTEMS": "ml"}
+            server = subprocess.Popen([sys.executable, "-m", "uvicorn", "api:app", "--host", "127.0.0.1",
+                                       "--port", str(port), "--log-level", "warning"], cwd=ROOT, env=env)
+            await _wait_ready(url)
+        else:
+            os.environ.update(MODEL_PATH=model_path, API_SUBSYSTEMS="ml")
+            import api
+            api._load_model_on_startup()
+            url, transport = "http://loadtest", httpx.ASGITransport(app=api.app)
+
+        async with httpx.AsyncClient(base_url=url, transport=transport, limits=limits,
+                                     timeout=args.timeout) as client:
+            report = await drive(client, rows, args.concurrency, args.duration, mix, batch_sizes,
+                                 warmup=args.warmup, model=args.model_name, seed=args.seed)
+            stats = await client.get("/predict/stats")
+            report["server_stats"] = stats.json() if stats.status_code == 200 else None
+        return report
+    finally:
+        if api is not None:
+            await api._stop_batcher()
+        if server is not None:
+            server.terminate()
+            server.wait(timeout=30)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Offline load test of the ML prediction endpoints.")
+    parser.add_argument("--target", choices=["inprocess", "socket"], default="inprocess",
+                        help="App driven in this process (ASGI) or through a local uvicorn server")
+    parser.add_argument("--url", default=None, help="Existing server to load instead (e.g. http://localhost:8000)")
+    parser.add_argument("--model", default=None, help="Bundle/artifact to serve (default: train a synthetic one)")
+    parser.add_argument("--model-name", default=None, help="?model= sent with each request (model registry)")
+    parser.add_argument("--concurrency", type=int, default=16, help="Concurrent closed-loop clients")
+    parser.add_argument("--duration", type=float, default=10.0, help="Measured seconds")
+    parser.add_argument("--warmup", type=float, default=2.0, help="Seconds of load before measuring")
+    parser.add_argument("--mix", default="predict=0.8,batch=0.2", help="Route weights, e.g. predict=1,batch=1")
+    parser.add_argument("--batch-sizes", default="10,100", help="Rows per /predict/batch request (drawn uniformly)")
+    parser.add_argument("--pool", type=int, default=50_000, help="Distinct synthetic rows requests are drawn from")
+    parser.add_argument("--timeout", type=float, default=30.0, help="Per-request timeout (s)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", default=None, help="Output JSON (default: benchmarks/results/load_<UTC>.json)")
+    args = parser.parse_args()
+
+    try:
+        parse_mix(args.mix)
+    except ValueError as e:
+        parser.error(str(e))
+
+    created_at = datetime.now(timezone.utc)
+    with tempfile.TemporaryDirectory(prefix="load_model_") as workdir:
+        model_path = None
+        if not args.url:
+            model_path = str(Path(args.model).resolve()) if args.model else train_model(workdir)
+        results = asyncio.run(run(args, model_path))
+
+    report = {"created_at": created_at.isoformat(),
+              "environment": {"python": platform.python_version(), "platform": platform.platform(),
+                              "cpu_count": os.cpu_count()},
+              "params": {k: v for k, v in vars(args).items() if k != "out"}, "results": results}
+    for name, r in [("total", results["total"])] + sorted(results["routes"].items()):
+        print(f"{name:<8} {r['requests']:>7} req  {r['throughput_rps']:8.1f} req/s  {r['rows_per_second']:9.1f} rows/s  "
+              f"p50 {r['p50_ms'] or 0:7.1f} ms  p95 {r['p95_ms'] or 0:7.1f} ms  p99 {r['p99_ms'] or 0:7.1f} ms  "
+              f"errors {r['error_rate'] or 0:.2%} {r['errors'] or ''}")
+
+    out = args.out or str(Path(__file__).resolve().parent / "results"
+                          / f"load_{created_at.strftime('%Y%m%dT%H%M%SZ')}.json")
+    os.makedirs(os.path.dirname(out), exist_ok=True)
+    with open(out, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nLoad test results saved to: {out}")
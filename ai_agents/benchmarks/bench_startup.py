@@ -0,0 +1,143 @@
+# bench_startup.py
+# Coût de démarrage de l'API : temps d'import de api.py (à froid, dans un processus neuf) ventilé
+# par paquet de premier niveau, modules lourds effectivement importés, et optionnellement le
+# chargement du modèle (hook de démarrage).
+#
+# Chaque mesure lance `python -X importtime` dans un sous-processus ; la médiane sur --repeat
+# exécutions est retenue. Les clés des agents sont retirées de l'environnement (pods ML seuls).
+# Les résultats sont écrits en JSON ; --compare affiche l'écart par paquet face à un résultat précédent.
+#
+# Usage (depuis ai_agents/) :
+#   python benchmarks/bench_startup.py
+#   python benchmarks/bench_startup.py --model models/exoplanet_grace_hopper.pkl --repeat 5
+#   python benchmarks/bench_startup.py --compare benchmarks/results/startup_<date>.json
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+from datetime import datetime, timezone
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+# dépendances que les routes chargent à la demande : leur présence après `import api` est une régression
+HEAVY_MODULES = ["sklearn", "scipy", "joblib", "astroquery", "astropy", "agents", "openai",
+                 "astronomist_agents"]
+
+_PROBE = """
+import json, sys, time
+t0 = time.perf_counter()
+import api
+t1 = time.perf_counter()
+if {load_model}:
+    api._load_model_on_startup()
+t2 = time.perf_counter()
+print(json.dumps({{"import_seconds": t1 - t0, "model_load_seconds": t2 - t1 if {load_model} else None,
+                  "heavy_loaded": [m for m in {heavy} if m in sys.modules]}}))
+"""
+
+
+def _git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"],
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def parse_importtime(stderr: str) -> dict:
+    """Temps propre (secondes) par paquet de premier niveau, d'après la sortie de -X importtime."""
+    by_package = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, _, name = (part.strip() for part in line[len("import time:"):].split("|"))
+        package = name.split(".")[0]
+        by_package[package] = by_package.get(package, 0.0) + int(self_us) / 1e6
+    return by_package
+
+
+def probe(model: str = None) -> dict:
+    env = {k: v for k, v in os.environ.items() if k not in ("OPENAI_API_KEY", "PERPLEXITY_API_KEY")}
+    env["PYTHONDONTWRITEBYTECODE"] = "1"
+    if model:
+        env["MODEL_PATH"] = str(Path(model).resolve())
+    code = _PROBE.format(load_model=bool(model), heavy=HEAVY_MODULES)
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", code], cwd=ROOT, env=env,
+                          capture_output=True, text=True)
+    if proc.returncode != 0:
+        raise RuntimeError(f"api import failed:\n{proc.stderr[-2000:]}")
+    out = json.loads(proc.stdout.strip().splitlines()[-1])
+    out["packages"] = parse_importtime(proc.stderr)
+    return out
+
+
+def run(repeat: int, model: str = None) -> dict:
+    runs = [probe(model) for _ in range(repeat)]
+    packages = sorted({p for r in runs for p in r["packages"]})
+    median = {p: statistics.median(r["packages"].get(p, 0.0) for r in runs) for p in packages}
+    ranked = sorted(median.items(), key=lambda kv: kv[1], reverse=True)
+    loads = [r["model_load_seconds"] for r in runs if r["model_load_seconds"] is not None]
+    return {
+        "import_seconds": statistics.median(r["import_seconds"] for r in runs),
+        "model_load_seconds": statistics.median(loads) if loads else None,
+        "heavy_loaded": runs[-1]["heavy_loaded"],
+        "packages": dict(ranked),
+    }
+
+
+def compare(previous: dict, current: dict, top: int = 15):
+    """Écart de temps d'import par paquet (les `top` plus coûteux) ; > 0 = plus lent."""
+    print(f"\nComparison with {previous.get('environment', {}).get('git_commit')} "
+          f"({previous.get('created_at')}):")
+    p, c = previous["results"], current["results"]
+    print(f"  {'api import':<24} {p['import_seconds']:8.3f}s -> {c['import_seconds']:8.3f}s")
+    for name in sorted(set(p["packages"]) | set(c["packages"]),
+                       key=lambda n: -max(p["packages"].get(n, 0), c["packages"].get(n, 0)))[:top]:
+        old, new = p["packages"].get(name, 0.0), c["packages"].get(name, 0.0)
+        flag = "  <-- slower" if new - old > 0.02 else ""
+        print(f"  {name:<24} {old:8.3f}s -> {new:8.3f}s{flag}")
+    added = sorted(set(c["heavy_loaded"]) - set(p["heavy_loaded"]))
+    if added:
+        print(f"  newly imported at startup: {', '.join(added)}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure api.py cold-start import cost by package.")
+    parser.add_argument("--repeat", type=int, default=3, help="Cold imports measured (median kept)")
+    parser.add_argument("--model", default=None, help="Also time the startup model load for this bundle/artifact")
+    parser.add_argument("--top", type=int, default=15, help="Packages listed individually")
+    parser.add_argument("--out", default=None, help="Output JSON (default: benchmarks/results/startup_<UTC>.json)")
+    parser.add_argument("--compare", default=None, metavar="RESULT_JSON",
+                        help="Previous result file to compare against")
+    args = parser.parse_args()
+
+    created_at = datetime.now(timezone.utc)
+    results = run(args.repeat, args.model)
+    report = {"created_at": created_at.isoformat(),
+              "environment": {"python": platform.python_version(), "platform": platform.platform(),
+                              "git_commit": _git_commit()},
+              "params": {"repeat": args.repeat, "model": args.model},
+              "results": results}
+
+    print(f"api import: {results['import_seconds']:.3f}s"
+          + (f", model load: {results['model_load_seconds']:.3f}s" if results["model_load_seconds"] is not None else ""))
+    ranked = list(results["packages"].items())
+    for name, seconds in ranked[:args.top]:
+        print(f"  {name:<24} {seconds:8.3f}s")
+    print(f"  {'(others)':<24} {sum(s for _, s in ranked[args.top:]):8.3f}s")
+    print(f"heavy modules imported: {', '.join(results['heavy_loaded']) or 'none'}")
+
+    out = args.out or str(Path(__file__).resolve().parent / "results"
+                          / f"startup_{created_at.strftime('%Y%m%dT%H%M%SZ')}.json")
+    os.makedirs(os.path.dirname(out), exist_ok=True)
+    with open(out, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nStartup results saved to: {out}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            compare(json.load(f), report, args.top)
@@ -0,0 +1,117 @@
+# artifact.py
+# Format d'artefact modèle mappable en mémoire (répertoire manifest JSON + tableaux .npy).
+#
+# Un bundle pickle (train_final_model_and_save) est compilé (classifiers.compiled) puis écrit comme
+# un répertoire : manifest.json (colonnes, label_map, version de schéma, snapshots d'entraînement,
+# description des tableaux) et un fichier .npy brut par tableau. Le chargement ouvre les .npy avec
+# mmap_mode='r' : aucun code pickle n'est exécuté et N workers uvicorn partagent une seule copie
+# dans le page cache.
+
+import json
+import os
+import shutil
+import tempfile
+from pathlib import Path
+
+import numpy as np
+
+from classifiers.compiled import CompiledModel, compile_bundle
+
+ARTIFACT_SCHEMA_VERSION = 1
+MANIFEST_NAME = "manifest.json"
+
+
+def is_artifact(path) -> bool:
+    return Path(path).is_dir() and (Path(path) / MANIFEST_NAME).exists()
+
+
+def save_artifact(model: CompiledModel, out_dir: str, snapshot_ids: dict = None,
+                  lineage: dict = None) -> str:
+    """Écrit `model` dans le répertoire `out_dir` (remplacé de façon atomique s'il existe déjà)."""
+    out_dir = Path(out_dir)
+    out_dir.parent.mkdir(parents=True, exist_ok=True)
+    meta = model.meta
+
+    tmp = Path(tempfile.mkdtemp(dir=out_dir.parent, prefix=f".{out_dir.name}.", suffix=".tmp"))
+    try:
+        arrays = {}
+        for name, arr in model.arrays.items():
+            arr = np.asarray(arr)
+            if arr.dtype == object:
+                raise ValueError(f"Array '{name}' has dtype object and cannot be memory-mapped")
+            np.save(tmp / f"{name}.npy", np.ascontiguousarray(arr), allow_pickle=False)
+            arrays[name] = {"file": f"{name}.npy", "dtype": arr.dtype.str, "shape": list(arr.shape)}
+
+        manifest = {
+            "schema_version": ARTIFACT_SCHEMA_VERSION,
+            "all_num_cols": meta["all_num_cols"],
+            "cat_cols": meta["cat_cols"],
+            "label_map": meta["label_map"],
+            "snapshot_ids": snapshot_ids or {},
+            "lineage": lineage,
+            "model": meta,
+            "arrays": arrays,
+        }
+        with open(tmp / MANIFEST_NAME, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=2)
+
+        # bascule : l'ancien répertoire n'est retiré qu'une fois le nouveau complet
+        old = None
+        if out_dir.exists():
+            old = out_dir.with_name(f".{out_dir.name}.old")
+            shutil.rmtree(old, ignore_errors=True)
+            os.replace(out_dir, old)
+        os.replace(tmp, out_dir)
+        if old is not None:
+            shutil.rmtree(old, ignore_errors=True)
+    except BaseException:
+        shutil.rmtree(tmp, ignore_errors=True)
+        raise
+    return str(out_dir)
+
+
+def read_manifest(path) -> dict:
+    with open(Path(path) / MANIFEST_NAME, encoding="utf-8") as f:
+        manifest = json.load(f)
+    version = manifest.get("schema_version")
+    if version != ARTIFACT_SCHEMA_VERSION:
+        raise ValueError(f"Unsupported artifact schema version: {version} "
+                         f"(expected {ARTIFACT_SCHEMA_VERSION})")
+    return manifest
+
+
+def load_artifact(path, mmap: bool = True) -> CompiledModel:
+    """Ouvre un artefact ; les tableaux sont mappés en lecture seule (mmap=False : copie en RAM)."""
+    path = Path(path)
+    manifest = read_manifest(path)
+    arrays = {}
+    for name, spec in manifest["arrays"].items():
+        arr = np.load(path / spec["file"], mmap_mode="r" if mmap else None, allow_pickle=False)
+        if arr.dtype.str != spec["dtype"] or list(arr.shape) != spec["shape"]:
+            raise ValueError(f"Array '{name}' does not match the manifest in {path}")
+        arrays[name] = arr
+    model = CompiledModel(arrays, manifest["model"])
+    model.snapshot_ids = manifest.get("snapshot_ids", {})
+    model.lineage = manifest.get("lineage")
+    return model
+
+
+def convert_bundle(bundle_path: str, out_dir: str = None) -> str:
+    """Convertit un bundle pickle (dict de train_final_model_and_save) en artefact répertoire."""
+    import joblib
+
+    bundle = joblib.load(bundle_path)
+    if not isinstance(bundle, dict) or "pipeline" not in bundle:
+        raise ValueError("Only bundles saved by train_final_model_and_save can be converted")
+    out_dir = out_dir or str(Path(bundle_path).with_suffix(""))
+    return save_artifact(compile_bundle(bundle), out_dir,
+                         snapshot_ids=bundle.get("snapshot_ids"), lineage=bundle.get("lineage"))
+
+
+if __name__ == "__main__":
+    import sys
+
+    if len(sys.argv) not in (2, 3):
+        print("usage: python classifiers/artifact.py <bundle.pkl> [out_dir]")
+        sys.exit(1)
+    print(f"Artifact written to: {convert_bundle(*sys.argv[1:])}")
@@ -0,0 +1,299 @@
+# compiled.py
+# Compilation d'un bundle HGB (train_final_model_and_save) en tableaux NumPy plats.
+#
+# Le pipeline sklearn (ColumnTransformer → SimpleImputer / QuantileTransformer / OneHotEncoder →
+# HistGradientBoostingClassifier) est réduit à : médianes d'imputation, tables de quantiles,
+# vocabulaire one-hot et noeuds des arbres concaténés. L'évaluateur vectorisé ci-dessous n'importe
+# que NumPy et reproduit predict_proba du pipeline (écart < 1e-9).
+
+import json
+
+import numpy as np
+
+COMPILED_FORMAT_VERSION = 1
+
+# sklearn.preprocessing._data.BOUNDS_THRESHOLD
+_BOUNDS_THRESHOLD = 1e-7
+
+# --------------------------
+# ndtri (inverse de la CDF normale), port NumPy de Cephes — identique à scipy.special.ndtri
+# --------------------------
+_S2PI = 2.50662827463100050242E0
+_EXP_M2 = 0.13533528323661269189
+_P0 = np.array([-5.99633501014107895267E1, 9.80010754185999661536E1, -5.66762857469070293439E1,
+                1.39312609387279679503E1, -1.23916583867381258016E0])
+_Q0 = np.array([1.0, 1.95448858338141759834E0, 4.67627912898881538453E0, 8.63602421390890590575E1,
+                -2.25462687854119370527E2, 2.00260212380060660359E2, -8.20372256168333339912E1,
+                1.59056225126211695515E1, -1.18331621121330003142E0])
+_P1 = np.array([4.05544892305962419923E0, 3.15251094599893866154E1, 5.71628192246421288162E1,
+                4.40805073893200834700E1, 1.46849561928858024014E1, 2.18663306850790267539E0,
+                -1.40256079171354495875E-1, -3.50424626827848203418E-2, -8.57456785154685413611E-4])
+_Q1 = np.array([1.0, 1.57799883256466749731E1, 4.53907635128879210584E1, 4.13172038254672030440E1,
+                1.50425385692907503408E1, 2.50464946208309415979E0, -1.42182922854787788574E-1,
+                -3.80806407691578277194E-2, -9.33259480895457427372E-4])
+_P2 = np.array([3.23774891776946035970E0, 6.91522889068984211695E0, 3.93881025292474443415E0,
+                1.33303460815807542389E0, 2.01485389549179081538E-1, 1.23716634817820021358E-2,
+                3.01581553508235416007E-4, 2.65806974686737550832E-6, 6.23974539184983293730E-9])
+_Q2 = np.array([1.0, 6.02427039364742014255E0, 3.67983563856160859403E0, 1.37702099489081330271E0,
+                2.16236993594496635890E-1, 1.34204006088543189037E-2, 3.28014464682127739104E-4,
+                2.89247864745380683936E-6, 6.79019408009981274425E-9])
+
+
+def ndtri(p):
+    p = np.asarray(p, dtype=np.float64)
+    upper = p > 1.0 - _EXP_M2
+    y = np.where(upper, 1.0 - p, p)
+    with np.errstate(all="ignore"):
+        # zone centrale
+        yc = y - 0.5
+        y2 = yc * yc
+        x_central = (yc + yc * (y2 * np.polyval(_P0, y2) / np.polyval(_Q0, y2))) * _S2PI
+        # queues
+        x = np.sqrt(-2.0 * np.log(y))
+        x0 = x - np.log(x) / x
+        z = 1.0 / x
+        x1 = np.where(x < 8.0,
+                      z * np.polyval(_P1, z) / np.polyval(_Q1, z),
+                      z * np.polyval(_P2, z) / np.polyval(_Q2, z))
+        x_tail = np.where(upper, x0 - x1, x1 - x0)
+    out = np.where(y > _EXP_M2, x_central, x_tail)
+    out = np.where(p == 0.0, -np.inf, out)
+    out = np.where(p == 1.0, np.inf, out)
+    return np.where(np.isnan(p) | (p < 0.0) | (p > 1.0), np.nan, out)  # hors [0, 1] : NaN, comme scipy
+
+
+_CLIP_MIN = float(ndtri(_BOUNDS_THRESHOLD - np.spacing(1)))
+_CLIP_MAX = float(ndtri(1 - (_BOUNDS_THRESHOLD - np.spacing(1))))
+
+
+# --------------------------
+# Compilation (nécessite sklearn, côté entraînement uniquement)
+# --------------------------
+
+def compile_pipeline(pipe, all_num_cols, cat_cols, label_map) -> "CompiledModel":
+    pre = pipe.named_steps["pre"]
+    clf = pipe.named_steps["clf"]
+    if type(clf).__name__ != "HistGradientBoostingClassifier":
+        raise ValueError(f"Only HistGradientBoostingClassifier pipelines can be compiled, got {type(clf).__name__}")
+
+    arrays, meta = {}, {
+        "format_version": COMPILED_FORMAT_VERSION,
+        "all_num_cols": list(all_num_cols),
+        "cat_cols": list(cat_cols),
+        "label_map": dict(label_map),
+    }
+
+    # ---------- préprocesseur ----------
+    blocks = []
+    for name, trans, cols in pre.transformers_:
+        if name == "remainder" or trans == "drop" or len(cols) == 0:
+            continue
+        cols = list(cols)
+        if name == "num":
+            imp, qt = trans.named_steps["imp"], trans.named_steps["qt"]
+            if qt.output_distribution != "normal":
+                raise ValueError("Only output_distribution='normal' is supported")
+            stats = np.asarray(imp.statistics_, dtype=np.float64)
+            kept = np.flatnonzero(~np.isnan(stats))  # colonnes entièrement vides au fit : retirées
+            arrays["num_median"] = stats[kept]
+            arrays["qt_quantiles"] = np.ascontiguousarray(qt.quantiles_, dtype=np.float64)
+            arrays["qt_references"] = np.asarray(qt.references_, dtype=np.float64)
+            blocks.append({"kind": "num", "cols": [cols[k] for k in kept]})
+        elif name == "cat":
+            imp, oh = trans.named_steps["imp"], trans.named_steps["oh"]
+            vocab = [[str(v) for v in cats] for cats in oh.categories_]
+            blocks.append({"kind": "cat", "cols": cols, "fill": [str(v) for v in imp.statistics_],
+                           "vocab": vocab})
+        else:
+            raise ValueError(f"Unsupported transformer: {name}")
+    meta["blocks"] = blocks
+
+    # ---------- arbres ----------
+    predictors = clf._predictors
+    n_iter, k = len(predictors), len(predictors[0])
+    feat, thr, miss_left, left, right, leaf, value, roots = [], [], [], [], [], [], [], []
+    offset, max_depth = 0, 0
+    for it in range(n_iter):
+        for c in range(k):
+            nodes = predictors[it][c].nodes
+            if nodes["is_categorical"].any():
+                raise ValueError("Categorical splits are not supported")
+            roots.append(offset)
+            feat.append(nodes["feature_idx"].astype(np.int32))
+            thr.append(nodes["num_threshold"].astype(np.float64))
+            miss_left.append(nodes["missing_go_to_left"].astype(bool))
+            left.append(nodes["left"].astype(np.int32) + offset)
+            right.append(nodes["right"].astype(np.int32) + offset)
+            leaf.append(nodes["is_leaf"].astype(bool))
+            value.append(nodes["value"].astype(np.float64))
+            max_depth = max(max_depth, int(nodes["depth"].max()))
+            offset += len(nodes)
+
+    is_leaf = np.concatenate(leaf)
+    arrays.update(
+        node_feature=np.where(is_leaf, 0, np.concatenate(feat)).astype(np.int32),
+        node_threshold=np.concatenate(thr),
+        node_missing_left=np.concatenate(miss_left),
+        # une feuille pointe vers elle-même : la descente vectorisée y reste
+        node_left=np.where(is_leaf, np.arange(offset), np.concatenate(left)).astype(np.int32),
+        node_right=np.where(is_leaf, np.arange(offset), np.concatenate(right)).astype(np.int32),
+        node_value=np.concatenate(value),
+        tree_root=np.asarray(roots, dtype=np.int32),
+        baseline=np.asarray(clf._baseline_prediction, dtype=np.float64).reshape(-1),
+        classes=np.asarray(clf.classes_),
+    )
+    meta.update(n_iter=n_iter, n_trees_per_iteration=k, max_depth=max_depth)
+    return CompiledModel(arrays, meta)
+
+
+def compile_bundle(bundle: dict) -> "CompiledModel":
+    return compile_pipeline(bundle["pipeline"], bundle["all_num_cols"], bundle["cat_cols"],
+                            bundle["label_map"])
+
+
+# --------------------------
+# Évaluateur NumPy
+# --------------------------
+
+def _get_column(X, name):
+    if hasattr(X, "columns"):
+        if name not in X.columns:
+            return None
+        return X[name].to_numpy()
+    col = X.get(name)
+    if col is None:
+        return None
+    return np.asarray(col)
+
+
+def _n_rows(X) -> int:
+    if hasattr(X, "columns"):
+        return len(X)
+    return len(np.asarray(next(iter(X.values()))))
+
+
+class CompiledModel:
+    """Modèle compilé : interface predict / predict_proba / classes_ compatible avec le Pipeline."""
+
+    def __init__(self, arrays: dict, meta: dict):
+        self.arrays = arrays
+        self.meta = meta
+        self.classes_ = np.asarray(arrays["classes"])
+        self.feature_names_in_ = np.asarray(meta["all_num_cols"] + meta["cat_cols"], dtype=object)
+        # tables dérivées, calculées une fois
+        if "qt_quantiles" in arrays:
+            self._q_t = np.ascontiguousarray(arrays["qt_quantiles"].T)
+            self._neg_q_rev = np.ascontiguousarray(-arrays["qt_quantiles"][::-1].T)
+            self._neg_ref_rev = -arrays["qt_references"][::-1]
+        self._is_leaf = arrays["node_left"] == np.arange(len(arrays["node_left"]))
+
+    # ---------- préprocesseur ----------
+
+    def _quantile_uniform(self, x, j):
+        # QuantileTransformer._transform_col (sens direct), avant passage par ndtri
+        q = self._q_t[j]
+        u = 0.5 * (np.interp(x, q, self.arrays["qt_references"])
+                   - np.interp(-x, self._neg_q_rev[j], self._neg_ref_rev))
+        u[x + _BOUNDS_THRESHOLD > q[-1]] = 1.0
+        u[x - _BOUNDS_THRESHOLD < q[0]] = 0.0
+        return u
+
+    def transform(self, X) -> np.ndarray:
+        n = _n_rows(X)
+        parts = []
+        for block in self.meta["blocks"]:
+            if block["kind"] == "num":
+                median = self.arrays["num_median"]
+                u = np.empty((n, len(block["cols"])), dtype=np.float64)
+                for j, c in enumerate(block["cols"]):
+                    col = _get_column(X, c)
+                    x = np.full(n, median[j]) if col is None else np.array(col, dtype=np.float64)
+                    x[np.isnan(x)] = median[j]
+                    u[:, j] = self._quantile_uniform(x, j)
+                parts.append(np.clip(ndtri(u), _CLIP_MIN, _CLIP_MAX))
+            else:
+                for c, fill, vocab in zip(block["cols"], block["fill"], block["vocab"]):
+                    col = _get_column(X, c)
+                    if col is None:
+                        values = np.full(n, fill, dtype=object)
+                    else:
+                        values = np.asarray(col, dtype=object)
+                        missing = np.array([v is None or v != v for v in values], dtype=bool)
+                        values = np.where(missing, fill, values).astype(str)
+                    parts.append((values[:, None] == np.asarray(vocab)[None, :]).astype(np.float64))
+        return np.hstack(parts) if len(parts) > 1 else parts[0]
+
+    # ---------- arbres ----------
+
+    def raw_predict(self, Z: np.ndarray, chunk_size: int = 2048) -> np.ndarray:
+        if Z.shape[0] > chunk_size:
+            # borne la mémoire de la descente (lignes × arbres)
+            return np.vstack([self.raw_predict(Z[i:i + chunk_size], chunk_size)
+                              for i in range(0, Z.shape[0], chunk_size)])
+        a = self.arrays
+        n, n_features = Z.shape
+        n_trees = len(a["tree_root"])
+        feature, threshold = a["node_feature"], a["node_threshold"]
+        missing_left, left, right = a["node_missing_left"], a["node_left"], a["node_right"]
+
+        # descente de toutes les paires (ligne, arbre) en parallèle ; seules les paires pas encore
+        # arrivées sur une feuille restent actives d'un niveau à l'autre
+        node = np.tile(a["tree_root"], n)
+        z_flat = np.ascontiguousarray(Z, dtype=np.float64).ravel()
+        row_offset = np.repeat(np.arange(n, dtype=np.int64) * n_features, n_trees)
+        active = np.flatnonzero(~self._is_leaf[node])
+        while active.size:
+            cur = node[active]
+            x = z_flat[row_offset[active] + feature[cur]]
+            go_left = x <= threshold[cur]
+            nan = np.isnan(x)
+            if nan.any():
+                go_left[nan] = missing_left[cur[nan]]
+            nxt = np.where(go_left, left[cur], right[cur])
+            node[active] = nxt
+            active = active[~self._is_leaf[nxt]]
+        node = node.reshape(n, n_trees)
+
+        k = self.meta["n_trees_per_iteration"]
+        leaf_values = a["node_value"][node].reshape(n, self.meta["n_iter"], k)
+        return a["baseline"][None, :] + leaf_values.sum(axis=1)
+
+    def predict_proba(self, X) -> np.ndarray:
+        return self.predict_proba_transformed(self.transform(X))
+
+    def predict_proba_transformed(self, Z: np.ndarray) -> np.ndarray:
+        """predict_proba à partir de la sortie de transform()."""
+        raw = self.raw_predict(Z)
+        if raw.shape[1] == 1:
+            p1 = 1.0 / (1.0 + np.exp(-raw[:, 0]))
+            return np.column_stack([1.0 - p1, p1])
+        raw = raw - raw.max(axis=1, keepdims=True)
+        e = np.exp(raw)
+        return e / e.sum(axis=1, keepdims=True)
+
+    def predict(self, X) -> np.ndarray:
+        return self.classes_[np.argmax(self.predict_proba(X), axis=1)]
+
+    # ---------- persistance (.npz) ----------
+
+    def save(self, path: str) -> str:
+        np.savez(path, __meta__=np.array(json.dumps(self.meta)), **self.arrays)
+        return path
+
+
+def load_compiled(path: str) -> CompiledModel:
+    with np.load(path, allow_pickle=False) as data:
+        meta = json.loads(str(data["__meta__"]))
+        arrays = {k: data[k] for k in data.files if k != "__meta__"}
+    return CompiledModel(arrays, meta)
+
+
+if __name__ == "__main__":
+    import sys
+    import joblib
+
+    if len(sys.argv) != 3:
+        print("usage: python classifiers/compiled.py <bundle.pkl> <out.npz>")
+        sys.exit(1)
+    model = compile_bundle(joblib.load(sys.argv[1]))
+    print(f"Compiled model saved to: {model.save(sys.argv[2])}")
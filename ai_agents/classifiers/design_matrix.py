@@ -0,0 +1,174 @@
+# design_matrix.py
+# Matrice de design float32 mise en cache par version du jeu harmonisé.
+#
+# Les features (colonnes de base nettoyées + log_period, log_duration_h, log_depth_ppm,
+# depth_over_duration) sont calculées une seule fois dans un bloc NumPy contigu. La CV, le LOMO,
+# le fit final et la recherche d'hyperparamètres indexent ce bloc par lignes, sans copie de DataFrame.
+# La clé de la matrice (`key`, clé de l'étape "features" du StageCache) couvre la version du jeu
+# harmonisé, le code qui calcule les colonnes (classifiers.features, schéma des missions) et la liste
+# des features : les étapes en aval (fits de fold, modèle final) s'en servent comme entrée, si bien
+# qu'une formule dérivée modifiée invalide aussi les modèles qui en dépendent.
+
+import hashlib
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from classifiers.exoplanet_classifier import LABEL_MAP, BASE_NUM_COLS_ALL, DERIVED_COLS
+from classifiers.mission_schema import MISSION_DTYPE
+from classifiers.features import compute_features
+
+MISSIONS = list(MISSION_DTYPE.categories)
+_CACHE_SIZE = 4
+_CACHE: "OrderedDict[str, DesignMatrix]" = OrderedDict()
+
+
+class DesignMatrix:
+    """
+    X : bloc float32 C-contigu (n, n_features + 1), la dernière colonne est le code mission
+    mission : codes mission int8 (index dans `missions`)
+    y : labels int8 (LABEL_MAP)
+    groups_star : codes int32 de star_id (groupes de la CV)
+    version : empreinte du jeu harmonisé ; key : clé de l'étape features (features_key)
+    """
+
+    def __init__(self, X, feature_names, mission, missions, y, groups_star, version, key=None):
+        self.X = X
+        self.feature_names = list(feature_names)
+        self.mission = mission
+        self.missions = list(missions)
+        self.y = y
+        self.groups_star = groups_star
+        self.version = version
+        self.key = key or features_key(version)
+
+    @property
+    def n_features(self) -> int:
+        return len(self.feature_names)
+
+    @property
+    def mission_col(self) -> int:
+        return self.n_features
+
+    @property
+    def nbytes(self) -> int:
+        return self.X.nbytes + self.mission.nbytes + self.y.nbytes + self.groups_star.nbytes
+
+    def __len__(self):
+        return self.X.shape[0]
+
+    def take(self, rows) -> np.ndarray:
+        """Lignes `rows` du bloc (features + code mission), une seule copie float32."""
+        return np.take(self.X, rows, axis=0)
+
+    def observed_features(self, block: np.ndarray) -> list:
+        """Indices des features ayant au moins une valeur non-NaN dans `block`."""
+        present = ~np.isnan(block[:, :self.n_features]).all(axis=0)
+        return [int(j) for j in np.flatnonzero(present)]
+
+    def frame(self, rows=None) -> pd.DataFrame:
+        """
+        Vue DataFrame (features float32 + `mission` catégorielle) pour le pipeline sauvegardé,
+        qui doit accepter les noms de colonnes et les missions en texte à l'inférence.
+        """
+        block = self.X if rows is None else self.take(rows)
+        mission = block[:, self.mission_col].astype(np.int8)
+        df = pd.DataFrame(block[:, :self.n_features], columns=self.feature_names, copy=False)
+        df["mission"] = pd.Categorical.from_codes(mission, categories=self.missions)
+        return df
+
+
+def dataset_version(harm: pd.DataFrame) -> str:
+    """Empreinte du contenu du jeu harmonisé (valeurs + noms de colonnes)."""
+    h = hashlib.sha1()
+    h.update("|".join(map(str, harm.columns)).encode())
+    h.update(pd.util.hash_pandas_object(harm, index=False).values.tobytes())
+    return h.hexdigest()[:16]
+
+
+# code (en plus de build_design_matrix) et paramètres dont dépendent les colonnes de la matrice
+FEATURE_MODULES = ("classifiers.features", "classifiers.mission_schema")
+FEATURE_PARAMS = {"base": BASE_NUM_COLS_ALL, "derived": DERIVED_COLS, "labels": LABEL_MAP}
+
+
+def features_key(version: str) -> str:
+    """Clé de l'étape features pour la version `version` du jeu harmonisé."""
+    from classifiers.stage_cache import StageCache, code_version
+    return StageCache.key("features", version, params=FEATURE_PARAMS,
+                          code=code_version(build_design_matrix, *FEATURE_MODULES))
+
+
+def build_design_matrix(harm: pd.DataFrame, version: str = None) -> DesignMatrix:
+    labelled = harm["label_raw"].isin(LABEL_MAP.keys()).to_numpy()
+    df = harm.loc[labelled]
+
+    base_cols = [c for c in BASE_NUM_COLS_ALL if c in df.columns]
+    feature_names = base_cols + DERIVED_COLS
+    n = len(df)
+    X = np.empty((n, len(feature_names) + 1), dtype=np.float32)
+    # même noyau que l'inférence (classifiers.features) : calcul float64, stockage float32
+    compute_features(df, base_cols, out=X[:, :len(feature_names)])
+
+    mission_raw = df["mission"].astype(str).to_numpy()
+    missions = MISSIONS + sorted(set(mission_raw) - set(MISSIONS))
+    mission = pd.Categorical(mission_raw, categories=missions).codes.astype(np.int8)
+    X[:, -1] = mission
+
+    y = df["label_raw"].map(LABEL_MAP).to_numpy(dtype=np.int8)
+    if "star_id" in df.columns:
+        groups_star = pd.factorize(df["star_id"].astype(str))[0].astype(np.int32)
+    else:  # lecture projetée (out_of_core) : pas de groupes
+        groups_star = np.arange(n, dtype=np.int32)
+
+    return DesignMatrix(X, feature_names, mission, missions, y, groups_star,
+                        version or dataset_version(harm))
+
+
+def get_design_matrix(harm: pd.DataFrame, version: str = None, cache=None) -> DesignMatrix:
+    """
+    Matrice de design de `harm`, construite une fois par version puis servie depuis le cache mémoire
+    (et depuis le StageCache disque `cache` s'il est fourni).
+    """
+    version = version or dataset_version(harm)
+    key = features_key(version)
+    dm = _CACHE.get(key)
+    if dm is None:
+        if cache is not None:
+            dm = cache.get_or_compute("features", key, lambda: build_design_matrix(harm, version))
+        else:
+            dm = build_design_matrix(harm, version)
+        _CACHE[key] = dm
+        while len(_CACHE) > _CACHE_SIZE:
+            _CACHE.popitem(last=False)
+    else:
+        _CACHE.move_to_end(key)
+    return dm
+
+
+def build_block_preprocessor(dm: DesignMatrix, num_idx, with_mission: bool = True):
+    """
+    Équivalent de _build_preprocessor pour le bloc NumPy : colonnes sélectionnées par indice,
+    mission one-hot à partir de son code.
+    """
+    from sklearn.preprocessing import QuantileTransformer, OneHotEncoder
+    from sklearn.compose import ColumnTransformer
+    from sklearn.pipeline import Pipeline
+    from sklearn.impute import SimpleImputer
+    transformers = [
+        ("num", Pipeline([
+            ("imp", SimpleImputer(strategy="median")),
+            ("qt",  QuantileTransformer(output_distribution="normal",
+                                        subsample=200_000, random_state=42)),
+        ]), list(num_idx)),
+    ]
+    if with_mission:
+        codes = np.arange(len(dm.missions), dtype=np.float32)
+        transformers.append(
+            ("cat", OneHotEncoder(categories=[codes], handle_unknown="ignore"), [dm.mission_col])
+        )
+    return ColumnTransformer(transformers)
+
+
+def clear_cache():
+    _CACHE.clear()
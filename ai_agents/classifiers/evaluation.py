@@ -0,0 +1,217 @@
+# evaluation.py
+# Moteur d'évaluation parallèle : CV (StratifiedGroupKFold par étoile) + Leave-One-Mission-Out.
+#
+# Chaque fit (fold CV ou split LOMO) est un job indépendant exécuté sur un pool de processus.
+# La matrice de design float32 (classifiers.design_matrix) est envoyée une seule fois à chaque
+# worker (initializer), les jobs ne transportent que des indices de lignes.
+# Le résultat est un rapport JSON-sérialisable.
+
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+
+from sklearn.base import clone
+from sklearn.ensemble import HistGradientBoostingClassifier
+from sklearn.metrics import f1_score, balanced_accuracy_score
+from sklearn.model_selection import StratifiedGroupKFold
+from sklearn.pipeline import Pipeline
+from sklearn.utils.class_weight import compute_sample_weight
+
+from classifiers.exoplanet_classifier import LABEL_MAP, CAT_COLS, HGB_PARAMS
+from classifiers.design_matrix import get_design_matrix, build_block_preprocessor
+
+# Données partagées par worker (remplies par _init_worker, jamais re-picklées par job)
+_SHARED = {}
+
+
+# --------------------------
+# Planification
+# --------------------------
+
+def plan_jobs(y, groups_star, groups_mission, n_splits=5, min_test_size=50, random_state=42,
+              mission_names=None):
+    """Liste des fits à réaliser : folds CV puis splits LOMO (mission de test exclue du train)."""
+    jobs = []
+    cv = StratifiedGroupKFold(n_splits=n_splits, shuffle=True, random_state=random_state)
+    for fold, (tr, te) in enumerate(cv.split(np.zeros(len(y)), y, groups_star), 1):
+        jobs.append({"kind": "cv", "name": f"fold_{fold}", "train_idx": tr, "test_idx": te,
+                     "use_cat": True})
+
+    for m in np.unique(groups_mission):
+        tr = np.where(groups_mission != m)[0]
+        te = np.where(groups_mission == m)[0]
+        if len(te) < min_test_size:
+            continue
+        # La mission de test n'est jamais vue à l'entraînement : pas de one-hot mission
+        name = mission_names[m] if mission_names is not None else str(m)
+        jobs.append({"kind": "lomo", "name": name, "train_idx": tr, "test_idx": te,
+                     "use_cat": False})
+    return jobs
+
+
+# --------------------------
+# Workers
+# --------------------------
+
+def _init_worker(shared: dict, threads_per_worker: int):
+    from threadpoolctl import threadpool_limits
+    # Évite la sur-souscription OpenMP (HGB est multi-threadé) quand plusieurs fits tournent en parallèle
+    _SHARED.clear()
+    _SHARED.update(shared)
+    _SHARED["_limits"] = threadpool_limits(limits=max(1, int(threads_per_worker)))
+
+
+def _cached(stage: str, key_fn, compute):
+    """Résultat de `compute()` via le StageCache partagé (s'il y en a un) ; renvoie (valeur, hit)."""
+    cache = _SHARED.get("cache")
+    if cache is None:
+        return compute(), False
+    key = key_fn(cache)
+    hit, value = cache.get(stage, key)
+    if hit:
+        return value, True
+    return cache.put(stage, key, compute()), False
+
+
+def _run_job(job: dict) -> dict:
+    from classifiers.stage_cache import code_version
+
+    dm = _SHARED["dm"]
+    tr, te = job["train_idx"], job["test_idx"]
+
+    block_tr = dm.take(tr)
+    num_idx = dm.observed_features(block_tr)
+    num_cols_fit = [dm.feature_names[j] for j in num_idx]
+
+    # job["clf_params"] : configuration propre au job (recherche d'hyperparamètres)
+    clf = (HistGradientBoostingClassifier(**job["clf_params"]) if job.get("clf_params")
+           else clone(_SHARED["clf"]))
+    pre = build_block_preprocessor(dm, num_idx, with_mission=job["use_cat"])
+    y = dm.y
+    sw = compute_sample_weight(class_weight="balanced", y=y[tr])
+
+    # préprocesseur et modèle du fold mis en cache séparément : changer un paramètre du HGB
+    # réutilise le préprocesseur déjà ajusté
+    def pre_key(cache):
+        return cache.key("fold_preprocessor", dm, tr, code=code_version(build_block_preprocessor),
+                         params={"num_idx": num_idx, "use_cat": job["use_cat"]})
+
+    def clf_key(cache):
+        return cache.key("fold_model", pre_key(cache), code=code_version(_run_job),
+                         params=clf.get_params())
+
+    t0 = time.perf_counter()
+    pre, pre_hit = _cached("fold_preprocessor", pre_key, lambda: pre.fit(block_tr))
+    clf, clf_hit = _cached("fold_model", clf_key,
+                           lambda: clf.fit(pre.transform(block_tr), y[tr], sample_weight=sw))
+    pipe = Pipeline([("pre", pre), ("clf", clf)])
+    t1 = time.perf_counter()
+    del block_tr
+    y_hat = pipe.predict(dm.take(te))
+    t2 = time.perf_counter()
+
+    return {
+        "kind": job["kind"],
+        "name": job["name"],
+        "n_train": int(len(tr)),
+        "n_test": int(len(te)),
+        "num_cols": num_cols_fit,
+        "f1_macro": float(f1_score(y[te], y_hat, average="macro")),
+        "balanced_accuracy": float(balanced_accuracy_score(y[te], y_hat)),
+        "n_iter": int(pipe.named_steps["clf"].n_iter_),
+        "fit_seconds": t1 - t0,
+        "predict_seconds": t2 - t1,
+        "cache_hits": {"preprocessor": pre_hit, "model": clf_hit},
+        "pid": os.getpid(),
+    }
+
+
+# --------------------------
+# Orchestration
+# --------------------------
+
+def pool_size(n_tasks: int, n_jobs: int = None):
+    """(nombre de workers, threads OpenMP par worker) pour `n_tasks` fits indépendants."""
+    n_cpu = os.cpu_count() or 1
+    n_jobs = max(1, min(n_tasks, n_jobs or n_cpu))
+    return n_jobs, max(1, n_cpu // n_jobs)
+
+
+def evaluate(harm: pd.DataFrame, n_jobs: int = None, clf_params: dict = None,
+             n_splits: int = 5, min_test_size: int = 50, cache=None) -> dict:
+    """
+    Évalue le pipeline HGB en CV par étoile et en Leave-One-Mission-Out, tous les fits en parallèle.
+    `cache` (StageCache) : features, préprocesseurs et modèles par fold mémoïsés sur disque.
+    Retourne un rapport JSON-sérialisable (métriques et temps par fold).
+    """
+    t_start = time.perf_counter()
+    dm = get_design_matrix(harm, cache=cache)
+    jobs = plan_jobs(dm.y, dm.groups_star, dm.mission, n_splits=n_splits,
+                     min_test_size=min_test_size, mission_names=dm.missions)
+
+    shared = {
+        "dm": dm,
+        "clf": HistGradientBoostingClassifier(**(clf_params or HGB_PARAMS)),
+        "cache": cache,
+    }
+
+    n_jobs, threads_per_worker = pool_size(len(jobs), n_jobs)
+
+    # Les plus gros entraînements d'abord : le temps total tend vers celui du fold le plus lent
+    jobs = sorted(jobs, key=lambda j: len(j["train_idx"]), reverse=True)
+
+    results = []
+    if n_jobs <= 1:
+        _init_worker(shared, threads_per_worker)
+        results = [_run_job(j) for j in jobs]
+    else:
+        with ProcessPoolExecutor(max_workers=n_jobs, initializer=_init_worker,
+                                 initargs=(shared, threads_per_worker)) as ex:
+            futures = [ex.submit(_run_job, j) for j in jobs]
+            for fut in as_completed(futures):
+                results.append(fut.result())
+
+    cv_folds = sorted([r for r in results if r["kind"] == "cv"], key=lambda r: r["name"])
+    lomo = sorted([r for r in results if r["kind"] == "lomo"], key=lambda r: r["name"])
+    f1s = [r["f1_macro"] for r in cv_folds]
+    bals = [r["balanced_accuracy"] for r in cv_folds]
+
+    return {
+        "dataset": {
+            "version": dm.version,
+            "n_rows": len(dm),
+            "num_cols": dm.feature_names,
+            "cat_cols": CAT_COLS,
+            "design_matrix_bytes": int(dm.nbytes),
+            "label_counts": {k: int((dm.y == v).sum()) for k, v in LABEL_MAP.items()},
+        },
+        "cv": {
+            "n_splits": n_splits,
+            "folds": cv_folds,
+            "f1_macro_mean": float(np.mean(f1s)) if f1s else None,
+            "f1_macro_std": float(np.std(f1s)) if f1s else None,
+            "balanced_accuracy_mean": float(np.mean(bals)) if bals else None,
+            "balanced_accuracy_std": float(np.std(bals)) if bals else None,
+        },
+        "lomo": {"splits": lomo},
+        "timings": {
+            "n_jobs": n_jobs,
+            "threads_per_worker": threads_per_worker,
+            "wall_seconds": time.perf_counter() - t_start,
+            "sum_fit_seconds": float(sum(r["fit_seconds"] for r in results)),
+            "max_fit_seconds": float(max((r["fit_seconds"] for r in results), default=0.0)),
+            "cached_models": int(sum(r["cache_hits"]["model"] for r in results)),
+            "cached_preprocessors": int(sum(r["cache_hits"]["preprocessor"] for r in results)),
+        },
+    }
+
+
+def save_report(report: dict, path: str) -> str:
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    return path
@@ -3,20 +3,14 @@
 # Requirements:
 #   pip install astroquery astropy pandas scikit-learn numpy
 
+#
+# astroquery et scikit-learn sont importés dans les fonctions qui s'en servent : l'API n'utilise
+# que les constantes et load_model (un artefact se charge sans scikit-learn).
+
 import os
 import numpy as np
 import pandas as pd
 
-from astroquery.nasa_exoplanet_archive import NasaExoplanetArchive
-from sklearn.compose import ColumnTransformer
-from sklearn.pipeline import Pipeline
-from sklearn.preprocessing import OneHotEncoder, StandardScaler
-from sklearn.impute import SimpleImputer
-from sklearn.ensemble import HistGradientBoostingClassifier
-from sklearn.metrics import f1_score, balanced_accuracy_score, classification_report, confusion_matrix
-from sklearn.model_selection import StratifiedGroupKFold
-from sklearn.utils.class_weight import compute_sample_weight
-
 
 # --------------------------
 # 1) UTILITAIRES DOWNLOAD
@@ -34,6 +28,8 @@ def df_from_table(table):
 
 
 def fetch_koi():
+    from astroquery.nasa_exoplanet_archive import NasaExoplanetArchive
+
     t = NasaExoplanetArchive.query_criteria(
         table="koi",
         select="kepid, kepoi_name, koi_disposition, koi_period, koi_duration, koi_depth, koi_model_snr, "
@@ -142,206 +138,88 @@ def fetch_toi():
     return df
 
 
+CATALOG_FETCHERS = {"koi": fetch_koi, "k2": fetch_k2, "toi": fetch_toi}
+
+
+def load_catalog(name, store=None, snapshot_id=None, cache=None, max_age=None):
+    """
+    Catalogue `name` ('koi', 'k2', 'toi') depuis un snapshot épinglé ; sinon téléchargé depuis
+    l'archive NASA puis enregistré comme nouveau snapshot. Renvoie (df, snapshot_id).
+    `cache` (StageCache) : un téléchargement de moins de `max_age` secondes est réutilisé.
+    """
+    from classifiers.snapshot_store import SnapshotStore
+
+    store = store or SnapshotStore()
+    if snapshot_id:
+        return store.read(snapshot_id), snapshot_id
+    fetcher = CATALOG_FETCHERS[name]
+    if cache is not None:
+        from classifiers.stage_cache import code_version
+        key = cache.key("fetch", name, code=code_version(fetcher, df_from_table))
+        df = cache.get_or_compute("fetch", key, fetcher, max_age=max_age)
+    else:
+        df = fetcher()
+    return df, store.put(name, df, source="nasa_exoplanet_archive")
+
+
 # --------------------------
 # 2) HARMONISATION
 # --------------------------
 
+# Colonnes, conversions d'unités et vocabulaires de labels : classifiers.mission_schema.MISSION_SCHEMAS
+
 def harmonize_koi(df):
-    return pd.DataFrame({
-        "object_id": df.get("kepoi_name", df.index.astype(str)),
-        "mission": "KEPLER",
-        "star_id": df.get("kepid"),
-        "period": df.get("koi_period"),
-        "duration": df.get("koi_duration"),
-        "depth": df.get("koi_depth"),
-        "snr": df.get("koi_model_snr"),
-        "st_teff": df.get("koi_steff"),
-        "st_logg": df.get("koi_slogg"),
-        "st_rad": df.get("koi_srad"),
-        "mag": df.get("koi_kepmag"),
-        "fpflag_nt": df.get("koi_fpflag_nt"),
-        "fpflag_ss": df.get("koi_fpflag_ss"),
-        "fpflag_co": df.get("koi_fpflag_co"),
-        "fpflag_ec": df.get("koi_fpflag_ec"),
-        "label_raw": df.get("koi_disposition"),
-    })
+    from classifiers.mission_schema import harmonize
+    return harmonize(df, "koi")
 
 
 def harmonize_k2(df):
-    return pd.DataFrame({
-        "object_id": df.get("object_id").astype(str),
-        "mission": "K2",
-        "star_id": df.get("star_id").astype(str),
-        "period": df.get("period"),
-        "duration": df.get("duration_h"),
-        "depth": df.get("depth"),
-        "snr": df.get("snr"),
-        "st_teff": df.get("st_teff"),
-        "st_logg": df.get("st_logg"),
-        "st_rad": df.get("st_rad"),
-        "mag": df.get("mag"),
-        "fpflag_nt": df.get("fpflag_nt"),
-        "fpflag_ss": df.get("fpflag_ss"),
-        "fpflag_co": df.get("fpflag_co"),
-        "fpflag_ec": df.get("fpflag_ec"),
-        "label_raw": df.get("Archive_Disposition"),
-    })
-
+    from classifiers.mission_schema import harmonize
+    return harmonize(df, "k2")
 
 
 def harmonize_toi(df):
-    def map_toi_label(x):
-        if pd.isna(x):
-            return None
-        x = str(x).upper()
-        if x in {"KP", "CP", "CONFIRMED"}:
-            return "CONFIRMED"
-        if x in {"PC", "APC", "CANDIDATE"}:
-            return "CANDIDATE"
-        if x in {"FP", "FALSE POSITIVE"}:
-            return "FALSE POSITIVE"
-        return None
-
-    return pd.DataFrame({
-        "object_id": df.get("toi").astype(str),
-        "mission": "TESS",
-        "star_id": df.get("TIC_ID"),
-        "period": df.get("Period_days"),
-        "duration": df.get("Duration_hours"),
-        "depth": df.get("Depth_ppm"),
-        "snr": df.get("SNR"),
-        "st_teff": df.get("st_teff"),
-        "st_logg": df.get("st_logg"),
-        "st_rad": df.get("st_rad"),
-        "mag": df.get("TESS_Mag"),
-        "fpflag_nt": df.get("fpflag_nt"),
-        "fpflag_ss": df.get("fpflag_ss"),
-        "fpflag_co": df.get("fpflag_co"),
-        "fpflag_ec": df.get("fpflag_ec"),
-        "label_raw": df.get("TFOPWG_Disposition").map(map_toi_label),
-    })
+    from classifiers.mission_schema import harmonize
+    return harmonize(df, "toi")
 
 
 # --------------------------
 # 3) PIPELINE ML
 # --------------------------
 
-def run_classifier(harm):
-    from sklearn.preprocessing import QuantileTransformer, OneHotEncoder
-    from sklearn.compose import ColumnTransformer
-    from sklearn.pipeline import Pipeline
-    from sklearn.impute import SimpleImputer
-    from sklearn.ensemble import HistGradientBoostingClassifier
-    from sklearn.metrics import f1_score, balanced_accuracy_score
-    from sklearn.model_selection import StratifiedGroupKFold
-    from sklearn.utils.class_weight import compute_sample_weight
-
-    label_map = {"CONFIRMED": 2, "CANDIDATE": 1, "FALSE POSITIVE": 0}
-    harm = harm[harm["label_raw"].isin(label_map.keys())].copy()
-    harm["label"] = harm["label_raw"].map(label_map).astype(int)
-
-    for c in ["period", "duration", "depth"]:
-        if c in harm.columns:
-            harm.loc[(~harm[c].isna()) & (harm[c].astype(float) <= 0), c] = np.nan
-
-    base_num_cols = [
-        "period", "duration", "depth", "snr",
-        "st_teff", "st_logg", "st_rad", "mag",
-        "fpflag_nt", "fpflag_ss", "fpflag_co", "fpflag_ec",
-    ]
-
-    eps = 1e-6
-    harm["log_period"]          = np.log10(harm["period"].astype(float) + eps)
-    harm["log_duration_h"]      = np.log10(harm["duration"].astype(float) + eps)
-    harm["log_depth_ppm"]       = np.log10(harm["depth"].astype(float) + eps)
-    harm["depth_over_duration"] = harm["depth"].astype(float) / (harm["duration"].astype(float) + eps)
-
-    derived_cols = ["log_period", "log_duration_h", "log_depth_ppm", "depth_over_duration"]
-    base_num_cols = [c for c in base_num_cols if c in harm.columns]
-    all_num_cols = base_num_cols + derived_cols
-
-    cat_cols = ["mission"]
-
-    y = harm["label"].values
-    groups_star = harm["star_id"].astype(str).values
-    groups_mission = harm["mission"].values
-
-    clf = HistGradientBoostingClassifier(
-        learning_rate=0.08,
-        max_iter=500,
-        max_leaf_nodes=31,
-        early_stopping=True,
-        random_state=42
-    )
-
-    cv = StratifiedGroupKFold(n_splits=5, shuffle=True, random_state=42)
-    f1s, bals = [], []
-
-    for fold, (tr, te) in enumerate(cv.split(harm, y, groups_star), 1):
-        df_tr = harm.iloc[tr].copy()
-        df_te = harm.iloc[te].copy()
-
-        num_cols_fit = [c for c in all_num_cols if df_tr[c].notna().any()]
-        pre = ColumnTransformer([
-            ("num", Pipeline([
-                ("imp", SimpleImputer(strategy="median")),
-                ("qt",  QuantileTransformer(output_distribution="normal",
-                                            subsample=200_000, random_state=42)),
-            ]), num_cols_fit),
-            ("cat", Pipeline([
-                ("imp", SimpleImputer(strategy="most_frequent")),
-                ("oh", OneHotEncoder(handle_unknown="ignore"))
-            ]), cat_cols),
-        ])
-
-        pipe = Pipeline([("pre", pre), ("clf", clf)])
-        sw = compute_sample_weight(class_weight="balanced", y=y[tr])
-        pipe.fit(df_tr[num_cols_fit + cat_cols], y[tr], clf__sample_weight=sw)
-        y_hat = pipe.predict(df_te[num_cols_fit + cat_cols])
-
-        f1s.append(f1_score(y[te], y_hat, average="macro"))
-        bals.append(balanced_accuracy_score(y[te], y_hat))
-        print(f"[Fold {fold}] F1-macro={f1s[-1]:.3f}, BalAcc={bals[-1]:.3f}")
-
-    print(f"\nCV results: F1-macro={np.mean(f1s):.3f}±{np.std(f1s):.3f}, "
-          f"BalAcc={np.mean(bals):.3f}±{np.std(bals):.3f}")
-
-    # ---------- Leave-One-Mission-Out () ----------
-    print("\nLeave-One-Mission-Out:")
-    for m in np.unique(groups_mission):
-        tr_idx = np.where(groups_mission != m)[0]
-        te_idx = np.where(groups_mission == m)[0]
-        if len(te_idx) < 50:
-            continue
-
-        df_tr = harm.iloc[tr_idx].copy()
-        df_te = harm.iloc[te_idx].copy()
+def run_classifier(harm, n_jobs=None, cache=None):
+    """
+    CV (StratifiedGroupKFold par étoile) + Leave-One-Mission-Out.
+    Tous les fits tournent en parallèle via classifiers.evaluation ; retourne le rapport JSON.
+    """
+    from classifiers.evaluation import evaluate
 
-        num_cols_fit = [c for c in all_num_cols if df_tr[c].notna().any()]
+    report = evaluate(harm, n_jobs=n_jobs, cache=cache)
 
-        pre = ColumnTransformer([
-            ("num", Pipeline([
-                ("imp", SimpleImputer(strategy="median")),
-                ("qt",  QuantileTransformer(output_distribution="normal",
-                                            subsample=200_000, random_state=42)),
-            ]), num_cols_fit),
-        ])
+    for r in report["cv"]["folds"]:
+        print(f"[{r['name']}] F1-macro={r['f1_macro']:.3f}, BalAcc={r['balanced_accuracy']:.3f} "
+              f"(fit {r['fit_seconds']:.1f}s)")
 
-        pipe = Pipeline([("pre", pre), ("clf", clf)])
-        sw = compute_sample_weight(class_weight="balanced", y=y[tr_idx])
+    cv = report["cv"]
+    print(f"\nCV results: F1-macro={cv['f1_macro_mean']:.3f}±{cv['f1_macro_std']:.3f}, "
+          f"BalAcc={cv['balanced_accuracy_mean']:.3f}±{cv['balanced_accuracy_std']:.3f}")
 
-        pipe.fit(df_tr[num_cols_fit], y[tr_idx], clf__sample_weight=sw)
-        y_hat = pipe.predict(df_te[num_cols_fit])
+    # ---------- Leave-One-Mission-Out () ----------
+    print("\nLeave-One-Mission-Out:")
+    for r in report["lomo"]["splits"]:
+        m = r["name"]
+        print(f"Train≠{m} → Test={m}: F1-macro={r['f1_macro']:.3f}, BalAcc={r['balanced_accuracy']:.3f}")
 
-        f1 = f1_score(y[te_idx], y_hat, average="macro")
-        bal = balanced_accuracy_score(y[te_idx], y_hat)
-        print(f"Train≠{m} → Test={m}: F1-macro={f1:.3f}, BalAcc={bal:.3f}")
+    t = report["timings"]
+    print(f"\nEvaluation wall time: {t['wall_seconds']:.1f}s on {t['n_jobs']} workers "
+          f"(sum of fits {t['sum_fit_seconds']:.1f}s, slowest fit {t['max_fit_seconds']:.1f}s, "
+          f"{t['cached_models']} fold models from cache)")
+    return report
 
 # --------------------------
 # 3bis) INFÉRENCE (entraîner tout + sauvegarder, puis charger et prédire)
 # --------------------------
 from pathlib import Path
-import joblib
 
 LABEL_MAP = {"CONFIRMED": 2, "CANDIDATE": 1, "FALSE POSITIVE": 0}
 INV_LABEL_MAP = {v: k for k, v in LABEL_MAP.items()}
@@ -351,18 +229,25 @@ BASE_NUM_COLS_ALL = [
     "st_teff","st_logg","st_rad","mag",
     "fpflag_nt","fpflag_ss","fpflag_co","fpflag_ec",
 ]
+DERIVED_COLS = ["log_period", "log_duration_h", "log_depth_ppm", "depth_over_duration"]
 CAT_COLS = ["mission"]
 
+HGB_PARAMS = {
+    "learning_rate": 0.08,
+    "max_iter": 500,
+    "max_leaf_nodes": 31,
+    "early_stopping": True,
+    "random_state": 42,
+}
+
 def _feature_engineering(df: pd.DataFrame) -> pd.DataFrame:
-    eps = 1e-6
+    """Copie de `df` avec period/duration/depth nettoyés et les features dérivées (classifiers.features)."""
+    from classifiers.features import compute_features, feature_names, POSITIVE_COLS
+    base_cols = [c for c in POSITIVE_COLS if c in df.columns]
+    block = compute_features(df, base_cols)
     df = df.copy()
-    for c in ["period","duration","depth"]:
-        if c in df.columns:
-            df.loc[(~df[c].isna()) & (df[c].astype(float) <= 0), c] = np.nan
-    df["log_period"]          = np.log10(df["period"].astype(float)   + eps)
-    df["log_duration_h"]      = np.log10(df["duration"].astype(float) + eps)
-    df["log_depth_ppm"]       = np.log10(df["depth"].astype(float)    + eps)
-    df["depth_over_duration"] = df["depth"].astype(float) / (df["duration"].astype(float) + eps)
+    for j, c in enumerate(feature_names(base_cols)):
+        df[c] = block[:, j]
     return df
 
 def _build_preprocessor(num_cols_fit, cat_cols):
@@ -384,40 +269,67 @@ def _build_preprocessor(num_cols_fit, cat_cols):
 
 def train_final_model_and_save(harm: pd.DataFrame,
                                model_dir: str = "models",
-                               model_name: str = "exoplanet_hgb.pkl") -> str:
-    Path(model_dir).mkdir(parents=True, exist_ok=True)
-    df = harm[harm["label_raw"].isin(LABEL_MAP.keys())].copy()
-    df["label"] = df["label_raw"].map(LABEL_MAP).astype(int)
-
-    # colonnes numériques réellement dispo dans le jeu
-    base_num_cols = [c for c in BASE_NUM_COLS_ALL if c in df.columns]
-
-    # features dérivées (identiques à run_classifier)
-    df = _feature_engineering(df)
-    derived_cols = ["log_period","log_duration_h","log_depth_ppm","depth_over_duration"]
-    all_num_cols = [c for c in (base_num_cols + derived_cols) if c in df.columns]
+                               model_name: str = "exoplanet_hgb.pkl",
+                               snapshot_ids: dict = None,
+                               hgb_params: dict = None,
+                               lineage: dict = None,
+                               cache=None) -> str:
+    from classifiers.design_matrix import get_design_matrix
 
-    pre = _build_preprocessor(all_num_cols, CAT_COLS)
-
-    clf = HistGradientBoostingClassifier(
-        learning_rate=0.08, max_iter=500, max_leaf_nodes=31,
-        early_stopping=True, random_state=42
-    )
-    pipe = Pipeline([("pre", pre), ("clf", clf)])
+    Path(model_dir).mkdir(parents=True, exist_ok=True)
 
-    sw = compute_sample_weight(class_weight="balanced", y=df["label"].values)
-    pipe.fit(df[all_num_cols + CAT_COLS], df["label"].values, clf__sample_weight=sw)
+    # matrice float32 partagée avec run_classifier (mêmes features dérivées, calculées une fois)
+    dm = get_design_matrix(harm, cache=cache)
+    all_num_cols = dm.feature_names
+    hgb_params = {**HGB_PARAMS, **(hgb_params or {})}
+
+    def fit():
+        from sklearn.ensemble import HistGradientBoostingClassifier
+        from sklearn.pipeline import Pipeline
+        from sklearn.utils.class_weight import compute_sample_weight
+
+        y = dm.y.astype(int)
+        pipe = Pipeline([("pre", _build_preprocessor(all_num_cols, CAT_COLS)),
+                         ("clf", HistGradientBoostingClassifier(**hgb_params))])
+        sw = compute_sample_weight(class_weight="balanced", y=y)
+        return pipe.fit(dm.frame(), y, clf__sample_weight=sw)
+
+    if cache is not None:
+        from classifiers.stage_cache import code_version
+        key = cache.key("final_model", dm, params=hgb_params,
+                        code=code_version(train_final_model_and_save, _build_preprocessor))
+        pipe = cache.get_or_compute("final_model", key, fit)
+    else:
+        pipe = fit()
 
     out_path = str(Path(model_dir) / model_name)
+    return save_bundle(pipe, all_num_cols, out_path, snapshot_ids=snapshot_ids, hgb_params=hgb_params,
+                       lineage=lineage or {"version": 1, "parent": None, "mode": "full_fit",
+                                           "n_train": len(dm)})
+
+def save_bundle(pipe, all_num_cols, out_path, snapshot_ids=None, hgb_params=None, lineage=None,
+                cat_cols=None, label_map=None) -> str:
+    """Format bundle dict lu par load_model (pipeline + colonnes + métadonnées d'entraînement)."""
+    import joblib
     joblib.dump({
         "pipeline": pipe,
         "all_num_cols": all_num_cols,
-        "cat_cols": CAT_COLS,
-        "label_map": LABEL_MAP,
+        "cat_cols": cat_cols or CAT_COLS,
+        "label_map": label_map or LABEL_MAP,
+        "snapshot_ids": snapshot_ids or {},
+        "hgb_params": hgb_params,
+        "lineage": lineage,
     }, out_path)
-    return out_path
+    return str(out_path)
 
 def load_model(model_path: str):
+    # Artefact répertoire (manifest JSON + .npy mappés en mémoire, sans pickle)
+    from classifiers.artifact import is_artifact, load_artifact
+    if is_artifact(model_path):
+        model = load_artifact(model_path)
+        return model, model.meta["all_num_cols"], model.meta["cat_cols"], model.meta["label_map"]
+
+    import joblib
     bundle = joblib.load(model_path)
     
     # Handle both dict format (new) and tuple format (old)
@@ -433,58 +345,168 @@ def load_model(model_path: str):
         raise ValueError(f"Unknown model format: {type(bundle)} with {len(bundle) if hasattr(bundle, '__len__') else 'no length'} elements")
 
 def predict_from_df(model, all_num_cols, cat_cols, df_new: pd.DataFrame) -> pd.DataFrame:
-    dfX = _feature_engineering(df_new)
-    for c in set(all_num_cols + cat_cols):
-        if c not in dfX.columns:
-            dfX[c] = np.nan
-    proba = model.predict_proba(dfX[all_num_cols + cat_cols])
-    pred  = model.predict(dfX[all_num_cols + cat_cols]).astype(int)
-    labels = pd.Series(pred).map(INV_LABEL_MAP)
-    out = df_new.copy()
-    out["pred_label"] = labels.values
-    out["p_FALSE_POSITIVE"] = proba[:, LABEL_MAP["FALSE POSITIVE"]]
-    out["p_CANDIDATE"]      = proba[:, LABEL_MAP["CANDIDATE"]]
-    out["p_CONFIRMED"]      = proba[:, LABEL_MAP["CONFIRMED"]]
-    return out
+    from classifiers.inference import predict_frame
+    return predict_frame(model, all_num_cols, cat_cols, df_new)
 
 # --------------------------
 # 4) MAIN
 # --------------------------
 if __name__ == "__main__":
-    os.makedirs("data", exist_ok=True)
-
-    print("Fetching NASA catalogs via astroquery...")
-    koi_df = fetch_koi()
-    k2_df  = fetch_k2()
-    toi_df = fetch_toi()
+    import sys
+    # permet `python classifiers/exoplanet_classifier.py` (imports classifiers.*)
+    sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+    import argparse
+    from classifiers.snapshot_store import SnapshotStore
+
+    parser = argparse.ArgumentParser(description="Fetch, harmonize, evaluate and train the exoplanet classifier.")
+    parser.add_argument("--snapshot-dir", default="data/snapshots",
+                        help="Local snapshot store (stands in for the NASA archive when pinned/offline)")
+    parser.add_argument("--pin", action="append", default=[], metavar="CATALOG=SNAPSHOT_ID",
+                        help="Use a stored snapshot for koi/k2/toi instead of querying the archive")
+    parser.add_argument("--offline", action="store_true",
+                        help="Use the latest local snapshot of every catalog (no network)")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Re-harmonize only rows changed since the last stored harmonized state")
+    parser.add_argument("--retrain-from", default=None, metavar="BUNDLE",
+                        help="Warm-start a new bundle version from BUNDLE (full refit if drift check fails)")
+    parser.add_argument("--drift-threshold", type=float, default=0.1,
+                        help="Max per-feature KS statistic tolerated to keep the fitted preprocessor")
+    parser.add_argument("--search", action="store_true",
+                        help="Run a successive-halving HGB search before the final fit and use its winner")
+    parser.add_argument("--search-budget", type=float, default=None, metavar="SECONDS",
+                        help="Wall-clock budget of the search")
+    parser.add_argument("--search-checkpoint", default="models/hgb_search.jsonl",
+                        help="Trial log; an interrupted search resumes from it")
+    parser.add_argument("--out-of-core", default=None, metavar="SOURCE",
+                        help="Train in bounded memory from a harmonized Parquet file/dir or snapshot ID")
+    parser.add_argument("--batch-size", type=int, default=100_000,
+                        help="Rows per streamed batch (--out-of-core)")
+    parser.add_argument("--max-train-rows", type=int, default=1_000_000,
+                        help="Reservoir size the classifier is fitted on (--out-of-core)")
+    parser.add_argument("--cache-dir", default="data/cache",
+                        help="Content-addressed stage cache (fetch, harmonize, features, fold fits, final fit)")
+    parser.add_argument("--cache-max-gb", type=float, default=2.0,
+                        help="Size bound of the stage cache (least recently used entries evicted)")
+    parser.add_argument("--no-cache", action="store_true", help="Recompute every stage")
+    parser.add_argument("--fetch-max-age", type=float, default=24.0, metavar="HOURS",
+                        help="Reuse a cached archive download younger than this")
+    args = parser.parse_args()
 
-    koi_df.to_csv("data/cumulative_koi.csv", index=False)
-    k2_df.to_csv("data/k2planets.csv", index=False)
-    toi_df.to_csv("data/toi.csv", index=False)
+    os.makedirs("data", exist_ok=True)
+    store = SnapshotStore(args.snapshot_dir)
+
+    if args.out_of_core:
+        from classifiers.out_of_core import harmonized_batches, train_out_of_core
+        from classifiers.artifact import convert_bundle
+        print(f"Out-of-core training from {args.out_of_core}...")
+        source_id = {} if os.path.exists(args.out_of_core) else {"harmonized": args.out_of_core}
+        model_path = train_out_of_core(harmonized_batches(args.out_of_core, args.batch_size, store),
+                                       max_train_rows=args.max_train_rows, snapshot_ids=source_id)
+        print(f"Model saved to: {model_path}")
+        print(f"Memory-mappable artifact saved to: {convert_bundle(model_path)}")
+        sys.exit(0)
+
+    from classifiers.stage_cache import StageCache, code_version
+    cache = None if args.no_cache else StageCache(args.cache_dir, int(args.cache_max_gb * 1024 ** 3))
+    fetch_max_age = args.fetch_max_age * 3600
+
+    pins = dict(p.split("=", 1) for p in args.pin)
+    if args.offline:
+        for name in CATALOG_FETCHERS:
+            pins.setdefault(name, store.latest(name))
+
+    print("Loading NASA catalogs (pinned snapshots or astroquery)...")
+    koi_df, koi_id = load_catalog("koi", store, pins.get("koi"), cache, fetch_max_age)
+    k2_df, k2_id   = load_catalog("k2", store, pins.get("k2"), cache, fetch_max_age)
+    toi_df, toi_id = load_catalog("toi", store, pins.get("toi"), cache, fetch_max_age)
+    snapshot_ids = {"koi": koi_id, "k2": k2_id, "toi": toi_id}
+    print(f"Snapshots: {snapshot_ids}")
 
     print("Harmonizing...")
-    harm = pd.concat([
-        harmonize_koi(koi_df),
-        harmonize_k2(k2_df),
-        harmonize_toi(toi_df)
-    ], ignore_index=True)
-
-    num_cols_all = harm.select_dtypes(include=[np.number]).columns
-    nan_ratio = harm[num_cols_all].isna().mean()
-    cols_to_drop = nan_ratio[nan_ratio > 0.95].index.tolist()
+    from classifiers.incremental import incremental_harmonize, live_rows
+
+    state_id = None
+    if args.incremental and store.list("harmonized_state"):
+        state_id = store.latest("harmonized_state")
+
+    def harmonize_all():
+        state = store.read(state_id) if state_id else None
+        deltas = []
+        for name, raw in (("koi", koi_df), ("k2", k2_df), ("toi", toi_df)):
+            state, delta = incremental_harmonize(state, name, raw)
+            deltas.append(delta)
+        return state, pd.concat(deltas, ignore_index=True)
+
+    # snapshot IDs = hash du contenu : ils suffisent comme clé des entrées brutes
+    harm_key = None
+    if cache is not None:
+        harm_key = cache.key("harmonize", state_id, snapshot_ids,
+                             code=code_version("classifiers.mission_schema", "classifiers.incremental"))
+        state, delta = cache.get_or_compute("harmonize", harm_key, harmonize_all)
+    else:
+        state, delta = harmonize_all()
+    print(f"Harmonization delta: {delta['change'].value_counts().to_dict()}")
+    store.put("harmonized_state", state, source=",".join(snapshot_ids.values()))
+    snapshot_ids["harmonized_delta"] = store.put("harmonized_delta", delta)
+
+    def drop_empty_columns(max_nan_ratio=0.95):
+        harm = live_rows(state)
+        num_cols_all = harm.select_dtypes(include=[np.number]).columns
+        nan_ratio = harm[num_cols_all].isna().mean()
+        cols_to_drop = nan_ratio[nan_ratio > max_nan_ratio].index.tolist()
+        return harm.drop(columns=cols_to_drop), cols_to_drop
+
+    if cache is not None:
+        harm, cols_to_drop = cache.get_or_compute(
+            "nan_drop", cache.key("nan_drop", harm_key, params={"max_nan_ratio": 0.95},
+                                  code=code_version(live_rows)),
+            drop_empty_columns)
+    else:
+        harm, cols_to_drop = drop_empty_columns()
     if cols_to_drop:
         print(f"[Info] Dropping quasi-empty numeric columns (>95% NaN): {cols_to_drop}")
-        harm.drop(columns=cols_to_drop, inplace=True)
 
-    harm.to_csv("data/exoplanets_harmonized.csv", index=False)
+    snapshot_ids["harmonized"] = store.put("harmonized", harm, source=",".join(snapshot_ids.values()))
 
     print(f"Harmonized dataset shape: {harm.shape}")
     print(harm["label_raw"].value_counts())
 
     print("\nRunning classifier (CV)...")
-    run_classifier(harm)
+    report = run_classifier(harm, cache=cache)
+
+    from classifiers.evaluation import save_report
+    print(f"Evaluation report saved to: {save_report(report, 'data/evaluation_report.json')}")
+
+    hgb_params = None
+    if args.search:
+        from classifiers.search import successive_halving, save_best_params
+        print("\nHyperparameter search (successive halving)...")
+        result = successive_halving(harm, budget_seconds=args.search_budget,
+                                    checkpoint=args.search_checkpoint)
+        hgb_params = result["best_params"]
+        print(f"Best F1-macro={result['best_score']} with {hgb_params} "
+              f"({'complete' if result['completed'] else 'budget exhausted'}, "
+              f"{result['wall_seconds']:.0f}s)")
+        if hgb_params:
+            print(f"Best parameters saved to: {save_best_params(result)}")
+
+    if args.retrain_from:
+        from classifiers.retrain import incremental_retrain
+        print(f"\nIncremental retrain from {args.retrain_from}...")
+        lineage = incremental_retrain(harm, args.retrain_from, drift_threshold=args.drift_threshold,
+                                      snapshot_ids=snapshot_ids)
+        print(f"Model v{lineage['version']} ({lineage['mode']}) saved to: {lineage['path']}")
+        model_path = lineage["path"]
+    else:
+        # >>> NOUVEAU : entraînement final + sauvegarde du pipeline complet
+        print("\nTraining final model for inference and saving it...")
+        model_path = train_final_model_and_save(harm, snapshot_ids=snapshot_ids, hgb_params=hgb_params,
+                                                cache=cache)
+        print(f"Model saved to: {model_path}")
+
+    from classifiers.artifact import convert_bundle
+    print(f"Memory-mappable artifact saved to: {convert_bundle(model_path)}")
 
-    # >>> NOUVEAU : entraînement final + sauvegarde du pipeline complet
-    print("\nTraining final model for inference and saving it...")
-    model_path = train_final_model_and_save(harm)
-    print(f"Model saved to: {model_path}")
\ No newline at end of file
+    if cache is not None:
+        print(f"Stage cache ({cache.size() / 1024 ** 2:.0f} MB in {cache.root}): {cache.stats}")
@@ -0,0 +1,105 @@
+# features.py
+# Noyau de features partagé par l'entraînement et le service.
+#
+# Travaille sur des colonnes NumPy contiguës : les colonnes de base nettoyées (period, duration,
+# depth <= 0 → NaN) et les quatre features dérivées sont écrites en une passe dans un buffer de
+# sortie préalloué, sans DataFrame intermédiaire. Les dérivées sont calculées en float64 quel que
+# soit le dtype du buffer (float32 pour la matrice de design, float64 pour l'inférence).
+
+import numpy as np
+import pandas as pd
+
+from classifiers.exoplanet_classifier import BASE_NUM_COLS_ALL, DERIVED_COLS
+
+FEATURE_EPS = 1e-6
+POSITIVE_COLS = ("period", "duration", "depth")
+
+
+def as_float64(col) -> np.ndarray:
+    """Colonne → float64 (vue sans copie si elle l'est déjà) ; non numérique / NA → NaN."""
+    if isinstance(col, np.ndarray) and col.dtype == np.float64:
+        return col
+    if isinstance(col, (pd.Series, pd.Index)) or pd.api.types.is_extension_array_dtype(col):
+        return pd.to_numeric(col, errors="coerce").to_numpy(dtype=np.float64, na_value=np.nan)
+    arr = np.asarray(col)
+    if arr.dtype.kind in "fiub":
+        return arr.astype(np.float64, copy=False)
+    return pd.to_numeric(pd.Series(arr), errors="coerce").to_numpy(dtype=np.float64, na_value=np.nan)
+
+
+def _get(data, name):
+    if hasattr(data, "columns"):
+        return data[name] if name in data.columns else None
+    return data.get(name)
+
+
+def _n_rows(data) -> int:
+    if hasattr(data, "columns"):
+        return len(data)
+    return len(np.asarray(next(iter(data.values())))) if data else 0
+
+
+def feature_names(base_cols=None) -> list:
+    return list(BASE_NUM_COLS_ALL if base_cols is None else base_cols) + DERIVED_COLS
+
+
+def compute_features(data, base_cols=None, out: np.ndarray = None, dtype=np.float64) -> np.ndarray:
+    """
+    Écrit dans `out` (n, len(base_cols) + 4) les colonnes de base nettoyées puis log_period,
+    log_duration_h, log_depth_ppm, depth_over_duration. `data` : DataFrame ou dict colonne → tableau ;
+    une colonne absente vaut NaN. Alloue `out` (ordre Fortran, colonnes contiguës) s'il n'est pas fourni.
+    """
+    base_cols = list(BASE_NUM_COLS_ALL if base_cols is None else base_cols)
+    n = _n_rows(data)
+    if out is None:
+        out = np.empty((n, len(base_cols) + len(DERIVED_COLS)), dtype=dtype, order="F")
+
+    cleaned = {}
+    for j, c in enumerate(base_cols):
+        col = _get(data, c)
+        if col is None:
+            out[:, j] = np.nan
+            continue
+        x = as_float64(col)
+        if c in POSITIVE_COLS:
+            x = np.where(x > 0, x, np.nan)  # NaN > 0 est faux : NaN conservés
+            cleaned[c] = x
+        out[:, j] = x
+
+    nan = np.full(n, np.nan)
+    period, duration, depth = (cleaned.get(c, nan) for c in POSITIVE_COLS)
+    k = len(base_cols)
+    tmp = np.empty(n, dtype=np.float64)  # seul temporaire, réutilisé pour les quatre dérivées
+    for j, x in enumerate((period, duration, depth)):
+        np.add(x, FEATURE_EPS, out=tmp)
+        np.log10(tmp, out=tmp)
+        out[:, k + j] = tmp
+    np.add(duration, FEATURE_EPS, out=tmp)
+    np.divide(depth, tmp, out=tmp)
+    out[:, k + 3] = tmp
+    return out
+
+
+def feature_frame(data, all_num_cols: list, cat_cols: list) -> pd.DataFrame:
+    """
+    Entrée du pipeline sauvegardé (all_num_cols + cat_cols) construite par le noyau : un seul bloc
+    float64, sans copie, plus les colonnes catégorielles telles quelles (NaN si absentes). None y
+    devient NaN : pour SimpleImputer seul NaN est manquant, None serait une catégorie inconnue
+    (one-hot nul) et le Pipeline divergerait du modèle compilé et du cache de prédictions.
+    """
+    base_cols = [c for c in all_num_cols if c not in DERIVED_COLS]
+    names = feature_names(base_cols)
+    block = compute_features(data, base_cols)
+    X = pd.DataFrame(block, columns=names, copy=False)
+    if names != list(all_num_cols):
+        X = X[list(all_num_cols)]
+    n = len(X)
+    for c in cat_cols:
+        col = _get(data, c)
+        if col is None:
+            X[c] = np.full(n, np.nan, dtype=object)
+            continue
+        values = np.asarray(col, dtype=object)
+        missing = pd.isna(values)
+        X[c] = np.where(missing, np.nan, values) if missing.any() else values
+    return X
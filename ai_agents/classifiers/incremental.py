@@ -0,0 +1,119 @@
+# incremental.py
+# Ré-harmonisation incrémentale, clé (mission, object_id).
+#
+# L'état harmonisé garde, pour chaque ligne, une clé source (object_id, complété par l'empreinte
+# de la ligne quand l'objet a plusieurs lignes), l'empreinte de la ligne brute et un tombstone. Un
+# nouveau snapshot de catalogue est comparé à cet état : seules les lignes insérées ou modifiées
+# repassent par harmonize_*, les objets disparus sont marqués supprimés, et le delta
+# (insert / update / delete) est renvoyé pour les étapes suivantes.
+
+import numpy as np
+import pandas as pd
+
+from classifiers.mission_schema import MISSION_SCHEMAS, apply_dtypes, catalog_missions, harmonize
+
+CATALOG_MISSIONS = catalog_missions()
+# Colonne brute d'où harmonize tire object_id
+SOURCE_KEYS = {catalog: s["object_id"] for catalog, s in MISSION_SCHEMAS.items()}
+
+STATE_COLS = ["row_key", "row_hash", "tombstone"]
+
+
+def row_keys(raw: pd.DataFrame, catalog: str, hashes: np.ndarray = None) -> pd.Series:
+    """
+    Clé stable par ligne brute : object_id quand il est unique dans le snapshot. Il ne l'est pas
+    partout (K2 : plusieurs lignes par hôte ou par solution) ; les lignes d'un object_id répété sont
+    alors distinguées par leur empreinte (row_hashes), pas par leur position, si bien que retirer ou
+    ajouter une ligne du groupe ne renomme pas les autres. Une ligne modifiée d'un tel groupe devient
+    un delete + insert ; des lignes identiques sont départagées par leur rang.
+    """
+    col = SOURCE_KEYS[catalog]
+    base = raw[col].astype(str) if col in raw.columns else pd.Series(raw.index.astype(str), index=raw.index)
+    repeated = base.duplicated(keep=False).to_numpy()
+    if not repeated.any():
+        return base
+    if hashes is None:
+        hashes = row_hashes(raw)
+    group = base[repeated]
+    digest = pd.Series([f"{h:016x}" for h in hashes[repeated]], index=group.index)
+    rank = digest.groupby([group, digest], sort=False).cumcount()
+    suffix = "#" + digest + np.where(rank > 0, "~" + rank.astype(str), "")
+    keys = base.copy()
+    keys[repeated] = group + suffix
+    return keys
+
+
+def row_hashes(raw: pd.DataFrame) -> np.ndarray:
+    """
+    Empreinte uint64 de chaque ligne brute. Les colonnes sont canonisées (float64 / texte) pour
+    qu'un même contenu donne la même empreinte, qu'il vienne d'astroquery ou d'un snapshot Parquet.
+    """
+    canon = {}
+    for c in sorted(raw.columns):
+        col = raw[c]
+        if pd.api.types.is_numeric_dtype(col) and not pd.api.types.is_bool_dtype(col):
+            canon[c] = col.astype("float64")
+        else:
+            canon[c] = col.astype("string")
+    return pd.util.hash_pandas_object(pd.DataFrame(canon), index=False).to_numpy()
+
+
+def _harmonize_rows(raw: pd.DataFrame, catalog: str, keys: pd.Series, hashes: np.ndarray) -> pd.DataFrame:
+    out = harmonize(raw, catalog).reset_index(drop=True)
+    out["row_key"] = keys.to_numpy()
+    out["row_hash"] = hashes
+    out["tombstone"] = False
+    return out
+
+
+def incremental_harmonize(state, catalog: str, raw: pd.DataFrame):
+    """
+    Met à jour l'état harmonisé `state` (None = premier passage) avec un nouveau snapshot brut de
+    `catalog` ('koi', 'k2', 'toi'). Renvoie (nouvel_état, delta) ; delta contient les lignes
+    harmonisées insérées/modifiées et les tombstones, avec une colonne `change`.
+    """
+    mission = CATALOG_MISSIONS[catalog]
+    raw = raw.reset_index(drop=True)
+    hashes = row_hashes(raw)
+    keys = row_keys(raw, catalog, hashes)
+
+    if state is None or len(state) == 0:
+        new_rows = _harmonize_rows(raw, catalog, keys, hashes)
+        delta = new_rows.assign(change="insert")
+        return new_rows, delta
+
+    # état relu depuis Parquet : types compacts rétablis pour que les concaténations les gardent
+    state = apply_dtypes(state)
+    in_mission = (state["mission"] == mission).to_numpy()
+    others = state.loc[~in_mission]
+    prev = state.loc[in_mission]
+    prev_live = prev.loc[~prev["tombstone"].astype(bool)]
+
+    # comparaison vectorisée des empreintes par clé
+    pos = pd.Index(prev_live["row_key"]).get_indexer(keys)
+    is_new = pos < 0
+    old = prev_live["row_hash"].to_numpy(dtype=np.uint64)[np.where(is_new, 0, pos)] if len(prev_live) else hashes
+    touched = is_new | (old != hashes)
+
+    changed_rows = _harmonize_rows(raw.loc[touched], catalog, keys[touched], hashes[touched])
+    changed_rows["change"] = np.where(is_new[touched], "insert", "update")
+
+    new_keys = set(keys.to_numpy())
+    touched_keys = set(keys[touched].to_numpy())
+    removed = prev_live.loc[~prev_live["row_key"].isin(new_keys)].copy()
+    removed["tombstone"] = True
+    removed["change"] = "delete"
+
+    kept = prev.loc[~prev["row_key"].isin(touched_keys) & ~prev["row_key"].isin(removed["row_key"])]
+    new_state = pd.concat(
+        [others, kept, changed_rows.drop(columns="change"), removed.drop(columns="change")],
+        ignore_index=True,
+    )
+    delta = pd.concat([changed_rows, removed], ignore_index=True)
+    return new_state, delta
+
+
+def live_rows(state: pd.DataFrame) -> pd.DataFrame:
+    """Jeu harmonisé utilisable pour l'entraînement : sans tombstones ni colonnes de suivi."""
+    live = state.loc[~state["tombstone"].astype(bool)]
+    return live.drop(columns=STATE_COLS).reset_index(drop=True)
@@ -0,0 +1,108 @@
+# inference.py
+# Moteur d'inférence unique, partagé par l'API et les scripts hors ligne.
+#
+# Le modèle n'est évalué qu'une fois par lot : predict_proba, puis le label est l'argmax des
+# probabilités (ce que fait predict() des classifieurs sklearn, sans second parcours des arbres).
+# Les sorties sont des tableaux par colonne (pred_label, p_FALSE_POSITIVE, p_CANDIDATE, p_CONFIRMED).
+# Pipelines HGB (bundle, artefact, CompiledModel) et ancien RandomForest à dummies mission_*
+# partagent ce chemin ; seule la construction de X diffère. Le calcul est découpé en trois étapes
+# chronométrables : features (construction de X), preprocess (imputation / quantiles / one-hot) et
+# trees (évaluation des arbres et probabilités).
+
+import time
+
+import numpy as np
+import pandas as pd
+
+from classifiers.exoplanet_classifier import LABEL_MAP
+from classifiers.features import _get, compute_features, feature_frame
+
+OUTPUT_LABELS = ["FALSE POSITIVE", "CANDIDATE", "CONFIRMED"]
+PROBA_COLS = ["p_" + w.replace(" ", "_") for w in OUTPUT_LABELS]
+OUTPUT_COLS = ["pred_label"] + PROBA_COLS
+
+
+def _norm(x) -> str:
+    return str(x).upper().replace("_", " ").strip()
+
+
+def class_labels(model, label_map: dict = None) -> np.ndarray:
+    """Label normalisé de chaque colonne de predict_proba (classes entières → label_map inversé)."""
+    label_map = label_map or LABEL_MAP
+    inv = {v: k for k, v in label_map.items()}
+    classes = getattr(model, "classes_", None)
+    if classes is None:
+        classes = sorted(inv)
+    return np.array([_norm(inv.get(c, c)) if not isinstance(c, str) else _norm(c) for c in classes],
+                    dtype=object)
+
+
+def _legacy_design(data, expected: list) -> pd.DataFrame:
+    # ancien modèle : dummies mission_* et valeurs manquantes à 0, comme à son entraînement
+    num_cols = [c for c in expected if c != "mission" and not c.startswith("mission_")]
+    block = np.nan_to_num(compute_features(data, num_cols)[:, :len(num_cols)], copy=False,
+                          nan=0.0, posinf=0.0, neginf=0.0)
+    X = dict(zip(num_cols, block.T))
+    n = len(block)
+    mission = _get(data, "mission")
+    if mission is not None:
+        codes, uniques = pd.factorize(pd.Series(np.asarray(mission, dtype=object)).astype(str).str.upper())
+        names = {f"mission_{u}": i for i, u in enumerate(uniques)}
+    for c in expected:
+        if c.startswith("mission_"):
+            X[c] = (codes == names[c]) if mission is not None and c in names else np.zeros(n, dtype=bool)
+    return pd.DataFrame(X, columns=expected)
+
+
+def design(model, all_num_cols: list, cat_cols: list, data):
+    """Entrée de `model` pour `data` (DataFrame ou dict colonne → tableau)."""
+    expected = list(getattr(model, "feature_names_in_", []))
+    if any(c.startswith("mission_") for c in expected):
+        return _legacy_design(data, expected)
+    return feature_frame(data, all_num_cols, cat_cols)
+
+
+def stages(model):
+    """(prétraitement, évaluation) de `model` ; prétraitement None quand le modèle n'en a pas."""
+    steps = getattr(model, "steps", None)
+    if steps is not None and len(steps) > 1:  # Pipeline sklearn : mêmes appels que predict_proba
+        return model[:-1].transform, steps[-1][1].predict_proba
+    if hasattr(model, "predict_proba_transformed"):  # CompiledModel
+        return model.transform, model.predict_proba_transformed
+    return None, model.predict_proba
+
+
+def predict_arrays(model, all_num_cols: list, cat_cols: list, data, label_map: dict = None,
+                   timings: dict = None) -> dict:
+    """
+    Prédictions de `data` en une évaluation du modèle : {"pred_label": tableau de labels,
+    "p_FALSE_POSITIVE" / "p_CANDIDATE" / "p_CONFIRMED": tableaux float64}.
+    `timings` (dict) reçoit la durée en secondes des étapes "features", "preprocess" et "trees".
+    """
+    preprocess, evaluate = stages(model)
+    t0 = time.perf_counter()
+    X = design(model, all_num_cols, cat_cols, data)
+    t1 = time.perf_counter()
+    if preprocess is not None:
+        X = preprocess(X)
+    t2 = time.perf_counter()
+    proba = np.asarray(evaluate(X), dtype=np.float64)
+    if timings is not None:
+        timings["features"] = t1 - t0
+        timings["preprocess"] = t2 - t1
+        timings["trees"] = time.perf_counter() - t2
+    labels = class_labels(model, label_map)
+    out = {"pred_label": labels[np.argmax(proba, axis=1)]}
+    index = {lab: j for j, lab in enumerate(labels)}
+    for w, col in zip(OUTPUT_LABELS, PROBA_COLS):
+        out[col] = proba[:, index[w]] if w in index else np.zeros(len(proba))
+    return out
+
+
+def predict_frame(model, all_num_cols: list, cat_cols: list, df_new: pd.DataFrame,
+                  label_map: dict = None) -> pd.DataFrame:
+    """Copie de `df_new` enrichie des colonnes OUTPUT_COLS."""
+    out = df_new.copy()
+    for col, values in predict_arrays(model, all_num_cols, cat_cols, df_new, label_map).items():
+        out[col] = values
+    return out
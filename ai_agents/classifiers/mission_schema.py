@@ -0,0 +1,167 @@
+# mission_schema.py
+# Registre déclaratif des schémas de mission et harmoniseur vectorisé unique.
+#
+# Chaque catalogue (koi, k2, toi) est décrit par une entrée de MISSION_SCHEMAS : colonne source de
+# chaque mesure (avec facteur de conversion d'unité éventuel), identifiants, colonne de disposition
+# et vocabulaire de labels. harmonize() applique ce schéma colonne par colonne, sans boucle par
+# ligne, et produit des types compacts : `mission` et `label_raw` catégoriels, mesures float32,
+# flags de faux positifs Int8 (entier nullable). Ajouter une mission = ajouter une entrée.
+
+import numpy as np
+import pandas as pd
+
+MEASURE_COLS = ["period", "duration", "depth", "snr", "st_teff", "st_logg", "st_rad", "mag"]
+FLAG_COLS = ["fpflag_nt", "fpflag_ss", "fpflag_co", "fpflag_ec"]
+HARMONIZED_COLS = ["object_id", "mission", "star_id"] + MEASURE_COLS + FLAG_COLS + ["label_raw"]
+
+_PASSTHROUGH = {"CONFIRMED": "CONFIRMED", "CANDIDATE": "CANDIDATE", "FALSE POSITIVE": "FALSE POSITIVE"}
+
+# columns : mesure harmonisée → colonne source, ou (colonne source, facteur multiplicatif)
+# labels : disposition source (insensible à la casse) → label harmonisé ; valeur absente → NaN
+MISSION_SCHEMAS = {
+    "koi": {
+        "mission": "KEPLER",
+        "object_id": "kepoi_name",
+        "star_id": "kepid",
+        "label": "koi_disposition",
+        "columns": {
+            "period": "koi_period",
+            "duration": "koi_duration",  # heures
+            "depth": "koi_depth",        # ppm
+            "snr": "koi_model_snr",
+            "st_teff": "koi_steff",
+            "st_logg": "koi_slogg",
+            "st_rad": "koi_srad",
+            "mag": "koi_kepmag",
+            "fpflag_nt": "koi_fpflag_nt",
+            "fpflag_ss": "koi_fpflag_ss",
+            "fpflag_co": "koi_fpflag_co",
+            "fpflag_ec": "koi_fpflag_ec",
+        },
+        "labels": {**_PASSTHROUGH, "NOT DISPOSITIONED": "NOT DISPOSITIONED"},
+    },
+    "k2": {
+        "mission": "K2",
+        "object_id": "object_id",  # construit par fetch_k2 (epic_hostname / k2_name / hostname)
+        "star_id": "star_id",
+        "label": "Archive_Disposition",
+        "columns": {
+            "period": "period",
+            "duration": ("duration_d", 24.0),  # jours → heures
+            "depth": "depth",
+            "st_teff": "st_teff",
+            "st_logg": "st_logg",
+            "st_rad": "st_rad",
+            "mag": "mag",
+        },
+        "labels": {**_PASSTHROUGH, "REFUTED": "REFUTED"},
+    },
+    "toi": {
+        "mission": "TESS",
+        "object_id": "toi",
+        "star_id": "TIC_ID",
+        "label": "TFOPWG_Disposition",
+        "columns": {
+            "period": "Period_days",
+            "duration": "Duration_hours",
+            "depth": "Depth_ppm",
+            "snr": "SNR",
+            "st_teff": "st_teff",
+            "st_logg": "st_logg",
+            "st_rad": "st_rad",
+            "mag": "TESS_Mag",
+        },
+        "labels": {
+            "KP": "CONFIRMED", "CP": "CONFIRMED", "CONFIRMED": "CONFIRMED",
+            "PC": "CANDIDATE", "APC": "CANDIDATE", "CANDIDATE": "CANDIDATE",
+            "FP": "FALSE POSITIVE", "FALSE POSITIVE": "FALSE POSITIVE",
+        },
+    },
+}
+
+
+def _vocabulary(values) -> list:
+    out = []
+    for v in values:
+        if v not in out:
+            out.append(v)
+    return out
+
+
+# Catégories fixes : les concaténations entre missions restent catégorielles
+MISSION_DTYPE = pd.CategoricalDtype(_vocabulary(s["mission"] for s in MISSION_SCHEMAS.values()))
+LABEL_DTYPE = pd.CategoricalDtype(_vocabulary(v for s in MISSION_SCHEMAS.values() for v in s["labels"].values()))
+
+
+def catalog_missions() -> dict:
+    return {catalog: s["mission"] for catalog, s in MISSION_SCHEMAS.items()}
+
+
+def _measure(df: pd.DataFrame, spec, n: int) -> np.ndarray:
+    col, factor = (spec, None) if isinstance(spec, str) else spec
+    if col not in df.columns:
+        return np.full(n, np.nan, dtype=np.float32)
+    x = pd.to_numeric(df[col], errors="coerce").to_numpy(dtype=np.float64, na_value=np.nan)
+    if factor is not None:
+        x = x * factor
+    return x.astype(np.float32)
+
+
+def _flag(df: pd.DataFrame, col, n: int) -> pd.arrays.IntegerArray:
+    if col is None or col not in df.columns:
+        return pd.arrays.IntegerArray(np.zeros(n, dtype=np.int8), np.ones(n, dtype=bool))
+    return pd.to_numeric(df[col], errors="coerce").astype("Int8").array
+
+
+def _labels(raw: pd.Series, mapping: dict) -> pd.Categorical:
+    # la table de correspondance ne s'applique qu'aux valeurs distinctes
+    codes, uniques = pd.factorize(raw)
+    lookup = {k.upper(): v for k, v in mapping.items()}
+    categories = list(LABEL_DTYPE.categories)
+    mapped = [lookup.get(str(u).strip().upper()) for u in uniques]
+    table = np.array([categories.index(m) if m is not None else -1 for m in mapped] + [-1], dtype=np.int8)
+    return pd.Categorical.from_codes(table[codes], dtype=LABEL_DTYPE)
+
+
+def harmonize(df: pd.DataFrame, catalog: str) -> pd.DataFrame:
+    """Frame brut `catalog` (sortie de fetch_*) → schéma harmonisé commun (HARMONIZED_COLS)."""
+    schema = MISSION_SCHEMAS[catalog]
+    n = len(df)
+    columns = schema["columns"]
+
+    oid = schema["object_id"]
+    if oid in df.columns:
+        object_id = df[oid] if pd.api.types.is_string_dtype(df[oid]) else df[oid].astype(str)
+    else:
+        object_id = pd.Series(df.index.astype(str), index=df.index)
+    mission_code = MISSION_DTYPE.categories.get_loc(schema["mission"])
+
+    out = {
+        "object_id": object_id.array,
+        "mission": pd.Categorical.from_codes(np.full(n, mission_code, dtype=np.int8), dtype=MISSION_DTYPE),
+        "star_id": df[schema["star_id"]].to_numpy() if schema["star_id"] in df.columns
+        else np.full(n, None, dtype=object),
+    }
+    for c in MEASURE_COLS:
+        out[c] = _measure(df, columns[c], n) if c in columns else np.full(n, np.nan, dtype=np.float32)
+    for c in FLAG_COLS:
+        out[c] = _flag(df, columns.get(c), n)
+    label = schema["label"]
+    out["label_raw"] = (_labels(df[label], schema["labels"]) if label in df.columns
+                        else pd.Categorical.from_codes(np.full(n, -1, dtype=np.int8), dtype=LABEL_DTYPE))
+    return pd.DataFrame(out, index=df.index, columns=HARMONIZED_COLS)
+
+
+def apply_dtypes(harm: pd.DataFrame) -> pd.DataFrame:
+    """Rétablit les types compacts (ex. après lecture Parquet ou concat d'anciens états)."""
+    out = harm.copy()
+    out["mission"] = out["mission"].astype(str).astype(MISSION_DTYPE)
+    label = out["label_raw"].astype(object)
+    out["label_raw"] = label.where(label.notna(), None).astype(LABEL_DTYPE)
+    for c in MEASURE_COLS:
+        if c in out.columns:
+            out[c] = pd.to_numeric(out[c], errors="coerce").astype(np.float32)
+    for c in FLAG_COLS:
+        if c in out.columns:
+            out[c] = pd.to_numeric(out[c], errors="coerce").astype("Int8")
+    return out
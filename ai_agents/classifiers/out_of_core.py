@@ -0,0 +1,324 @@
+# out_of_core.py
+# Entraînement hors mémoire pour les jeux harmonisés plus grands que la RAM (ex. injections simulées).
+#
+# Deux passes en flux sur un Parquet harmonisé, par lots de taille fixe :
+#   1. sketches de quantiles fusionnables (type KLL) par feature, comptes de labels et de missions ;
+#      les médianes d'imputation et la table du QuantileTransformer en sont tirées, sans jamais
+#      matérialiser une colonne entière. Les sketches ignorent les NaN ; comme le pipeline en
+#      mémoire ajuste le QuantileTransformer après l'imputation par la médiane, les valeurs
+#      manquantes sont réintroduites dans sa table comme une masse à la médiane ;
+#   2. chaque lot est transformé par ce préprocesseur puis proposé à un réservoir borné (échantillon
+#      uniforme), stocké sous forme binnée uint16 (rang uniforme quantifié) ; le HGB est ajusté sur
+#      ce réservoir.
+# La mémoire dépend de batch_size, max_train_rows (réservoir, puis sa version décodée en float32
+# pour le fit, qui fixe le pic) et de la taille des groupes de lignes du Parquet (un groupe est lu
+# à la fois), pas du nombre de lignes : les sketches ne croissent qu'en O(k log n). Mesuré sur
+# données synthétiques (lots de 100k, réservoir de 200k) : pic RSS 0,71 Go à 2 M comme à 6 M lignes.
+# Le bundle produit a le même format que train_final_model_and_save (load_model, compiled,
+# artifact inchangés).
+
+import os
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from classifiers.exoplanet_classifier import (
+    BASE_NUM_COLS_ALL, CAT_COLS, HGB_PARAMS, LABEL_MAP, _build_preprocessor, save_bundle,
+)
+from classifiers.design_matrix import build_design_matrix
+
+N_QUANTILES = 1000
+_CODE_MAX = np.iinfo(np.uint16).max
+
+
+# --------------------------
+# Sketch de quantiles fusionnable
+# --------------------------
+
+class QuantileSketch:
+    """
+    Sketch KLL simplifié : des compacteurs par niveau (poids 2^h) ; un niveau plein est trié puis
+    une valeur sur deux (décalage aléatoire) monte au niveau suivant. Mémoire O(k log(n/k)),
+    erreur de rang O(1/k). Tant qu'aucune compaction n'a eu lieu, les quantiles sont exacts
+    (interpolation linéaire, comme np.nanpercentile).
+    """
+
+    def __init__(self, k: int = 4096, seed: int = 0):
+        self.k = int(k)
+        self.n = 0
+        self.levels = [np.empty(0, dtype=np.float64)]
+        self._rng = np.random.default_rng(seed)
+
+    def _capacity(self, h: int) -> int:
+        depth = len(self.levels) - 1 - h
+        return max(8, int(self.k * (2 / 3) ** depth))
+
+    def _compress(self):
+        h = 0
+        while h < len(self.levels):
+            level = self.levels[h]
+            if len(level) > self._capacity(h):
+                level = np.sort(level)
+                if len(level) % 2:  # l'élément en trop reste à ce niveau
+                    keep, level = level[-1:], level[:-1]
+                else:
+                    keep = level[:0]
+                promoted = level[int(self._rng.integers(2))::2]
+                if h + 1 == len(self.levels):
+                    self.levels.append(np.empty(0, dtype=np.float64))
+                self.levels[h] = keep
+                self.levels[h + 1] = np.concatenate([self.levels[h + 1], promoted])
+            h += 1
+
+    def update(self, values):
+        values = np.asarray(values, dtype=np.float64).ravel()
+        values = values[~np.isnan(values)]
+        if values.size:
+            self.n += values.size
+            self.levels[0] = np.concatenate([self.levels[0], values])
+            self._compress()
+        return self
+
+    def merge(self, other: "QuantileSketch"):
+        while len(self.levels) < len(other.levels):
+            self.levels.append(np.empty(0, dtype=np.float64))
+        for h, level in enumerate(other.levels):
+            self.levels[h] = np.concatenate([self.levels[h], level])
+        self.n += other.n
+        self._compress()
+        return self
+
+    def quantiles(self, qs) -> np.ndarray:
+        qs = np.asarray(qs, dtype=np.float64)
+        if self.n == 0:
+            return np.full(qs.shape, np.nan)
+        if len(self.levels) == 1:
+            return np.quantile(self.levels[0], qs)
+        items = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(len(lv), 2.0 ** h) for h, lv in enumerate(self.levels)])
+        order = np.argsort(items, kind="stable")
+        items, weights = items[order], weights[order]
+        # rang (0..1) au centre du poids de chaque item, puis interpolation
+        cum = np.cumsum(weights)
+        ranks = (cum - weights / 2) / cum[-1]
+        return np.interp(qs, ranks, items)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(lv.nbytes for lv in self.levels)
+
+
+# --------------------------
+# Réservoir borné
+# --------------------------
+
+class Reservoir:
+    """Échantillon uniforme d'au plus `capacity` lignes (clés aléatoires, on garde les plus petites)."""
+
+    def __init__(self, capacity: int, seed: int = 0):
+        self.capacity = int(capacity)
+        self.keys = np.empty(0, dtype=np.float64)
+        self.rows = None
+        self.y = np.empty(0, dtype=np.int8)
+        self.seen = 0
+        self._rng = np.random.default_rng(seed)
+
+    def offer(self, rows: np.ndarray, y: np.ndarray):
+        keys = self._rng.random(len(rows))
+        self.seen += len(rows)
+        if self.rows is None:
+            self.rows = rows[:0]
+        if len(self.keys) + len(rows) > self.capacity:
+            # seules les lignes candidates du lot sont copiées (clé sous le seuil actuel)
+            if len(self.keys) >= self.capacity:
+                cand = keys < self.keys.max()
+                keys, rows, y = keys[cand], rows[cand], y[cand]
+            keys = np.concatenate([self.keys, keys])
+            keep = np.argpartition(keys, self.capacity - 1)[:self.capacity] if len(keys) > self.capacity \
+                else np.arange(len(keys))
+            n_old = len(self.keys)
+            old, new = keep[keep < n_old], keep[keep >= n_old] - n_old
+            self.rows = np.concatenate([self.rows[old], rows[new]])
+            self.y = np.concatenate([self.y[old], y[new]])
+            self.keys = keys[keep]
+        else:
+            self.rows = np.concatenate([self.rows, rows])
+            self.y = np.concatenate([self.y, y])
+            self.keys = np.concatenate([self.keys, keys])
+
+    def __len__(self):
+        return len(self.keys)
+
+
+# --------------------------
+# Sources
+# --------------------------
+
+def harmonized_batches(source: str, batch_size: int = 100_000, store=None):
+    """
+    Fabrique d'itérateurs de lots (chaque appel relit la source depuis le début).
+    `source` : fichier / dossier Parquet, ou ID de snapshot du SnapshotStore.
+    """
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+
+    if os.path.exists(source):
+        dataset = ds.dataset(source, format="parquet")
+    else:
+        from classifiers.snapshot_store import SnapshotStore
+        store = store or SnapshotStore()
+        dataset = ds.dataset(store.root / store.info(source)["path"], format="parquet")
+
+    names = set(dataset.schema.names)
+    columns = [c for c in BASE_NUM_COLS_ALL if c in names] + ["mission", "label_raw"]
+
+    def batches():
+        # lecture synchrone, fichier par fichier : le scanner de pyarrow.dataset décode en avance
+        # tant que le consommateur est plus lent (jusqu'à ~1 Go, quels que soient les readahead) ;
+        # ici seuls le groupe de lignes en cours de lecture et le lot courant sont en mémoire
+        for path in dataset.files:
+            with pq.ParquetFile(path, pre_buffer=False) as f:
+                for batch in f.iter_batches(batch_size=batch_size, columns=columns):
+                    yield batch.to_pandas()
+    return batches
+
+
+# --------------------------
+# Entraînement
+# --------------------------
+
+def _imputed_quantiles(sketch: QuantileSketch, n_missing: int, levels) -> np.ndarray:
+    """
+    Quantiles de la colonne après imputation par la médiane : les `n_missing` valeurs manquantes
+    (que le sketch n'a pas vues) forment une masse à la médiane des valeurs présentes.
+
+    Positions comptées comme np.quantile (q · (N - 1)) : la colonne imputée triée est o_0..o_{k-1},
+    la médiane m fois, puis o_k..o_{n-1} ; chaque position y est ramenée à une position parmi les
+    valeurs présentes, de sorte que le résultat est exact tant que le sketch l'est (colonnes
+    binaires comprises, où un rang décalé d'une unité tombe sur le saut 0 → 1).
+    """
+    n, m = sketch.n, n_missing
+    if n == 0 or m == 0:
+        return sketch.quantiles(levels)
+    pos = np.asarray(levels, dtype=np.float64) * (n + m - 1)
+    half = (n - 1) / 2  # position de la médiane parmi les valeurs présentes
+    k = n // 2 + n % 2  # valeurs présentes rangées avant la masse imputée
+    observed = np.select(
+        [pos <= k - 1, pos < k, pos <= k + m - 1, pos < k + m],
+        [pos,
+         (k - 1) + (pos - (k - 1)) * (half - (k - 1)),  # o_{k-1} → médiane
+         np.full_like(pos, half),
+         half + (pos - (k + m - 1)) * (k - half)],  # médiane → o_k
+        default=pos - m,
+    )
+    return sketch.quantiles(observed / max(n - 1, 1))
+
+
+def _quantile_frame(sketches: dict, mission_counts: dict, n_rows: int) -> pd.DataFrame:
+    """
+    Jeu résumé de N_QUANTILES lignes dont chaque colonne numérique est la suite des quantiles
+    (après imputation, cf. _imputed_quantiles) de son sketch : un QuantileTransformer ajusté dessus
+    retrouve exactement ces quantiles.
+    """
+    levels = np.linspace(0, 1, N_QUANTILES)
+    frame = pd.DataFrame({c: _imputed_quantiles(sk, n_rows - sk.n, levels) for c, sk in sketches.items()})
+    # mission : le mode partout (imputation most_frequent), chaque autre mission une fois (vocabulaire)
+    ranked = sorted(mission_counts, key=mission_counts.get, reverse=True)
+    mission = np.full(N_QUANTILES, ranked[0], dtype=object)
+    mission[:len(ranked) - 1] = ranked[1:]
+    frame["mission"] = mission
+    return frame
+
+
+def _encode(z_num: np.ndarray) -> np.ndarray:
+    """Scores normaux du QuantileTransformer → rang uniforme quantifié sur 16 bits."""
+    from scipy.special import ndtr
+    return np.rint(ndtr(z_num) * _CODE_MAX).astype(np.uint16)
+
+
+def _decode(codes: np.ndarray) -> np.ndarray:
+    from classifiers.compiled import ndtri, _CLIP_MIN, _CLIP_MAX
+    return np.clip(ndtri(codes / _CODE_MAX), _CLIP_MIN, _CLIP_MAX).astype(np.float32)
+
+
+def train_out_of_core(batches, model_dir: str = "models", model_name: str = "exoplanet_hgb.pkl",
+                      max_train_rows: int = 1_000_000, sketch_k: int = 4096,
+                      hgb_params: dict = None, snapshot_ids: dict = None, seed: int = 42) -> str:
+    """
+    Entraîne le pipeline HGB à partir de `batches` (callable renvoyant un itérateur de DataFrames
+    harmonisés, cf. harmonized_batches) en mémoire bornée ; sauvegarde le bundle, renvoie son chemin.
+    """
+    t_start = time.perf_counter()
+
+    # ---------- passe 1 : sketches ----------
+    all_num_cols, sketches = None, None
+    label_counts = np.zeros(len(LABEL_MAP), dtype=np.int64)
+    mission_counts = {}
+    n_rows = 0
+    for df in batches():
+        dm = build_design_matrix(df, version="stream")
+        if all_num_cols is None:
+            all_num_cols = dm.feature_names
+            sketches = {c: QuantileSketch(sketch_k, seed=seed + j) for j, c in enumerate(all_num_cols)}
+        elif dm.feature_names != all_num_cols:
+            raise ValueError("Harmonized batches do not share the same feature columns")
+        for j, c in enumerate(all_num_cols):
+            sketches[c].update(dm.X[:, j])
+        label_counts += np.bincount(dm.y, minlength=len(LABEL_MAP))
+        for code, count in zip(*np.unique(dm.mission, return_counts=True)):
+            name = dm.missions[code]
+            mission_counts[name] = mission_counts.get(name, 0) + int(count)
+        n_rows += len(dm)
+    if not n_rows:
+        raise ValueError("No labelled rows in the harmonized batches")
+    t_pass1 = time.perf_counter()
+
+    pre = _build_preprocessor(all_num_cols, CAT_COLS)
+    pre.fit(_quantile_frame(sketches, mission_counts, n_rows))
+    imp = pre.named_transformers_["num"].named_steps["imp"]
+    medians = np.array([sketches[c].quantiles(0.5) for c in all_num_cols])
+    imp.statistics_ = np.where(np.isnan(imp.statistics_), np.nan, medians)
+    n_num = len(imp.get_feature_names_out(all_num_cols))
+
+    # ---------- passe 2 : réservoir binné ----------
+    reservoir = Reservoir(max_train_rows, seed=seed)
+    for df in batches():
+        dm = build_design_matrix(df, version="stream")
+        Z = pre.transform(dm.frame())
+        block = np.empty(Z.shape, dtype=np.uint16)
+        block[:, :n_num] = _encode(Z[:, :n_num])
+        block[:, n_num:] = Z[:, n_num:]
+        reservoir.offer(block, dm.y)
+        del Z, block
+    t_pass2 = time.perf_counter()
+
+    X = np.empty(reservoir.rows.shape, dtype=np.float32)
+    X[:, :n_num] = _decode(reservoir.rows[:, :n_num])
+    X[:, n_num:] = reservoir.rows[:, n_num:]
+    y = reservoir.y.astype(int)
+
+    from sklearn.ensemble import HistGradientBoostingClassifier
+    from sklearn.pipeline import Pipeline
+
+    # poids "balanced" calculés sur les comptes du flux complet
+    class_weight = label_counts.sum() / (len(LABEL_MAP) * np.maximum(label_counts, 1))
+    hgb_params = {**HGB_PARAMS, **(hgb_params or {})}
+    clf = HistGradientBoostingClassifier(**hgb_params)
+    clf.fit(X, y, sample_weight=class_weight[y])
+    del X
+    pipe = Pipeline([("pre", pre), ("clf", clf)])
+    t_fit = time.perf_counter()
+
+    Path(model_dir).mkdir(parents=True, exist_ok=True)
+    lineage = {
+        "version": 1, "parent": None, "mode": "out_of_core",
+        "n_train": int(len(reservoir)), "n_rows_seen": int(n_rows),
+        "label_counts": {k: int(label_counts[v]) for k, v in LABEL_MAP.items()},
+        "sketch_k": sketch_k, "max_train_rows": max_train_rows,
+        "seconds": {"sketch_pass": t_pass1 - t_start, "reservoir_pass": t_pass2 - t_pass1,
+                    "fit": t_fit - t_pass2},
+    }
+    return save_bundle(pipe, all_num_cols, Path(model_dir) / model_name,
+                       snapshot_ids=snapshot_ids, hgb_params=hgb_params, lineage=lineage)
@@ -0,0 +1,108 @@
+# retrain.py
+# Ré-entraînement incrémental d'un bundle sauvegardé (warm start HGB).
+#
+# Le préprocesseur déjà ajusté (imputation + QuantileTransformer) est conservé tant que la
+# distribution des nouvelles données reste proche de celle vue à l'entraînement ; on ajoute alors
+# des itérations de boosting sur le jeu augmenté. Si le contrôle de dérive échoue, refit complet.
+# Chaque exécution écrit un nouveau bundle versionné avec ses métadonnées de lignée.
+
+import copy
+import re
+from datetime import datetime, timezone
+from pathlib import Path
+
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.utils.class_weight import compute_sample_weight
+
+from classifiers.exoplanet_classifier import CAT_COLS, save_bundle, train_final_model_and_save
+from classifiers.design_matrix import get_design_matrix
+
+
+def feature_drift(pre, df: pd.DataFrame, num_cols: list) -> dict:
+    """
+    Statistique KS par feature numérique entre les nouvelles données (imputées) et la distribution
+    de référence encodée dans la table de quantiles du QuantileTransformer ajusté. Les CDF sont
+    comparées aux valeurs de quantile distinctes, ce qui reste correct pour les features discrètes
+    (fpflag_*).
+    """
+    num = pre.named_transformers_["num"]
+    imp, qt = num.named_steps["imp"], num.named_steps["qt"]
+    X = imp.transform(df[num_cols])
+    out_cols = list(imp.get_feature_names_out(num_cols))
+    stats = {}
+    for j, col in enumerate(out_cols):
+        q, p = qt.quantiles_[:, j], qt.references_
+        values = np.unique(q)
+        # CDF de référence continue à droite : plus grand niveau p_k tel que q_k <= v
+        f_ref = p[np.searchsorted(q, values, side="right") - 1]
+        x = np.sort(X[:, j])
+        f_new = np.searchsorted(x, values, side="right") / len(x)
+        stats[col] = float(np.max(np.abs(f_new - f_ref)))
+    return stats
+
+
+def _next_version_path(bundle_path: str, model_dir: str, version: int) -> Path:
+    stem = re.sub(r"-v\d+$", "", Path(bundle_path).stem)
+    return Path(model_dir) / f"{stem}-v{version}.pkl"
+
+
+def incremental_retrain(harm: pd.DataFrame, bundle_path: str, model_dir: str = "models",
+                        drift_threshold: float = 0.1, extra_iter: int = 100,
+                        snapshot_ids: dict = None) -> dict:
+    """
+    Met à jour le bundle `bundle_path` avec le jeu harmonisé augmenté `harm`.
+    Warm start si max(KS) <= drift_threshold, sinon refit complet ; renvoie la lignée du nouveau bundle.
+    """
+    parent = joblib.load(bundle_path)
+    if not isinstance(parent, dict) or "pipeline" not in parent:
+        raise ValueError("Incremental retrain needs a bundle saved by train_final_model_and_save")
+
+    parent_lineage = parent.get("lineage") or {"version": 1}
+    version = int(parent_lineage.get("version", 1)) + 1
+    out_path = _next_version_path(bundle_path, model_dir, version)
+    Path(model_dir).mkdir(parents=True, exist_ok=True)
+
+    dm = get_design_matrix(harm)
+    all_num_cols = parent["all_num_cols"]
+    lineage = {
+        "version": version,
+        "parent": Path(bundle_path).name,
+        "parent_version": parent_lineage.get("version"),
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "n_train": len(dm),
+        "drift_threshold": drift_threshold,
+    }
+
+    if dm.feature_names != all_num_cols:
+        # schéma de features différent : le préprocesseur ne peut pas être réutilisé
+        lineage.update(mode="full_refit", reason="feature set changed", drift=None)
+    else:
+        pipe = copy.deepcopy(parent["pipeline"])
+        pre, clf = pipe.named_steps["pre"], pipe.named_steps["clf"]
+        X = dm.frame()[all_num_cols + CAT_COLS]
+        drift = feature_drift(pre, X, all_num_cols)
+        lineage["drift"] = drift
+
+        if max(drift.values(), default=0.0) <= drift_threshold:
+            y = dm.y.astype(int)
+            sw = compute_sample_weight(class_weight="balanced", y=y)
+            parent_iter = int(clf.n_iter_)
+            clf.set_params(warm_start=True, max_iter=parent_iter + extra_iter)
+            clf.fit(pre.transform(X), y, sample_weight=sw)
+            clf.set_params(warm_start=False)
+            lineage.update(mode="warm_start", parent_n_iter=parent_iter, n_iter=int(clf.n_iter_))
+
+            save_bundle(pipe, all_num_cols, out_path,
+                        snapshot_ids=snapshot_ids or parent.get("snapshot_ids", {}),
+                        hgb_params=parent.get("hgb_params"), lineage=lineage,
+                        cat_cols=parent["cat_cols"], label_map=parent["label_map"])
+            return dict(lineage, path=str(out_path))
+
+        lineage.update(mode="full_refit", reason="drift above threshold")
+
+    train_final_model_and_save(harm, model_dir=model_dir, model_name=out_path.name,
+                               snapshot_ids=snapshot_ids, hgb_params=parent.get("hgb_params"),
+                               lineage=lineage)
+    return dict(lineage, path=str(out_path))
@@ -0,0 +1,206 @@
+# search.py
+# Recherche d'hyperparamètres HGB par successive halving, avec budget de temps et reprise.
+#
+# Les configurations candidates sont évaluées en CV StratifiedGroupKFold (groupes = star_id) sur
+# la matrice de design partagée ; chaque (configuration, fold) est un job du pool de
+# classifiers.evaluation. La ressource qui augmente à chaque palier est max_iter. Chaque fold
+# terminé est ajouté à un journal JSONL : une recherche interrompue reprend là où elle s'est arrêtée.
+# Quand le budget est écoulé, les workers sont tués (fits en cours compris) : la fonction rend la
+# main à l'échéance, sans fits orphelins qui occuperaient encore les cœurs.
+
+import hashlib
+import json
+import math
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed, TimeoutError as FuturesTimeout
+
+import numpy as np
+import pandas as pd
+
+from classifiers.exoplanet_classifier import HGB_PARAMS
+from classifiers.design_matrix import get_design_matrix
+from classifiers.evaluation import plan_jobs, pool_size, _init_worker, _run_job
+
+SEARCH_SPACE = {
+    "learning_rate": ("loguniform", 0.02, 0.3),
+    "max_leaf_nodes": ("choice", [15, 31, 63, 127]),
+    "min_samples_leaf": ("choice", [10, 20, 50, 100]),
+    "l2_regularization": ("choice", [0.0, 0.01, 0.1, 1.0]),
+}
+
+
+def sample_configs(n: int, space: dict = None, seed: int = 42) -> list:
+    """Tirage déterministe (même seed → mêmes candidats, nécessaire pour la reprise)."""
+    space = space or SEARCH_SPACE
+    rng = np.random.default_rng(seed)
+    configs = []
+    for _ in range(n):
+        cfg = {}
+        for name, spec in space.items():
+            if spec[0] == "loguniform":
+                cfg[name] = float(np.exp(rng.uniform(np.log(spec[1]), np.log(spec[2]))))
+            elif spec[0] == "choice":
+                cfg[name] = spec[1][int(rng.integers(len(spec[1])))]
+            else:
+                raise ValueError(f"Unknown search space kind: {spec[0]}")
+        configs.append(cfg)
+    return configs
+
+
+def trial_id(params: dict, resource: int, dataset_version: str) -> str:
+    payload = json.dumps({"params": params, "max_iter": resource, "data": dataset_version},
+                         sort_keys=True)
+    return hashlib.sha1(payload.encode()).hexdigest()[:12]
+
+
+def _load_checkpoint(path: str) -> dict:
+    done = {}
+    if path and os.path.exists(path):
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    rec = json.loads(line)
+                    done[(rec["trial_id"], rec["fold"])] = rec
+    return done
+
+
+def _append_checkpoint(path: str, rec: dict):
+    if not path:
+        return
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(json.dumps(rec) + "\n")
+        f.flush()
+
+
+def _terminate(ex: ProcessPoolExecutor):
+    """Arrête le pool sans attendre les fits en cours : futures en file annulées, workers tués."""
+    procs = list((getattr(ex, "_processes", None) or {}).values())  # handles des workers (CPython)
+    ex.shutdown(wait=False, cancel_futures=True)
+    for p in procs:
+        p.terminate()
+    for p in procs:
+        p.join(timeout=5)
+        if p.is_alive():
+            p.kill()
+            p.join()
+
+
+def rung_resources(min_resource: int, max_resource: int, eta: int) -> list:
+    n_rungs = int(math.floor(math.log(max_resource / min_resource, eta))) + 1
+    return [min(max_resource, int(min_resource * eta ** i)) for i in range(n_rungs - 1)] + [max_resource]
+
+
+def successive_halving(harm: pd.DataFrame, n_candidates: int = 27, min_resource: int = 50,
+                       max_resource: int = 500, eta: int = 3, n_splits: int = 5,
+                       budget_seconds: float = None, checkpoint: str = "models/hgb_search.jsonl",
+                       n_jobs: int = None, seed: int = 42) -> dict:
+    """
+    Successive halving : à chaque palier, toutes les configurations restantes sont évaluées avec
+    max_iter = ressource du palier, puis seul le meilleur 1/eta passe au palier suivant.
+    S'arrête proprement quand `budget_seconds` est écoulé ; renvoie la meilleure configuration.
+    """
+    t_start = time.perf_counter()
+    deadline = t_start + budget_seconds if budget_seconds else None
+
+    dm = get_design_matrix(harm)
+    folds = [j for j in plan_jobs(dm.y, dm.groups_star, dm.mission, n_splits=n_splits)
+             if j["kind"] == "cv"]
+    configs = sample_configs(n_candidates, seed=seed)
+    resources = rung_resources(min_resource, max_resource, eta)
+    done = _load_checkpoint(checkpoint)
+    n_resumed = len(done)
+
+    n_workers, threads = pool_size(len(configs) * len(folds), n_jobs)
+    ex = ProcessPoolExecutor(max_workers=n_workers, initializer=_init_worker,
+                             initargs=({"dm": dm, "clf": None}, threads))
+
+    survivors = list(range(len(configs)))
+    rungs = []
+    completed, finished = True, False
+    try:
+        for rung, resource in enumerate(resources):
+            futures = {}
+            for i in survivors:
+                params = {**HGB_PARAMS, **configs[i], "max_iter": resource}
+                tid = trial_id(params, resource, dm.version)
+                for fold in folds:
+                    if (tid, fold["name"]) in done:
+                        continue
+                    job = dict(fold, clf_params=params)
+                    futures[ex.submit(_run_job, job)] = (i, tid, params)
+
+            remaining = None if deadline is None else max(0.0, deadline - time.perf_counter())
+            try:
+                for fut in as_completed(futures, timeout=remaining):
+                    i, tid, params = futures[fut]
+                    res = fut.result()
+                    rec = {"trial_id": tid, "config": i, "rung": rung, "max_iter": resource,
+                           "params": params, "fold": res["name"], "f1_macro": res["f1_macro"],
+                           "balanced_accuracy": res["balanced_accuracy"], "n_iter": res["n_iter"],
+                           "fit_seconds": res["fit_seconds"]}
+                    done[(tid, res["name"])] = rec
+                    _append_checkpoint(checkpoint, rec)
+            except FuturesTimeout:
+                completed = False
+
+            scores = {}
+            for i in survivors:
+                params = {**HGB_PARAMS, **configs[i], "max_iter": resource}
+                tid = trial_id(params, resource, dm.version)
+                recs = [done.get((tid, f["name"])) for f in folds]
+                if all(recs):
+                    scores[i] = float(np.mean([r["f1_macro"] for r in recs]))
+            rungs.append({"rung": rung, "max_iter": resource, "n_configs": len(survivors),
+                          "scores": {str(i): s for i, s in scores.items()}})
+
+            if not completed or not scores:
+                break
+            ranked = sorted(scores, key=scores.get, reverse=True)
+            survivors = ranked[:max(1, len(ranked) // eta)]
+            if resource == resources[-1]:
+                break
+        finished = True
+    finally:
+        if finished and completed:
+            ex.shutdown(wait=True)
+        else:  # budget écoulé ou interruption : ne pas laisser tourner les fits en cours
+            _terminate(ex)
+
+    # meilleure configuration du palier complet le plus élevé
+    best_i, best_score, best_rung = None, None, None
+    for r in rungs:
+        if r["scores"]:
+            i, score = max(r["scores"].items(), key=lambda kv: kv[1])
+            best_i, best_score, best_rung = int(i), score, r
+    best_params = None
+    if best_i is not None:
+        best_params = {**HGB_PARAMS, **configs[best_i], "max_iter": max_resource}
+
+    return {
+        "best_params": best_params,
+        "best_score": best_score,
+        "best_rung_max_iter": best_rung["max_iter"] if best_rung else None,
+        "completed": completed,
+        "rungs": rungs,
+        "candidates": configs,
+        "n_trials_resumed": n_resumed,
+        "n_workers": n_workers,
+        "wall_seconds": time.perf_counter() - t_start,
+        "dataset_version": dm.version,
+    }
+
+
+def save_best_params(result: dict, path: str = "models/hgb_best_params.json") -> str:
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"params": result["best_params"], "f1_macro": result["best_score"],
+                   "dataset_version": result["dataset_version"]}, f, indent=2)
+    return path
+
+
+def load_best_params(path: str = "models/hgb_best_params.json") -> dict:
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)["params"]
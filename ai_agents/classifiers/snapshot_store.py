@@ -0,0 +1,141 @@
+# snapshot_store.py
+# Stockage local versionné des catalogues d'entraînement (KOI / K2 / TOI, jeu harmonisé).
+#
+# Chaque téléchargement devient un snapshot Parquet immuable, identifié par le hash de son contenu
+# et référencé dans un manifest JSON. Les lectures utilisent la projection de colonnes et le
+# filtrage par prédicats de pyarrow (ex. mission ou disposition), sans relire tout le fichier.
+# Le manifest date la création et le dernier put de chaque snapshot : ré-enregistrer un contenu
+# déjà stocké (retour à un état antérieur) en refait le plus récent pour latest().
+# Un entraînement peut épingler ses snapshot IDs : un ré-entraînement n'a plus besoin de l'archive.
+
+import hashlib
+import json
+import os
+import stat
+import tempfile
+from datetime import datetime, timezone
+from pathlib import Path
+
+import pandas as pd
+
+MANIFEST_NAME = "manifest.json"
+MANIFEST_VERSION = 1
+
+
+def _normalize(df: pd.DataFrame) -> pd.DataFrame:
+    """Colonnes objet à types mixtes (ex. star_id int/str selon la mission) → texte, NaN conservés."""
+    out = df
+    for c in df.columns:
+        col = df[c]
+        if col.dtype == object and col.map(type).nunique(dropna=True) > 1:
+            if out is df:
+                out = df.copy()
+            out[c] = col.where(col.isna(), col.astype(str))
+    return out
+
+
+def content_hash(df: pd.DataFrame) -> str:
+    """Hash du contenu (schéma + valeurs), indépendant de l'encodage Parquet."""
+    h = hashlib.sha256()
+    h.update(json.dumps([[str(c), str(t)] for c, t in df.dtypes.items()]).encode())
+    h.update(pd.util.hash_pandas_object(df, index=False).values.tobytes())
+    return h.hexdigest()
+
+
+class SnapshotStore:
+    def __init__(self, root: str = "data/snapshots"):
+        self.root = Path(root)
+
+    # ---------- manifest ----------
+
+    @property
+    def manifest_path(self) -> Path:
+        return self.root / MANIFEST_NAME
+
+    def _load_manifest(self) -> dict:
+        if not self.manifest_path.exists():
+            return {"version": MANIFEST_VERSION, "snapshots": {}}
+        with open(self.manifest_path, encoding="utf-8") as f:
+            return json.load(f)
+
+    def _write_manifest(self, manifest: dict):
+        self.root.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=self.root, suffix=".json.tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=2, sort_keys=True)
+        os.replace(tmp, self.manifest_path)
+
+    # ---------- écriture ----------
+
+    def put(self, catalog: str, df: pd.DataFrame, source: str = None, query: str = None) -> str:
+        """Enregistre `df` comme snapshot de `catalog` ; renvoie l'ID (inchangé si contenu identique)."""
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        df = _normalize(df)
+        digest = content_hash(df)
+        snapshot_id = f"{catalog}-{digest[:16]}"
+        manifest = self._load_manifest()
+        now = datetime.now(timezone.utc).isoformat()
+        if snapshot_id in manifest["snapshots"]:
+            # contenu déjà stocké (ex. retour à un état antérieur) : il redevient le plus récent
+            manifest["snapshots"][snapshot_id]["last_put_at"] = now
+            self._write_manifest(manifest)
+            return snapshot_id
+
+        rel_path = Path(catalog) / f"{snapshot_id}.parquet"
+        path = self.root / rel_path
+        path.parent.mkdir(parents=True, exist_ok=True)
+
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".parquet.tmp")
+        os.close(fd)
+        pq.write_table(table, tmp, compression="zstd")
+        os.replace(tmp, path)
+        os.chmod(path, stat.S_IRUSR | stat.S_IRGRP | stat.S_IROTH)  # immuable
+
+        manifest["snapshots"][snapshot_id] = {
+            "catalog": catalog,
+            "path": rel_path.as_posix(),
+            "sha256": digest,
+            "created_at": now,
+            "last_put_at": now,
+            "n_rows": int(len(df)),
+            "columns": [str(c) for c in df.columns],
+            "source": source,
+            "query": query,
+        }
+        self._write_manifest(manifest)
+        return snapshot_id
+
+    # ---------- lecture ----------
+
+    def info(self, snapshot_id: str) -> dict:
+        snapshots = self._load_manifest()["snapshots"]
+        if snapshot_id not in snapshots:
+            raise KeyError(f"Unknown snapshot: {snapshot_id}")
+        return snapshots[snapshot_id]
+
+    def list(self, catalog: str = None) -> list:
+        """Snapshots (de `catalog`) du moins au plus récemment enregistré (dernier put, même dédupliqué)."""
+        snapshots = self._load_manifest()["snapshots"]
+        items = [dict(meta, id=sid) for sid, meta in snapshots.items()
+                 if catalog is None or meta["catalog"] == catalog]
+        return sorted(items, key=lambda m: m.get("last_put_at", m["created_at"]))
+
+    def latest(self, catalog: str) -> str:
+        items = self.list(catalog)
+        if not items:
+            raise KeyError(f"No snapshot for catalog '{catalog}' in {self.root}")
+        return items[-1]["id"]
+
+    def read(self, snapshot_id: str, columns=None, filters=None) -> pd.DataFrame:
+        """
+        Lit un snapshot. `columns` : projection ; `filters` : prédicats pyarrow poussés au lecteur,
+        ex. [("mission", "=", "TESS")] ou [("koi_disposition", "in", ["CONFIRMED", "CANDIDATE"])].
+        """
+        import pyarrow.parquet as pq
+
+        meta = self.info(snapshot_id)
+        table = pq.read_table(self.root / meta["path"], columns=columns, filters=filters)
+        return table.to_pandas()
@@ -0,0 +1,172 @@
+# stage_cache.py
+# Cache disque adressé par contenu pour les étapes fetch → harmonize → features → fit.
+#
+# La clé d'une étape est le hash de son nom, de ses entrées (IDs de snapshot, versions de jeu de
+# données, clés des étapes amont, indices de fold), de ses paramètres et de la version du code qui
+# la calcule (source des modules concernés + versions des bibliothèques). Une matrice de design
+# entre par la clé de son étape features (DesignMatrix.key), pas par la seule version des données :
+# les clés s'enchaînent, et une relance dont un seul paramètre ou module change ne recalcule que
+# les étapes en aval de ce changement.
+# Les entrées sont des fichiers joblib écrits de façon atomique ; la date de modification sert de
+# date de dernier accès (LRU) et le cache est élagué au-delà de `max_bytes`. Sans index central,
+# plusieurs processus (workers d'évaluation) peuvent le partager.
+
+import hashlib
+import inspect
+import json
+import os
+import tempfile
+import time
+from functools import lru_cache
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+_SUFFIX = ".joblib"
+
+
+@lru_cache(maxsize=None)
+def _source_digest(obj) -> str:
+    if isinstance(obj, str):  # nom de module
+        import importlib
+        obj = importlib.import_module(obj)
+    return hashlib.sha256(inspect.getsource(obj).encode()).hexdigest()
+
+
+def code_version(*objs) -> str:
+    """
+    Version du code d'une étape : source des fonctions / modules (objets ou noms de module) qui la
+    calculent + versions numpy / pandas / sklearn.
+    """
+    import sklearn
+    h = hashlib.sha256()
+    for obj in objs:
+        h.update(_source_digest(obj).encode())
+    h.update(f"{np.__version__}|{pd.__version__}|{sklearn.__version__}".encode())
+    return h.hexdigest()[:16]
+
+
+def fingerprint(obj) -> str:
+    """Empreinte stable d'une entrée d'étape."""
+    if isinstance(obj, pd.DataFrame):
+        from classifiers.design_matrix import dataset_version
+        return "df:" + dataset_version(obj)
+    if isinstance(obj, np.ndarray):
+        h = hashlib.sha256(np.ascontiguousarray(obj).tobytes())
+        h.update(f"{obj.dtype.str}{obj.shape}".encode())
+        return "nd:" + h.hexdigest()[:16]
+    if hasattr(obj, "version") and hasattr(obj, "feature_names"):  # DesignMatrix
+        return "dm:" + obj.key
+    return json.dumps(obj, sort_keys=True, default=str)
+
+
+class StageCache:
+    def __init__(self, root: str = "data/cache", max_bytes: int = 2 * 1024 ** 3):
+        self.root = Path(root)
+        self.max_bytes = int(max_bytes)
+        self.stats = {}
+
+    @staticmethod
+    def key(stage: str, *inputs, params: dict = None, code: str = None) -> str:
+        h = hashlib.sha256(stage.encode())
+        for x in inputs:
+            h.update(b"\0")
+            h.update(fingerprint(x).encode())
+        h.update(json.dumps(params or {}, sort_keys=True, default=str).encode())
+        h.update((code or "").encode())
+        return h.hexdigest()[:32]
+
+    def _path(self, stage: str, key: str) -> Path:
+        return self.root / stage / f"{key}{_SUFFIX}"
+
+    def _count(self, stage: str, what: str):
+        s = self.stats.setdefault(stage, {"hits": 0, "misses": 0})
+        s[what] += 1
+
+    def get(self, stage: str, key: str, max_age: float = None):
+        """
+        (trouvé, valeur). `max_age` (secondes) : une entrée plus ancienne est ignorée. Une entrée
+        illisible (tronquée, corrompue, objets d'une version de code disparue) compte comme un
+        absent et est supprimée : le prochain put la réécrit.
+        """
+        import joblib
+
+        path = self._path(stage, key)
+        try:
+            entry = joblib.load(path)
+            created_at = entry["created_at"]
+        except FileNotFoundError:
+            entry = None
+        except Exception:
+            entry = None
+            try:
+                path.unlink()
+            except FileNotFoundError:  # déjà supprimée par un autre processus
+                pass
+        if entry is None or (max_age is not None and time.time() - created_at > max_age):
+            self._count(stage, "misses")
+            return False, None
+        try:
+            os.utime(path)  # dernier accès, pour l'éviction LRU
+        except FileNotFoundError:
+            pass
+        self._count(stage, "hits")
+        return True, entry["value"]
+
+    def put(self, stage: str, key: str, value):
+        import joblib
+
+        path = self._path(stage, key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        os.close(fd)
+        try:
+            joblib.dump({"stage": stage, "created_at": time.time(), "value": value}, tmp)
+            os.replace(tmp, path)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+        self.evict()
+        return value
+
+    def get_or_compute(self, stage: str, key: str, fn, max_age: float = None):
+        hit, value = self.get(stage, key, max_age=max_age)
+        if hit:
+            return value
+        return self.put(stage, key, fn())
+
+    def entries(self) -> list:
+        """(mtime, taille, chemin) de chaque entrée."""
+        out = []
+        if self.root.exists():
+            for stage_dir in self.root.iterdir():
+                if stage_dir.is_dir():
+                    for f in stage_dir.glob(f"*{_SUFFIX}"):
+                        try:
+                            st = f.stat()
+                        except FileNotFoundError:  # évincée par un autre processus
+                            continue
+                        out.append((st.st_mtime, st.st_size, f))
+        return out
+
+    def size(self) -> int:
+        return sum(size for _, size, _ in self.entries())
+
+    def evict(self):
+        """Supprime les entrées les moins récemment utilisées tant que le cache dépasse max_bytes."""
+        entries = sorted(self.entries(), key=lambda e: e[0])
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+            total -= size
+
+    def clear(self):
+        for _, _, path in self.entries():
+            path.unlink(missing_ok=True)
@@ -0,0 +1,164 @@
+# synthetic.py
+# Catalogues KOI / K2 / TOI synthétiques, sans accès à l'archive NASA.
+#
+# Les frames ont exactement les colonnes renvoyées par fetch_koi / fetch_k2 / fetch_toi (après
+# renommage), des distributions log-normales proches des catalogues réels, des taux de NaN
+# réalistes par colonne et des labels corrélés aux features (profondeur, SNR, flags), afin que
+# harmonisation, CV et entraînement travaillent comme sur les vraies données (benchmarks, tests).
+
+import numpy as np
+import pandas as pd
+
+# Répartition approximative des lignes dans l'archive (KOI ≈ 9.6k, K2 ≈ 4k, TOI ≈ 7.7k)
+CATALOG_SHARES = {"koi": 0.45, "k2": 0.19, "toi": 0.36}
+
+# Taux de NaN observés par colonne (ordre de grandeur)
+NAN_RATES = {
+    "koi": {"koi_period": 0.0, "koi_duration": 0.0, "koi_depth": 0.04, "koi_model_snr": 0.04,
+            "koi_steff": 0.04, "koi_slogg": 0.04, "koi_srad": 0.04, "koi_kepmag": 0.001},
+    "k2": {"period": 0.02, "depth": 0.15, "duration_d": 0.2, "st_teff": 0.1, "st_logg": 0.15,
+           "st_rad": 0.12, "kepmag": 0.05, "tmag": 0.25},
+    "toi": {"Period_days": 0.015, "Duration_hours": 0.0, "Depth_ppm": 0.0, "st_teff": 0.06,
+            "st_logg": 0.12, "st_rad": 0.07, "TESS_Mag": 0.0},
+}
+
+
+def _with_nans(rng, df: pd.DataFrame, rates: dict) -> pd.DataFrame:
+    for col, rate in rates.items():
+        if rate > 0:
+            df.loc[rng.random(len(df)) < rate, col] = np.nan
+    return df
+
+
+def _transit(rng, n: int, is_fp: np.ndarray):
+    """Période (j), durée (h), profondeur (ppm) ; les faux positifs sont plus profonds."""
+    period = np.exp(rng.normal(2.3, 1.3, n))
+    duration_h = np.exp(rng.normal(1.2, 0.5, n)) * (period / 10.0) ** (1 / 3)
+    depth = np.exp(rng.normal(6.0, 1.4, n))
+    depth[is_fp] *= np.exp(rng.normal(1.8, 1.0, int(is_fp.sum())))
+    return period, duration_h, depth
+
+
+def _star(rng, n: int):
+    teff = rng.normal(5600, 750, n).clip(2500, 12000)
+    logg = rng.normal(4.4, 0.35, n).clip(0.5, 5.5)
+    rad = np.exp(rng.normal(0.0, 0.45, n))
+    return teff, logg, rad
+
+
+def _host_ids(rng, n: int, base: int, planets_per_star: float = 1.3) -> np.ndarray:
+    """Identifiants d'étoile : plusieurs objets par étoile (systèmes multiples)."""
+    n_stars = max(1, int(n / planets_per_star))
+    return base + rng.integers(0, n_stars, n)
+
+
+def _ids(prefix: str, values, suffix=None) -> np.ndarray:
+    s = prefix + pd.Series(values).astype(str)
+    if suffix is not None:
+        s = s + suffix
+    return s.to_numpy(dtype=object)
+
+
+def synthetic_koi(n: int, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    disp = rng.choice(["CONFIRMED", "CANDIDATE", "FALSE POSITIVE"], n, p=[0.29, 0.20, 0.51])
+    is_fp = disp == "FALSE POSITIVE"
+    period, duration_h, depth = _transit(rng, n, is_fp)
+    teff, logg, rad = _star(rng, n)
+    kepid = _host_ids(rng, n, 757_000)
+    occurrence = pd.Series(kepid).groupby(kepid).cumcount().to_numpy() + 1
+
+    flags = {}
+    for name, p_fp in (("nt", 0.45), ("ss", 0.55), ("co", 0.40), ("ec", 0.20)):
+        flags[f"koi_fpflag_{name}"] = np.where(is_fp, rng.random(n) < p_fp, rng.random(n) < 0.01).astype(np.int64)
+
+    df = pd.DataFrame({
+        "kepid": kepid,
+        "kepoi_name": _ids("K", kepid, None) + pd.Series(occurrence).map(".{:02d}".format).to_numpy(dtype=object),
+        "koi_disposition": disp,
+        "koi_period": period,
+        "koi_duration": duration_h,
+        "koi_depth": depth,
+        "koi_model_snr": depth / 40.0 * np.exp(rng.normal(0.0, 0.6, n)) + np.where(is_fp, 20.0, 0.0),
+        "koi_steff": teff.round(0),
+        "koi_slogg": logg.round(3),
+        "koi_srad": rad.round(3),
+        "koi_kepmag": rng.normal(14.3, 1.3, n).round(3),
+        **flags,
+    })
+    df = _with_nans(rng, df, NAN_RATES["koi"])
+    df["mission"] = "KEPLER"
+    return df
+
+
+def synthetic_k2(n: int, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    disp = rng.choice(["CONFIRMED", "CANDIDATE", "FALSE POSITIVE", "REFUTED"], n,
+                      p=[0.50, 0.38, 0.10, 0.02])
+    is_fp = np.isin(disp, ["FALSE POSITIVE", "REFUTED"])
+    period, duration_h, depth = _transit(rng, n, is_fp)
+    teff, logg, rad = _star(rng, n)
+    epic = _host_ids(rng, n, 201_000_000)
+    named = rng.random(n) < 0.5
+
+    df = pd.DataFrame({
+        "epic_hostname": np.where(rng.random(n) < 0.9, _ids("EPIC ", epic), None),
+        "k2_name": np.where(named, _ids("K2-", epic % 400 + 1, " b"), None),
+        "hostname": np.where(named, _ids("K2-", epic % 400 + 1), _ids("EPIC ", epic)),
+        "Archive_Disposition": disp,
+        "period": period,
+        "depth": depth / 1e4,  # pl_trandep : en %
+        "duration_d": duration_h / 24.0,
+        "st_teff": teff.round(0),
+        "st_logg": logg.round(3),
+        "st_rad": rad.round(3),
+        "kepmag": rng.normal(12.8, 1.5, n).round(3),
+        "tmag": rng.normal(12.0, 1.5, n).round(3),
+    })
+    df = _with_nans(rng, df, NAN_RATES["k2"])
+
+    # colonnes dérivées exactement comme fetch_k2
+    df["object_id"] = df["epic_hostname"].fillna(df["k2_name"]).fillna(df["hostname"]).astype(str)
+    df["star_id"] = df["epic_hostname"].fillna(df["hostname"]).astype(str)
+    df["mag"] = df["kepmag"].fillna(df["tmag"])
+    df["duration_h"] = df["duration_d"] * 24.0
+    df["mission"] = "K2"
+    return df
+
+
+def synthetic_toi(n: int, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    disp = rng.choice(["PC", "FP", "KP", "CP", "APC", "FA"], n,
+                      p=[0.60, 0.15, 0.08, 0.09, 0.06, 0.02])
+    is_fp = np.isin(disp, ["FP", "FA"])
+    period, duration_h, depth = _transit(rng, n, is_fp)
+    teff, logg, rad = _star(rng, n)
+    tic = _host_ids(rng, n, 1_000_000, planets_per_star=1.1)
+    occurrence = pd.Series(tic).groupby(tic).cumcount().to_numpy() + 1
+
+    df = pd.DataFrame({
+        "toi": 100.0 + np.arange(n) + occurrence / 100.0,
+        "TIC_ID": tic,
+        "TFOPWG_Disposition": disp,
+        "Period_days": period,
+        "Duration_hours": duration_h,
+        "Depth_ppm": depth,
+        "st_teff": teff.round(0),
+        "st_logg": logg.round(3),
+        "st_rad": rad.round(3),
+        "TESS_Mag": rng.normal(10.3, 1.6, n).round(3),
+    })
+    df = _with_nans(rng, df, NAN_RATES["toi"])
+    df["mission"] = "TESS"
+    return df
+
+
+SYNTHETIC_FETCHERS = {"koi": synthetic_koi, "k2": synthetic_k2, "toi": synthetic_toi}
+
+
+def synthetic_catalogs(n_rows: int, seed: int = 0) -> dict:
+    """{'koi', 'k2', 'toi'} → frames synthétiques, `n_rows` lignes au total (CATALOG_SHARES)."""
+    out = {}
+    for i, (name, share) in enumerate(CATALOG_SHARES.items()):
+        out[name] = SYNTHETIC_FETCHERS[name](max(1, int(round(n_rows * share))), seed=seed + i)
+    return out
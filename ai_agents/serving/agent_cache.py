@@ -0,0 +1,138 @@
+# agent_cache.py
+# Cache des réponses finales des agents, avec TTL, éviction LRU et coalescence des requêtes identiques.
+#
+# La clé est (route, nom de planète normalisé, question normalisée, version de l'agent). Le nom est
+# ramené en minuscules sans espaces, tirets ni soulignés ("Kepler-22 b" = "kepler22b"). La question
+# est débarrassée des espaces superflus ; None désigne la question par défaut de la route. La version
+# combine le modèle LLM et l'empreinte du fichier de l'agent (instructions, outils), si bien qu'un
+# déploiement qui les change n'hérite d'aucune ancienne réponse.
+# Les requêtes identiques arrivées pendant un run ne relancent pas l'agent : elles attendent ce run
+# unique (single-flight), exécuté dans sa propre tâche. La déconnexion d'un client ne l'annule donc
+# pas pour les autres, et sa réponse est mise en cache même si plus personne ne l'attend. Un échec
+# est transmis à toutes les requêtes en attente mais n'est jamais mis en cache. Il en va de même
+# d'une réponse dégradée : un outil en erreur pendant le run ("tool_errors" non vide, panne
+# Perplexity ou astroquery passagère) ne doit pas être resservi pendant tout le TTL.
+# Le cache n'est utilisé que depuis la boucle asyncio : aucun verrou n'est nécessaire.
+
+import asyncio
+import re
+import time
+from collections import OrderedDict
+
+from serving.metrics import REGISTRY
+from serving.result_cache import model_version
+
+REQUESTS = REGISTRY.counter("agent_cache_requests", "Agent answer cache lookups, by route and result "
+                            "(hit, miss, coalesced).", ("endpoint", "result"))
+
+
+def normalize_name(name: str) -> str:
+    return re.sub(r"[\s_\-]+", "", name or "").casefold()
+
+
+def normalize_query(query):
+    query = " ".join((query or "").split())
+    return query or None
+
+
+def agent_version(module) -> str:
+    """Modèle LLM de l'agent et empreinte de son module (instructions, outils)."""
+    return f"{getattr(module, 'model', 'unknown')}@{model_version(module.__file__)}"
+
+
+class AgentAnswerCache:
+    def __init__(self, max_entries: int = 512, ttl_seconds: float = 3600.0, clock=time.monotonic):
+        self.max_entries = int(max_entries)
+        self.ttl_seconds = float(ttl_seconds)
+        self._clock = clock
+        self._entries = OrderedDict()  # clé → (expiration, réponse)
+        self._inflight = {}  # clé → tâche du run en cours
+        self._counts = {}  # route → {"hits", "misses", "coalesced"}
+        self.evictions = self.expirations = self.degraded = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0 and self.ttl_seconds > 0
+
+    @staticmethod
+    def key(endpoint: str, planet_name: str, query, version: str) -> tuple:
+        return endpoint, normalize_name(planet_name), normalize_query(query), version
+
+    def _count(self, key: tuple, result: str):
+        counts = self._counts.setdefault(key[0], {"hits": 0, "misses": 0, "coalesced": 0})
+        counts[{"hit": "hits", "miss": "misses"}.get(result, result)] += 1
+        REQUESTS.labels(key[0], result).inc()
+
+    def get(self, key: tuple):
+        """Réponse en cache encore valide, None sinon (sans compter la requête)."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry[0] <= self._clock():
+            del self._entries[key]
+            self.expirations += 1
+            return None
+        self._entries.move_to_end(key)
+        return entry[1]
+
+    def put(self, key: tuple, answer):
+        if not self.enabled:
+            return
+        if answer.get("tool_errors"):  # réponse dégradée : la prochaine requête relance l'agent
+            self.degraded += 1
+            return
+        self._entries[key] = (self._clock() + self.ttl_seconds, answer)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def lookup(self, key: tuple):
+        """Comme get, en comptant un hit ou un miss (routes qui ne passent pas par get_or_run)."""
+        answer = self.get(key) if self.enabled else None
+        self._count(key, "hit" if answer is not None else "miss")
+        return answer
+
+    async def get_or_run(self, key: tuple, run):
+        """Réponse de `key` : en cache, celle du run identique en cours, ou celle d'un nouveau run()."""
+        if not self.enabled:
+            return await run()
+        answer = self.get(key)
+        if answer is not None:
+            self._count(key, "hit")
+            return answer
+        task = self._inflight.get(key)
+        if task is not None:
+            self._count(key, "coalesced")
+        else:
+            self._count(key, "miss")
+            task = asyncio.ensure_future(self._run(key, run))
+            task.add_done_callback(lambda t: t.cancelled() or t.exception())  # échec sans attente : pas d'alerte
+            self._inflight[key] = task
+        # shield : l'annulation d'une requête n'interrompt pas le run partagé
+        return await asyncio.shield(task)
+
+    async def _run(self, key: tuple, run):
+        try:
+            answer = await run()
+            self.put(key, answer)
+            return answer
+        finally:
+            self._inflight.pop(key, None)
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self) -> dict:
+        def rates(c):
+            total = c["hits"] + c["misses"] + c["coalesced"]
+            return {**c, "requests": total, "hit_rate": c["hits"] / total if total else None,
+                    # part des requêtes servies sans nouveau run (cache ou run partagé)
+                    "runs_saved_rate": (c["hits"] + c["coalesced"]) / total if total else None}
+
+        totals = {k: sum(c[k] for c in self._counts.values()) for k in ("hits", "misses", "coalesced")}
+        return {"enabled": self.enabled, "entries": len(self._entries), "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds, "inflight": len(self._inflight),
+                "evictions": self.evictions, "expirations": self.expirations, "degraded": self.degraded,
+                **rates(totals),
+                "endpoints": {name: rates(c) for name, c in sorted(self._counts.items())}}
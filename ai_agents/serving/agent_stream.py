@@ -0,0 +1,133 @@
+# agent_stream.py
+# Réponses des agents au fil de l'eau (Server-Sent Events).
+#
+# Les événements de Runner.run_streamed(...).stream_events() sont réduits à des deltas de texte et
+# des appels d'outils (agent_events), puis soit assemblés en une seule réponse JSON pour les routes
+# /analyze historiques (collect), soit relayés au client en SSE dès leur arrivée (sse_response) :
+#   event: delta      data: {"text": "..."}
+#   event: tool_call  data: {"name": "..."}
+#   event: done       data: {"success": true, "tools_used": [...], "tool_errors": [...]}
+#   event: error      data: {"success": false, "error": "..."}
+# Un commentaire `: ping` part après `heartbeat` secondes sans événement (appels d'outils longs) :
+# il garde la connexion ouverte à travers les proxys et révèle une déconnexion au premier envoi.
+# Quand le client se déconnecte, le générateur est annulé et le run de l'agent avec lui
+# (RunResultStreaming.cancel()) : aucun appel LLM ni outil ne continue pour une réponse perdue.
+# `tool_errors` liste les outils qui ont échoué pendant le run (exception ou erreur renvoyée au
+# modèle, relevées par serving.metrics.timed_tool) : la réponse est alors dégradée et n'est pas mise
+# en cache. Une réponse déjà en cache est rejouée en un seul delta suivi de done ({"cached": true}).
+# Ce module ne dépend pas du framework agents : seuls les attributs des événements sont lus.
+
+import asyncio
+
+import orjson
+from starlette.responses import StreamingResponse
+
+from serving.metrics import track_tool_errors
+
+MEDIA_TYPE = "text/event-stream"
+DEFAULT_HEARTBEAT = 15.0
+# pas de mise en cache ni de tampon (nginx) entre l'agent et le client
+HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+
+async def agent_events(result):
+    """("delta", texte) et ("tool_call", nom de l'outil), dans l'ordre du run ; le reste est ignoré."""
+    async for event in result.stream_events():
+        if event.type == "raw_response_event":
+            data = event.data
+            if getattr(data, "type", None) == "response.output_text.delta" and hasattr(data, "delta"):
+                yield "delta", data.delta
+        elif event.type == "run_item_stream_event":
+            item = event.item
+            if item.type == "tool_call_item":
+                yield "tool_call", getattr(item.raw_item, "name", "Tool")
+
+
+async def collect(result, tool_errors: list = None) -> dict:
+    """
+    Run complet : {"result": texte, "tools_used": outils distincts dans l'ordre d'appel,
+    "tool_errors": outils en erreur (liste de track_tool_errors, ouverte avant le lancement du run)}.
+    """
+    parts, tools_used = [], []
+    async for kind, value in agent_events(result):
+        if kind == "delta":
+            parts.append(value)
+        elif value not in tools_used:
+            tools_used.append(value)
+    return {"result": "".join(parts), "tools_used": tools_used, "tool_errors": sorted(set(tool_errors or []))}
+
+
+async def collect_run(start) -> dict:
+    """Comme collect, pour le run lancé par `start()`, en relevant les outils en erreur pendant ce run."""
+    tool_errors = track_tool_errors()
+    return await collect(start(), tool_errors)
+
+
+def cancel_run(result):
+    cancel = getattr(result, "cancel", None)
+    if cancel is not None and not getattr(result, "is_complete", False):
+        cancel()
+
+
+def format_event(event: str, data: dict) -> bytes:
+    return b"event: " + event.encode() + b"\ndata: " + orjson.dumps(data) + b"\n\n"
+
+
+async def sse_events(start, heartbeat: float = DEFAULT_HEARTBEAT, on_done=None):
+    """
+    Flux SSE du run renvoyé par `start()` (appelé dans le flux : une erreur de préparation devient
+    un événement error, le statut HTTP étant déjà envoyé). Le run est annulé si le flux s'arrête
+    avant sa fin (déconnexion du client, erreur). Un run terminé passe sa réponse, comme celle de
+    collect, à `on_done` (mise en cache, sauf si un outil a échoué).
+    """
+    result, pending, parts, tools_used = None, None, [], []
+    try:
+        tool_errors = track_tool_errors()
+        result = start()
+        events = agent_events(result).__aiter__()
+        while True:
+            if pending is None:
+                pending = asyncio.ensure_future(events.__anext__())
+            done, _ = await asyncio.wait({pending}, timeout=heartbeat)
+            if not done:
+                yield b": ping\n\n"
+                continue
+            task, pending = pending, None
+            try:
+                kind, value = task.result()
+            except StopAsyncIteration:
+                break
+            if kind == "delta":
+                parts.append(value)
+                yield format_event("delta", {"text": value})
+            else:
+                if value not in tools_used:
+                    tools_used.append(value)
+                yield format_event("tool_call", {"name": value})
+        answer = {"result": "".join(parts), "tools_used": tools_used, "tool_errors": sorted(set(tool_errors))}
+        if on_done is not None:
+            on_done(answer)
+        yield format_event("done", {"success": True, "tools_used": tools_used, "tool_errors": answer["tool_errors"]})
+    except Exception as e:
+        yield format_event("error", {"success": False, "error": str(e)})
+    finally:
+        if pending is not None:
+            pending.cancel()
+        if result is not None:
+            cancel_run(result)
+
+
+async def sse_replay(answer: dict):
+    if answer["result"]:
+        yield format_event("delta", {"text": answer["result"]})
+    yield format_event("done", {"success": True, "tools_used": answer["tools_used"], "tool_errors": [],
+                                "cached": True})
+
+
+def sse_response(start, heartbeat: float = DEFAULT_HEARTBEAT, on_done=None) -> StreamingResponse:
+    # StreamingResponse écoute http.disconnect (ASGI < 2.4, uvicorn) et annule alors le générateur
+    return StreamingResponse(sse_events(start, heartbeat, on_done), media_type=MEDIA_TYPE, headers=HEADERS)
+
+
+def sse_cached_response(answer: dict) -> StreamingResponse:
+    return StreamingResponse(sse_replay(answer), media_type=MEDIA_TYPE, headers=HEADERS)
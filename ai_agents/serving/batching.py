@@ -0,0 +1,138 @@
+# batching.py
+# Micro-batching adaptatif des prédictions unitaires.
+#
+# Les requêtes /predict concurrentes sont mises en file puis regroupées en un seul appel vectorisé
+# du modèle (au plus `max_batch_size` lignes, en attendant au plus `max_wait_ms` après la première).
+# L'attente est adaptative : quand le lot précédent ne contenait qu'une ligne et que la file est
+# vide (trafic faible), la requête part immédiatement ; pendant qu'un lot est calculé (hors de la
+# boucle asyncio, dans un thread ou l'exécuteur d'inférence) les suivantes s'accumulent, si bien
+# que la taille des lots suit la charge. Chaque appelant reçoit sa propre ligne ; les histogrammes
+# de taille de lot et d'attente en file servent à régler le compromis latence / débit.
+
+import asyncio
+import time
+
+import pandas as pd
+
+from serving.executor import run_predict
+from serving.histogram import Histogram, SIZE_BUCKETS, LATENCY_MS_BUCKETS
+from serving.metrics import REGISTRY
+
+MICROBATCH_SIZE = REGISTRY.histogram("predict_microbatch_size", "Requests coalesced per /predict micro-batch.",
+                                     ("model",), buckets=SIZE_BUCKETS)
+
+
+class MicroBatcher:
+    def __init__(self, predict_fn, max_batch_size: int = 64, max_wait_ms: float = 5.0, name: str = "default"):
+        """
+        `predict_fn(df)` (fonction ou coroutine) → dict colonne → tableau (une valeur par ligne de df) ;
+        `name` : étiquette "model" des métriques exportées.
+        """
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size must be >= 1")
+        self.predict_fn = predict_fn
+        self.max_batch_size = int(max_batch_size)
+        self.max_wait_ms = float(max_wait_ms)
+        self.batch_size = Histogram(SIZE_BUCKETS)
+        self._exported_size = MICROBATCH_SIZE.labels(name)
+        self.queue_wait_ms = Histogram(LATENCY_MS_BUCKETS)
+        self.predict_ms = Histogram(LATENCY_MS_BUCKETS)
+        self._queue = None
+        self._worker = None
+        self._loop = None
+        self._last_size = 0
+
+    def _ensure_worker(self):
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop or self._worker is None or self._worker.done():
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._worker = loop.create_task(self._run())
+
+    async def submit(self, row: dict) -> dict:
+        """Prédiction d'une ligne (dict colonne → valeur), calculée dans le prochain lot."""
+        self._ensure_worker()
+        fut = self._loop.create_future()
+        await self._queue.put((row, fut, time.perf_counter()))
+        return await fut
+
+    async def stop(self):
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+
+    async def _collect(self) -> list:
+        batch = [await self._queue.get()]
+        adaptive_wait = self._last_size > 1 or not self._queue.empty()
+        deadline = self._loop.time() + (self.max_wait_ms / 1000 if adaptive_wait else 0)
+        while len(batch) < self.max_batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+                continue
+            except asyncio.QueueEmpty:
+                pass
+            timeout = deadline - self._loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self):
+        while True:
+            batch = [b for b in await self._collect() if not b[1].done()]  # appelants partis
+            self._last_size = len(batch)
+            if batch:
+                await self._score(batch)
+
+    async def _score(self, batch: list):
+        start = time.perf_counter()
+        for _, _, enqueued in batch:
+            self.queue_wait_ms.observe((start - enqueued) * 1000)
+        self.batch_size.observe(len(batch))
+        self._exported_size.observe(len(batch))
+
+        rows = [row for row, _, _ in batch]
+        try:
+            results = await self._predict_rows(rows)
+        except ValueError:
+            # une ligne invalide ne doit pas faire échouer les autres appelants du lot
+            results = [await self._predict_one(row) for row in rows]
+        except Exception as e:  # modèle absent, exécuteur saturé... : tout le lot échoue
+            results = [e] * len(rows)
+        self.predict_ms.observe((time.perf_counter() - start) * 1000)
+
+        for (_, fut, _), res in zip(batch, results):
+            if fut.done():
+                continue
+            if isinstance(res, Exception):
+                fut.set_exception(res)
+            else:
+                fut.set_result(res)
+
+    async def _predict_rows(self, rows: list) -> list:
+        pred = await run_predict(self.predict_fn, pd.DataFrame(rows))
+        columns = {c: v.tolist() for c, v in pred.items()}
+        return [{c: v[i] for c, v in columns.items()} for i in range(len(rows))]
+
+    async def _predict_one(self, row: dict):
+        try:
+            return (await self._predict_rows([row]))[0]
+        except Exception as e:
+            return e
+
+    def stats(self) -> dict:
+        return {
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait_ms,
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "batch_size": self.batch_size.snapshot(),
+            "queue_wait_ms": self.queue_wait_ms.snapshot(),
+            "predict_ms": self.predict_ms.snapshot(),
+        }
@@ -0,0 +1,90 @@
+# columnar.py
+# Entrées / sorties binaires en colonnes pour le scoring de service à service.
+#
+# Deux formats : flux Arrow IPC (application/vnd.apache.arrow.stream) et archive .npz de colonnes
+# .npy nommées comme les champs d'ExoplanetInput (application/x-npz). Les colonnes numériques sont
+# passées telles quelles au noyau de features (sans copie quand elles sont déjà en float64 sans
+# valeur nulle), la colonne texte `mission` est dictionnaire-encodée : aucun objet Python par ligne
+# n'est construit côté entrée. La réponse est dans le même format (ou celui demandé) : pred_label
+# (dictionnaire Arrow / tableau unicode numpy) et les probabilités float64. La route applique aux
+# colonnes lues les contrôles d'ExoplanetInput (api.input_row_errors, en bloc et sans pydantic) et
+# refuse le corps en listant les lignes invalides.
+
+import io
+import zipfile
+
+import numpy as np
+import pandas as pd
+
+ARROW_STREAM = "application/vnd.apache.arrow.stream"
+NPZ = "application/x-npz"
+FORMATS = {"arrow": ARROW_STREAM, "npz": NPZ}
+
+
+def detect_format(content_type: str):
+    """'arrow' / 'npz' selon le Content-Type, None si non pris en charge."""
+    content_type = (content_type or "").split(";")[0].strip().lower()
+    if content_type in (ARROW_STREAM, "application/vnd.apache.arrow.file", "application/x-arrow"):
+        return "arrow"
+    if content_type in (NPZ, "application/npz"):
+        return "npz"
+    return None
+
+
+def _arrow_column(col):
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    if pa.types.is_string(col.type) or pa.types.is_large_string(col.type) or pa.types.is_dictionary(col.type):
+        enc = col.combine_chunks()
+        if not pa.types.is_dictionary(enc.type):
+            enc = enc.dictionary_encode()
+        codes = enc.indices.fill_null(-1).to_numpy(zero_copy_only=False)
+        return pd.Categorical.from_codes(codes, categories=pd.Index(enc.dictionary.to_pylist()).astype(object))
+    if col.null_count == 0 and col.type == pa.float64() and col.num_chunks == 1:
+        return col.chunk(0).to_numpy(zero_copy_only=True)
+    return pc.cast(col, pa.float64()).to_numpy()  # nulls → NaN
+
+
+def read_columns(body: bytes, fmt: str, columns: list) -> dict:
+    """Colonnes `columns` présentes dans le corps (nom → tableau) ; toutes de même longueur."""
+    if fmt == "arrow":
+        import pyarrow as pa
+
+        try:
+            table = pa.ipc.open_stream(pa.py_buffer(body)).read_all()
+        except pa.ArrowInvalid:
+            table = pa.ipc.open_file(pa.py_buffer(body)).read_all()
+        data = {c: _arrow_column(table.column(c)) for c in columns if c in table.column_names}
+    else:
+        try:
+            with np.load(io.BytesIO(body), allow_pickle=False) as npz:
+                data = {c: npz[c] for c in columns if c in npz.files}
+        except (OSError, zipfile.BadZipFile) as e:
+            raise ValueError(f"invalid .npz body: {e}")
+        for c, arr in data.items():
+            if arr.ndim != 1:
+                raise ValueError(f"column {c!r} must be 1-D, got shape {arr.shape}")
+        n = len(next(iter(data.values()))) if data else 0
+        if any(len(arr) != n for arr in data.values()):
+            raise ValueError("all columns must have the same length")
+    if not data:
+        raise ValueError(f"no known column in body (expected some of {columns})")
+    return data
+
+
+def write_columns(pred: dict, fmt: str) -> bytes:
+    """Prédictions (OUTPUT_COLS → tableaux) encodées en Arrow IPC ou .npz."""
+    if fmt == "arrow":
+        import pyarrow as pa
+
+        arrays = {c: (pa.array(v, pa.string()).dictionary_encode() if c == "pred_label" else pa.array(v))
+                  for c, v in pred.items()}
+        table = pa.table(arrays)
+        sink = pa.BufferOutputStream()
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+        return sink.getvalue().to_pybytes()
+    buf = io.BytesIO()
+    np.savez(buf, **{c: (np.asarray(v).astype(str) if c == "pred_label" else v) for c, v in pred.items()})
+    return buf.getvalue()
@@ -0,0 +1,201 @@
+# executor.py
+# Exécuteur d'inférence : dans des threads du processus API, ou dans un pool de processus.
+#
+# En mode "process", chaque worker charge le modèle une fois (à son démarrage, puis à la première
+# requête d'une nouvelle version) et les lots lui sont envoyés sérialisés ; le GIL du processus API
+# reste libre pour les flux des agents. En mode "thread" (comportement historique), le modèle déjà
+# chargé est appelé dans un pool de threads dédié.
+#
+# Limite d'admission : `capacity = workers * queue_depth` lots en cours au total, tous workers
+# confondus (un seul sémaphore ; le pool choisit le worker, rien ne garantit `queue_depth` lots par
+# worker). Les suivants attendent une place au plus `queue_timeout` secondes : ExecutorBusy n'est
+# levée (l'API répond 503) qu'au-delà, quand la file ne se vide plus. queue_timeout=0 rejette
+# aussitôt ; None attend sans limite.
+#
+# La durée des étapes de chaque lot (features, preprocess, trees), mesurée là où il est calculé,
+# est remontée dans les métriques du processus API.
+
+import asyncio
+import multiprocessing
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from serving.histogram import SIZE_BUCKETS
+from serving.metrics import REGISTRY
+
+MODES = ("thread", "process")
+# modèles gardés en mémoire par worker (bascule de version sans rechargement en boucle)
+WORKER_MAX_MODELS = 2
+
+STAGE_SECONDS = REGISTRY.histogram("inference_stage_seconds",
+                                   "Model inference time per batch, by stage (features, preprocess, trees).",
+                                   ("stage",))
+BATCH_ROWS = REGISTRY.histogram("inference_batch_rows", "Rows per model evaluation.", buckets=SIZE_BUCKETS)
+
+
+class ExecutorBusy(RuntimeError):
+    pass
+
+
+async def run_predict(predict_fn, data):
+    """Appelle `predict_fn(data)` sans bloquer la boucle asyncio (coroutine ou fonction bloquante)."""
+    if asyncio.iscoroutinefunction(predict_fn):
+        return await predict_fn(data)
+    return await asyncio.to_thread(predict_fn, data)
+
+
+# --------------------------
+# Côté worker (mode process)
+# --------------------------
+_WORKER_MODELS = OrderedDict()
+
+
+def _worker_model(path: str, version: str):
+    from classifiers.exoplanet_classifier import load_model
+
+    loaded = _WORKER_MODELS.get(version)
+    if loaded is None:
+        loaded = load_model(path)
+        _WORKER_MODELS[version] = loaded
+        while len(_WORKER_MODELS) > WORKER_MAX_MODELS:
+            _WORKER_MODELS.popitem(last=False)
+    _WORKER_MODELS.move_to_end(version)
+    return loaded
+
+
+def _worker_init(path: str, version: str):
+    if path is not None:
+        _worker_model(path, version)
+
+
+def _worker_predict(path: str, version: str, data) -> tuple:
+    from classifiers.inference import predict_arrays
+
+    model, all_num_cols, cat_cols, label_map = _worker_model(path, version)
+    timings = {}
+    return predict_arrays(model, all_num_cols, cat_cols, data, label_map, timings), timings
+
+
+def _thread_predict(loaded: dict, data) -> tuple:
+    from classifiers.inference import predict_arrays
+
+    timings = {}
+    return predict_arrays(loaded["model"], loaded["all_num_cols"], loaded["cat_cols"], data,
+                          loaded["label_map"], timings), timings
+
+
+class InferenceExecutor:
+    def __init__(self, mode: str = "thread", workers: int = 2, queue_depth: int = 4, queue_timeout: float = 30.0):
+        if mode not in MODES:
+            raise ValueError(f"mode must be one of {MODES}, got {mode!r}")
+        self.mode = mode
+        self.workers = max(1, int(workers))
+        self.queue_depth = max(1, int(queue_depth))
+        self.queue_timeout = queue_timeout
+        self._pool = None
+        self._preload = (None, None)
+        self._lock = threading.Lock()
+        self._slots, self._slots_loop = None, None
+        self.inflight = self.waiting = self.completed = self.rejected = self.restarts = 0
+
+    @property
+    def capacity(self) -> int:
+        """Lots en cours au plus, tous workers confondus (queue_depth est une moyenne par worker)."""
+        return self.workers * self.queue_depth
+
+    def start(self, path: str = None, version: str = None):
+        """Crée le pool ; en mode process, les workers chargent le modèle `path` dès leur démarrage."""
+        self._preload = (path, version)
+        self._get_pool()
+
+    def _get_pool(self):
+        with self._lock:
+            if self._pool is None:
+                if self.mode == "process":
+                    # spawn : pas de fork d'un processus qui a déjà des threads (uvicorn, pools)
+                    self._pool = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context("spawn"),
+                                                     initializer=_worker_init, initargs=self._preload)
+                else:
+                    self._pool = ThreadPoolExecutor(self.workers, thread_name_prefix="inference")
+            return self._pool
+
+    def _semaphore(self) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        if self._slots_loop is not loop:  # un sémaphore par boucle asyncio (tests, benchmarks)
+            self._slots, self._slots_loop = asyncio.Semaphore(self.capacity), loop
+        return self._slots
+
+    async def _acquire(self, timeout) -> asyncio.Semaphore:
+        slots = self._semaphore()
+        if not slots.locked():
+            await slots.acquire()
+            return slots
+        if timeout is not None and timeout <= 0:
+            with self._lock:
+                self.rejected += 1
+            raise ExecutorBusy(f"inference executor saturated ({self.capacity} batches in flight)")
+        with self._lock:
+            self.waiting += 1
+        try:
+            await asyncio.wait_for(slots.acquire(), timeout)
+            return slots
+        except asyncio.TimeoutError:
+            with self._lock:
+                self.rejected += 1
+            raise ExecutorBusy(f"inference executor saturated ({self.capacity} batches in flight, "
+                               f"no slot after {timeout:g}s)") from None
+        finally:
+            with self._lock:
+                self.waiting -= 1
+
+    async def predict(self, loaded: dict, data, wait: bool = False) -> dict:
+        """
+        Prédictions (colonne → tableau) de `data` avec le modèle `loaded` : dict "path", "version",
+        "model", "all_num_cols", "cat_cols", "label_map" (les deux premiers suffisent en mode process).
+        Si l'exécuteur est plein, attend une place au plus `queue_timeout` secondes (sans limite si `wait`).
+        """
+        slots = await self._acquire(None if wait else self.queue_timeout)
+        with self._lock:
+            self.inflight += 1
+        try:
+            pool = self._get_pool()
+            loop = asyncio.get_running_loop()
+            if self.mode == "process":
+                fut = loop.run_in_executor(pool, _worker_predict, loaded["path"], loaded["version"], data)
+            else:
+                fut = loop.run_in_executor(pool, _thread_predict, loaded, data)
+            try:
+                out, timings = await fut
+            except BrokenProcessPool:
+                # worker tué (OOM...) : pool recréé au prochain appel
+                with self._lock:
+                    if self._pool is pool:
+                        self._pool = None
+                        self.restarts += 1
+                pool.shutdown(wait=False, cancel_futures=True)
+                raise
+            with self._lock:
+                self.completed += 1
+            for stage, seconds in timings.items():
+                STAGE_SECONDS.labels(stage).observe(seconds)
+            BATCH_ROWS.observe(len(next(iter(out.values()))))
+            return out
+        finally:
+            with self._lock:
+                self.inflight -= 1
+            slots.release()
+
+    def shutdown(self):
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"mode": self.mode, "workers": self.workers, "queue_depth": self.queue_depth,
+                    "capacity": self.capacity, "queue_timeout": self.queue_timeout, "inflight": self.inflight,
+                    "waiting": self.waiting, "completed": self.completed,
+                    "rejected": self.rejected, "restarts": self.restarts}
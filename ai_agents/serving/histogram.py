@@ -0,0 +1,55 @@
+# histogram.py
+# Histogrammes à buckets fixes (compteurs cumulés façon Prometheus) pour les métriques du service.
+
+import bisect
+import math
+import threading
+
+# bornes supérieures par défaut
+SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024)
+LATENCY_MS_BUCKETS = (0.5, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000)
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = tuple(sorted(buckets))
+        self._counts = [0] * (len(self.buckets) + 1)  # dernier : +Inf
+        self._sum = 0.0
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        i = bisect.bisect_left(self.buckets, value)  # premier bucket de borne >= value
+        with self._lock:
+            self._counts[i] += 1
+            self._sum += value
+            self._count += 1
+
+    def quantile(self, q: float) -> float:
+        """Borne supérieure du bucket contenant le quantile q (approximation)."""
+        with self._lock:
+            counts, total = list(self._counts), self._count
+        if not total:
+            return math.nan
+        rank, acc = q * total, 0
+        for b, c in zip(self.buckets + (math.inf,), counts):
+            acc += c
+            if acc >= rank:
+                return b
+        return math.inf
+
+    def snapshot(self) -> dict:
+        """{"buckets": {borne: nombre cumulé d'observations <= borne}, "count", "sum", "mean"}."""
+        with self._lock:
+            counts, total, s = list(self._counts), self._count, self._sum
+        cumulative, acc = {}, 0
+        for b, c in zip(self.buckets + ("+Inf",), counts):
+            acc += c
+            cumulative[str(b)] = acc
+        return {"buckets": cumulative, "count": total, "sum": s, "mean": s / total if total else None}
+
+    def reset(self):
+        with self._lock:
+            self._counts = [0] * (len(self.buckets) + 1)
+            self._sum = 0.0
+            self._count = 0
@@ -0,0 +1,218 @@
+# metrics.py
+# Métriques du service au format texte Prometheus (GET /metrics).
+#
+# Compteurs et histogrammes étiquetés, déclarés une fois au niveau module dans le registre global
+# REGISTRY. Chaque combinaison d'étiquettes est un enfant créé à la première observation puis
+# réutilisé : enregistrer une mesure coûte un accès dict, une recherche dichotomique et un verrou,
+# assez peu pour rester actif en production. La mise en forme n'a lieu qu'au scrape.
+# MetricsMiddleware mesure les requêtes HTTP par route (gabarit du chemin, pas l'URL : le nombre de
+# séries reste borné) ; timed_tool mesure les appels d'outils des agents, et relève leurs erreurs
+# pour le run en cours (track_tool_errors) afin qu'une réponse dégradée ne soit pas mise en cache.
+
+import asyncio
+import functools
+import threading
+import time
+from contextvars import ContextVar
+
+from serving.histogram import Histogram
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+SECONDS_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+
+class Counter:
+    def __init__(self):
+        self._value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0):
+        with self._lock:
+            self._value += amount
+
+    @property
+    def value(self) -> float:
+        return self._value
+
+
+class Family:
+    """Métrique nommée ; `labels(*valeurs)` renvoie l'enfant (Counter ou Histogram) de ces étiquettes."""
+
+    def __init__(self, name: str, kind: str, help: str, labelnames: tuple, factory):
+        self.name = name
+        self.kind = kind
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._factory = factory
+        self._children = {}
+        self._lock = threading.Lock()
+
+    def labels(self, *values):
+        values = tuple(str(v) for v in values)
+        child = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}, got {values}")
+            with self._lock:
+                child = self._children.setdefault(values, self._factory())
+        return child
+
+    # métriques sans étiquette
+    def inc(self, amount: float = 1.0):
+        self.labels().inc(amount)
+
+    def observe(self, value: float):
+        self.labels().observe(value)
+
+    def samples(self):
+        """(suffixe, étiquettes, valeur) de chaque série."""
+        for values, child in sorted(self._children.items()):
+            labels = dict(zip(self.labelnames, values))
+            if self.kind == "counter":
+                yield "_total", labels, child.value
+                continue
+            snap = child.snapshot()
+            for le, count in snap["buckets"].items():
+                yield "_bucket", {**labels, "le": le}, count
+            yield "_sum", labels, snap["sum"]
+            yield "_count", labels, snap["count"]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", r"\\").replace("\n", r"\n").replace('"', r"\"")
+
+
+def _format_value(v: float) -> str:
+    return str(int(v)) if float(v).is_integer() else repr(float(v))
+
+
+class Registry:
+    def __init__(self):
+        self._families = {}
+        self._lock = threading.Lock()
+
+    def _family(self, name, kind, help, labelnames, factory) -> Family:
+        with self._lock:
+            family = self._families.get(name)
+            if family is None:
+                family = self._families[name] = Family(name, kind, help, labelnames, factory)
+            elif family.kind != kind or family.labelnames != tuple(labelnames):
+                raise ValueError(f"metric {name} already registered as {family.kind}{family.labelnames}")
+            return family
+
+    def counter(self, name: str, help: str, labelnames: tuple = ()) -> Family:
+        """Compteur `name` (exposé en `name_total`) ; idempotent : une même déclaration renvoie la même famille."""
+        return self._family(name, "counter", help, labelnames, Counter)
+
+    def histogram(self, name: str, help: str, labelnames: tuple = (), buckets=SECONDS_BUCKETS) -> Family:
+        return self._family(name, "histogram", help, labelnames, lambda: Histogram(buckets))
+
+    def render(self) -> str:
+        """Exposition texte Prometheus de toutes les métriques."""
+        with self._lock:
+            families = sorted(self._families.values(), key=lambda f: f.name)
+        lines = []
+        for f in families:
+            lines.append(f"# HELP {f.name}{'_total' if f.kind == 'counter' else ''} {f.help}")
+            lines.append(f"# TYPE {f.name}{'_total' if f.kind == 'counter' else ''} {f.kind}")
+            for suffix, labels, value in f.samples():
+                lab = ",".join(f'{k}="{_escape(v)}"' for k, v in labels.items())
+                lines.append(f"{f.name}{suffix}{'{' + lab + '}' if lab else ''} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+
+# --------------------------
+# Requêtes HTTP
+# --------------------------
+class MetricsMiddleware:
+    """Middleware ASGI : nombre de requêtes par (méthode, route, statut) et durée jusqu'au dernier octet."""
+
+    def __init__(self, app, registry: Registry = REGISTRY):
+        self.app = app
+        self.requests = registry.counter("http_requests", "HTTP requests by route and status.",
+                                         ("method", "route", "status"))
+        self.duration = registry.histogram("http_request_duration_seconds",
+                                           "HTTP request latency until the response is fully sent.",
+                                           ("method", "route"))
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        start = time.perf_counter()
+        status = [500]
+
+        async def send_with_status(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            # le routeur renseigne scope["route"] ; URL sans route : une seule série
+            route = getattr(scope.get("route"), "path", None) or "<unmatched>"
+            self.duration.labels(scope["method"], route).observe(time.perf_counter() - start)
+            self.requests.labels(scope["method"], route, status[0]).inc()
+
+
+# --------------------------
+# Outils des agents
+# --------------------------
+TOOL_DURATION = REGISTRY.histogram("agent_tool_duration_seconds", "Agent tool call latency.", ("tool",))
+TOOL_ERRORS = REGISTRY.counter("agent_tool_errors", "Agent tool calls that raised or returned an error.", ("tool",))
+# outils en erreur du run d'agent en cours : la liste est partagée par les tâches que le run crée
+# (elles copient le contexte), les outils y ajoutent leur nom
+_RUN_TOOL_ERRORS = ContextVar("run_tool_errors", default=None)
+
+
+def track_tool_errors() -> list:
+    """Liste (vide) des outils en erreur, remplie par les appels timed_tool lancés depuis ce contexte."""
+    errors = []
+    _RUN_TOOL_ERRORS.set(errors)
+    return errors
+
+
+def timed_tool(is_error=None):
+    """
+    Décorateur (sous @function_tool) : durée de chaque appel de l'outil et nombre d'erreurs.
+    Une exception est une erreur ; `is_error(résultat)` repère les outils qui renvoient leurs
+    erreurs au modèle au lieu de lever. La signature est conservée (schéma de l'outil inchangé).
+    """
+    def decorate(fn):
+        duration, errors = TOOL_DURATION.labels(fn.__name__), TOOL_ERRORS.labels(fn.__name__)
+
+        def record(start, result=None, failed=False):
+            duration.observe(time.perf_counter() - start)
+            if failed or (is_error is not None and is_error(result)):
+                errors.inc()
+                run_errors = _RUN_TOOL_ERRORS.get()
+                if run_errors is not None:
+                    run_errors.append(fn.__name__)
+
+        if asyncio.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def wrapper(*args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    result = await fn(*args, **kwargs)
+                except BaseException:
+                    record(start, failed=True)
+                    raise
+                record(start, result)
+                return result
+        else:
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    result = fn(*args, **kwargs)
+                except BaseException:
+                    record(start, failed=True)
+                    raise
+                record(start, result)
+                return result
+        return wrapper
+    return decorate
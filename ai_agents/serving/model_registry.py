@@ -0,0 +1,195 @@
+# model_registry.py
+# Registre des modèles servis : découverte dans un répertoire, chargement paresseux, bascule
+# atomique du modèle par défaut et éviction sous plafond mémoire.
+#
+# Chaque bundle (.pkl / .joblib) ou artefact (répertoire avec manifest.json) de `model_dir` est un
+# modèle nommé d'après son fichier (un artefact l'emporte sur un bundle de même nom). Un modèle
+# n'est chargé qu'à sa première utilisation. Une requête garde une référence à l'entrée qu'elle a
+# obtenue : changer le modèle par défaut ou redéployer un fichier (refresh) remplace l'entrée du
+# registre sans interrompre les requêtes en cours, qui terminent avec l'ancienne version. Au-delà
+# de `memory_cap_bytes`, les modèles inactifs (hors défaut, sans requête en cours) les moins
+# récemment utilisés sont déchargés.
+
+import asyncio
+import os
+import threading
+import time
+from contextlib import asynccontextmanager
+from pathlib import Path
+
+BUNDLE_SUFFIXES = (".pkl", ".joblib")
+
+
+class UnknownModel(KeyError):
+    pass
+
+
+def _signature(path: str) -> tuple:
+    """(mtime, taille) : détecte un redéploiement sans relire le contenu."""
+    p = Path(path)
+    if p.is_dir():
+        files = [f for f in p.rglob("*") if f.is_file()]
+        return (max((f.stat().st_mtime_ns for f in files), default=0), sum(f.stat().st_size for f in files))
+    st = p.stat()
+    return (st.st_mtime_ns, st.st_size)
+
+
+def discover(model_dir: str) -> dict:
+    """{nom: chemin} des bundles et artefacts de `model_dir`."""
+    from classifiers.artifact import is_artifact
+
+    found = {}
+    root = Path(model_dir)
+    if not root.is_dir():
+        return found
+    for p in sorted(root.iterdir()):
+        if p.name.startswith("."):
+            continue
+        if is_artifact(p):
+            found[p.name] = str(p)
+        elif p.is_file() and p.suffix in BUNDLE_SUFFIXES:
+            found.setdefault(p.stem, str(p))
+    return found
+
+
+def _new_entry(name: str, path: str) -> dict:
+    return {"name": name, "path": path, "signature": _signature(path), "version": None,
+            "model": None, "all_num_cols": None, "cat_cols": None, "label_map": None,
+            "loaded": False, "loaded_at": None, "load_seconds": None, "size_bytes": _signature(path)[1],
+            "requests": 0, "inflight": 0, "last_used": None, "lock": threading.Lock()}
+
+
+class ModelRegistry:
+    def __init__(self, model_dir: str, default: str = None, memory_cap_bytes: int = None, load: bool = True):
+        """
+        `default` : nom ou chemin du modèle par défaut (ajouté au registre s'il est hors de model_dir).
+        `load=False` : les modèles ne sont pas chargés dans ce processus (exécuteur en mode process),
+        seules leur version et leur taille sont calculées.
+        """
+        self.model_dir = model_dir
+        self.memory_cap_bytes = memory_cap_bytes
+        self.load = load
+        self._lock = threading.Lock()
+        self._entries = {}
+        self.evictions = 0
+        self.refresh()
+        if default is not None and default not in self._entries:
+            path = str(default)
+            name = Path(path).stem if Path(path).suffix in BUNDLE_SUFFIXES else Path(path).name
+            if name not in self._entries:
+                if not os.path.exists(path):
+                    raise FileNotFoundError(f"default model not found: {path}")
+                self._entries[name] = _new_entry(name, path)
+            default = name
+        self.default = default or next(iter(sorted(self._entries)), None)
+
+    def names(self) -> list:
+        with self._lock:
+            return sorted(self._entries)
+
+    def refresh(self) -> dict:
+        """Relit model_dir : nouveaux modèles ajoutés, fichiers modifiés remplacés par une entrée neuve."""
+        found = discover(self.model_dir)
+        changes = {"added": [], "updated": [], "removed": []}
+        with self._lock:
+            for name, path in found.items():
+                old = self._entries.get(name)
+                if old is None:
+                    self._entries[name] = _new_entry(name, path)
+                    changes["added"].append(name)
+                elif old["path"] != path or old["signature"] != _signature(path):
+                    self._entries[name] = _new_entry(name, path)
+                    changes["updated"].append(name)
+            model_root = os.path.abspath(self.model_dir)
+            for name in list(self._entries):
+                path = self._entries[name]["path"]
+                in_dir = os.path.dirname(os.path.abspath(path)) == model_root
+                if in_dir and name not in found and name != getattr(self, "default", None):
+                    del self._entries[name]
+                    changes["removed"].append(name)
+        return changes
+
+    def set_default(self, name: str):
+        """Bascule atomique : les nouvelles requêtes utilisent `name`, celles en cours finissent."""
+        self.get(name)  # chargé avant de recevoir du trafic ; un échec laisse l'ancien défaut en place
+        with self._lock:
+            if name not in self._entries:
+                raise UnknownModel(name)
+            self.default = name
+
+    def resolve(self, name: str = None) -> dict:
+        """Entrée (éventuellement non chargée) du modèle `name`, défaut si None."""
+        with self._lock:
+            name = name or self.default
+            if name is None or name not in self._entries:
+                raise UnknownModel(name)
+            return self._entries[name]
+
+    def get(self, name: str = None) -> dict:
+        """Entrée chargée du modèle `name` (défaut si None) ; UnknownModel si inconnu."""
+        entry = self.resolve(name)
+        self._load(entry)
+        self._evict()
+        return entry
+
+    def _load(self, entry: dict):
+        from classifiers.exoplanet_classifier import load_model
+        from serving.result_cache import model_version
+
+        with entry["lock"]:  # requêtes concurrentes : un seul chargement
+            if entry["version"] is None:
+                entry["version"] = model_version(entry["path"])
+            if self.load and not entry["loaded"]:
+                t0 = time.perf_counter()
+                entry["model"], entry["all_num_cols"], entry["cat_cols"], entry["label_map"] = load_model(entry["path"])
+                entry["load_seconds"] = time.perf_counter() - t0
+                entry["loaded_at"] = entry["last_used"] = time.time()
+                entry["loaded"] = True
+
+    @asynccontextmanager
+    async def use(self, name: str = None):
+        """Entrée chargée du modèle pour la durée d'une requête (jamais déchargée pendant celle-ci)."""
+        entry = self.resolve(name)
+        with self._lock:
+            entry["inflight"] += 1
+            entry["requests"] += 1
+            entry["last_used"] = time.time()
+        try:
+            if entry["version"] is None or (self.load and not entry["loaded"]):
+                await asyncio.to_thread(self._load, entry)  # hors de la boucle asyncio
+                self._evict()
+            yield entry
+        finally:
+            with self._lock:
+                entry["inflight"] -= 1
+            self._evict()  # plafond dépassé pendant la requête : déchargé dès qu'il est inactif
+
+    def _evict(self):
+        if self.memory_cap_bytes is None:
+            return
+        with self._lock:
+            loaded = [e for e in self._entries.values() if e["loaded"]]
+            total = sum(e["size_bytes"] for e in loaded)
+            idle = sorted((e for e in loaded if e["name"] != self.default and e["inflight"] == 0),
+                          key=lambda e: e["last_used"] or 0)
+            for e in idle:
+                if total <= self.memory_cap_bytes:
+                    break
+                e["model"] = None
+                e["loaded"] = False
+                total -= e["size_bytes"]
+                self.evictions += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            entries = list(self._entries.values())
+            default = self.default
+        return {
+            "default": default,
+            "memory_cap_bytes": self.memory_cap_bytes,
+            "loaded_bytes": sum(e["size_bytes"] for e in entries if e["loaded"]),
+            "evictions": self.evictions,
+            "models": [{k: e[k] for k in ("name", "path", "version", "loaded", "loaded_at", "load_seconds",
+                                          "size_bytes", "requests", "inflight", "last_used")}
+                       | {"default": e["name"] == default} for e in entries],
+        }
@@ -0,0 +1,10 @@
+# responses.py
+# Réponse JSON sérialisée par orjson (types numpy compris), classe de réponse par défaut de l'API.
+
+import orjson
+from starlette.responses import JSONResponse
+
+
+class ORJSONResponse(JSONResponse):
+    def render(self, content) -> bytes:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY)
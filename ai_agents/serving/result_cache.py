@@ -0,0 +1,150 @@
+# result_cache.py
+# Cache LRU en mémoire des prédictions, lié à la version du modèle chargé.
+#
+# La clé d'une ligne est son vecteur d'entrée canonisé (champs numériques en float, valeurs
+# manquantes, invalides ou — pour period / duration / depth — non positives ramenées à None,
+# comme le fait le noyau de features) ; deux saisies équivalentes partagent donc la même entrée.
+# Un lot n'envoie au modèle que ses lignes absentes du cache. Le cache est vidé dès que la
+# version du modèle (empreinte de son contenu) change.
+
+import hashlib
+import math
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from classifiers.features import POSITIVE_COLS
+
+
+def model_version(path: str) -> str:
+    """Empreinte du contenu d'un modèle (fichier bundle ou répertoire artefact)."""
+    h = hashlib.sha256()
+    if os.path.isdir(path):
+        files = sorted(os.path.join(root, f) for root, _, names in os.walk(path) for f in names)
+    else:
+        files = [path]
+    for f in files:
+        h.update(os.path.relpath(f, path).encode() if f != path else b"")
+        with open(f, "rb") as fh:
+            for block in iter(lambda: fh.read(1 << 20), b""):
+                h.update(block)
+    return h.hexdigest()[:16]
+
+
+def _canonical_number(v, positive: bool):
+    try:
+        x = float(v)
+    except (TypeError, ValueError):
+        return None
+    if math.isnan(x) or (positive and not x > 0):
+        return None
+    return x + 0.0  # -0.0 → 0.0
+
+
+def _canonical_text(v):
+    return None if v is None or (isinstance(v, float) and math.isnan(v)) else str(v)
+
+
+class PredictionCache:
+    def __init__(self, columns: list, max_entries: int = 100_000, text_cols=("mission",)):
+        self.columns = sorted(columns)
+        self.text_cols = set(text_cols)
+        self.max_entries = int(max_entries)
+        self.version = None
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.evictions = self.invalidations = 0
+
+    def bind(self, version: str):
+        """Associe le cache à la version `version` du modèle ; le vide si elle a changé."""
+        with self._lock:
+            if version != self.version:
+                if self.version is not None:
+                    self.invalidations += 1
+                self._entries.clear()
+                self.version = version
+
+    def keys(self, df: pd.DataFrame) -> list:
+        n = len(df)
+        cols = []
+        for c in self.columns:
+            if c not in df.columns:
+                cols.append([None] * n)
+            elif c in self.text_cols:
+                cols.append([_canonical_text(v) for v in df[c].tolist()])
+            else:
+                positive = c in POSITIVE_COLS
+                cols.append([_canonical_number(v, positive) for v in df[c].tolist()])
+        return list(zip(*cols)) if cols else [()] * n
+
+    def _lookup(self, keys: list):
+        rows, missing = [None] * len(keys), {}
+        with self._lock:
+            for i, k in enumerate(keys):
+                hit = self._entries.get(k)
+                if hit is not None:
+                    self._entries.move_to_end(k)
+                    rows[i] = hit
+                else:
+                    missing.setdefault(k, []).append(i)
+            n_missing = sum(len(v) for v in missing.values())
+            self.hits += len(keys) - n_missing
+            self.misses += n_missing
+        return rows, missing
+
+    def _fill(self, rows: list, missing: dict, pred: dict, version: str) -> dict:
+        names = list(pred)
+        values = list(zip(*[pred[c].tolist() for c in names]))
+        with self._lock:
+            store = version == self.version  # modèle changé pendant le calcul : ne pas stocker
+            for (k, idx), v in zip(missing.items(), values):
+                row = dict(zip(names, v))
+                for i in idx:
+                    rows[i] = row
+                if store:
+                    self._entries[k] = row
+                    self._entries.move_to_end(k)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        names = list(rows[0])
+        return {c: np.array([r[c] for r in rows], dtype=object if c == "pred_label" else np.float64)
+                for c in names}
+
+    @staticmethod
+    def _missing_frame(df: pd.DataFrame, missing: dict) -> pd.DataFrame:
+        first = [idx[0] for idx in missing.values()]  # doublons du lot calculés une fois
+        return df.iloc[first].reset_index(drop=True)
+
+    def predict(self, df: pd.DataFrame, predict_fn) -> dict:
+        """Prédictions de `df` (colonne → tableau) ; seules les lignes absentes passent par predict_fn."""
+        if self.max_entries <= 0 or len(df) == 0:
+            return predict_fn(df)
+        version = self.version
+        rows, missing = self._lookup(self.keys(df))
+        pred = predict_fn(self._missing_frame(df, missing)) if missing else {}
+        return self._fill(rows, missing, pred, version)
+
+    async def apredict(self, df: pd.DataFrame, predict_fn) -> dict:
+        """Comme predict, avec `predict_fn` coroutine (exécuteur d'inférence)."""
+        if self.max_entries <= 0 or len(df) == 0:
+            return await predict_fn(df)
+        version = self.version
+        rows, missing = self._lookup(self.keys(df))
+        pred = await predict_fn(self._missing_frame(df, missing)) if missing else {}
+        return self._fill(rows, missing, pred, version)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {"model_version": self.version, "entries": len(self._entries),
+                    "max_entries": self.max_entries, "hits": self.hits, "misses": self.misses,
+                    "hit_rate": self.hits / total if total else None,
+                    "evictions": self.evictions, "invalidations": self.invalidations}
@@ -0,0 +1,236 @@
+# streaming.py
+# Prédiction en flux pour les gros imports (NDJSON ou CSV), à mémoire bornée.
+#
+# Le corps de la requête est lu au fil de l'eau, découpé en lignes puis en blocs de `chunk_rows`
+# lignes ; chaque bloc est parsé, scoré par un seul appel du modèle (dans un thread) et renvoyé
+# aussitôt en NDJSON ou CSV. Seul un bloc à la fois est en mémoire, quelle que soit la taille de
+# l'upload. Les lignes ne passent pas par pydantic : les champs numériques sont convertis (valeur
+# invalide → NaN), puis `validate_fn` applique ligne à ligne les contrôles d'ExoplanetInput
+# (mission, unités de duration/depth) ; une ligne refusée n'est pas scorée. Une ligne refusée ou
+# illisible, ou un bloc illisible, produit un enregistrement d'erreur au lieu d'interrompre le
+# flux (le statut HTTP est déjà envoyé).
+# La plupart des clients HTTP/1.1 envoient tout le corps avant de lire la réponse : les résultats
+# passent donc par un fichier temporaire (spool) pour que la lecture de l'upload ne soit jamais
+# bloquée par l'envoi. La mémoire reste bornée (SPOOL_MEMORY_BYTES, au-delà le spool passe sur
+# disque) ; le fichier est vidé chaque fois que l'envoi a rattrapé la production, il porte donc la
+# sortie produite pendant que le client ne lit pas. Pour un client qui envoie tout avant de lire,
+# c'est toute la sortie de l'appel : ~100 octets par ligne en NDJSON (~1 Go pour 10 M de lignes),
+# libérés à la fin de la réponse.
+
+import asyncio
+import csv
+import io
+import tempfile
+
+import orjson
+import pandas as pd
+from starlette.requests import ClientDisconnect
+from starlette.responses import StreamingResponse
+
+from classifiers.inference import OUTPUT_COLS
+from serving.executor import run_predict
+
+FORMATS = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+DEFAULT_CHUNK_ROWS = 10_000
+MAX_LINE_BYTES = 1 << 20
+SPOOL_MEMORY_BYTES = 8 << 20
+SPOOL_READ_BYTES = 1 << 20
+
+
+def detect_format(content_type: str, default: str = "ndjson") -> str:
+    content_type = (content_type or "").split(";")[0].strip().lower()
+    if content_type in ("text/csv", "application/csv"):
+        return "csv"
+    if content_type in ("application/x-ndjson", "application/ndjson", "application/jsonl", "application/json-lines"):
+        return "ndjson"
+    return default
+
+
+async def iter_lines(chunks, max_line_bytes: int = MAX_LINE_BYTES):
+    """Lignes (bytes, sans fin de ligne) d'un flux d'octets ; les lignes vides sont ignorées."""
+    buf = b""
+    async for chunk in chunks:
+        buf += chunk
+        *lines, buf = buf.split(b"\n")
+        for line in lines:
+            line = line.rstrip(b"\r")
+            if line.strip():
+                yield line
+        if len(buf) > max_line_bytes:
+            raise ValueError(f"line longer than {max_line_bytes} bytes")
+    if buf.strip():
+        yield buf.rstrip(b"\r")
+
+
+def parse_ndjson(lines: list, columns: list):
+    """(DataFrame des lignes valides restreint à `columns`, positions valides, erreurs {position: message})."""
+    records, valid, errors = [], [], {}
+    for i, line in enumerate(lines):
+        try:
+            rec = orjson.loads(line)
+        except ValueError as e:
+            errors[i] = f"invalid JSON: {e}"
+            continue
+        if not isinstance(rec, dict):
+            errors[i] = "expected a JSON object"
+            continue
+        records.append(rec)
+        valid.append(i)
+    df = pd.DataFrame.from_records(records, columns=columns) if records else pd.DataFrame(columns=columns)
+    return df, valid, errors
+
+
+def parse_csv(header: bytes, lines: list, columns: list, text_cols=()):
+    """Comme parse_ndjson pour un bloc CSV (`header` : ligne d'en-tête) ; `text_cols` lues en texte."""
+    names = next(csv.reader([header.decode("utf-8-sig")]))
+    usecols = [c for c in names if c in columns]
+    df = pd.read_csv(io.BytesIO(header + b"\n" + b"\n".join(lines)), usecols=usecols,
+                     dtype={c: str for c in usecols if c in text_cols})
+    if len(df) != len(lines):
+        raise ValueError("malformed CSV chunk (quoted newlines are not supported)")
+    return df.reindex(columns=columns), list(range(len(lines))), {}
+
+
+def encode(rows: dict, fmt: str, header: bool) -> bytes:
+    """Bloc de résultats (colonne → liste) encodé en NDJSON ou CSV."""
+    if fmt == "csv":
+        out = io.StringIO()
+        pd.DataFrame(rows).to_csv(out, index=False, header=header)
+        return out.getvalue().encode()
+    keys = list(rows)
+    values = [rows[k] for k in keys]
+    return b"".join(orjson.dumps({k: v for k, v in zip(keys, row) if v is not None}) + b"\n"
+                    for row in zip(*values))
+
+
+def _result_rows(start: int, n: int, valid: list, pred: dict, errors: dict, keep: dict, scored: list = None) -> dict:
+    """`valid` : positions parsées (colonnes `keep`) ; `scored` : positions prédites (défaut : `valid`)."""
+    rows = {"row": list(range(start, start + n))}
+    for c, values in keep.items():
+        rows[c] = [None] * n
+        for i, v in zip(valid, values):
+            rows[c][i] = v
+    for c in OUTPUT_COLS:
+        rows[c] = [None] * n
+        if pred is not None:
+            for i, v in zip(valid if scored is None else scored, pred[c].tolist()):
+                rows[c][i] = v
+    rows["error"] = [errors.get(i) for i in range(n)]
+    return rows
+
+
+async def stream_predictions(chunks, predict_fn, columns: list, in_format: str = "ndjson",
+                             out_format: str = "ndjson", chunk_rows: int = DEFAULT_CHUNK_ROWS,
+                             keep: list = (), max_line_bytes: int = MAX_LINE_BYTES, validate_fn=None):
+    """
+    Générateur asynchrone d'octets : prédictions de chaque ligne du flux `chunks` (bytes).
+    `predict_fn(df)` (fonction ou coroutine) → dict colonne → tableau (predict_arrays) ; `columns` : colonnes d'entrée lues ;
+    `keep` : colonnes d'entrée recopiées dans la sortie (ex. object_id) à côté de `row` (position) ;
+    `validate_fn(df)` → message d'erreur ou None par ligne : les lignes refusées ne sont pas scorées.
+    """
+    keep = list(keep)
+    read_cols = list(dict.fromkeys(list(columns) + keep))
+    header, block, start, first = None, [], 0, True
+
+    async def score(lines):
+        nonlocal start, first
+        try:
+            if in_format == "csv":
+                df, valid, errors = parse_csv(header, lines, read_cols, text_cols=keep + ["mission"])
+            else:
+                df, valid, errors = parse_ndjson(lines, read_cols)
+            kept = {c: df[c].astype(object).where(df[c].notna(), None).tolist() for c in keep}
+            scored = valid
+            if validate_fn is not None and len(df):
+                refused = {valid[j]: msg for j, msg in enumerate(validate_fn(df[list(columns)])) if msg}
+                if refused:
+                    errors.update(refused)
+                    ok = [j for j, i in enumerate(valid) if i not in refused]
+                    df, scored = df.iloc[ok], [valid[j] for j in ok]
+            pred = await run_predict(predict_fn, df[list(columns)]) if len(df) else None
+        except Exception as e:  # bloc entier illisible
+            valid, scored, pred, kept = [], [], None, {c: [] for c in keep}
+            errors = {i: str(e) for i in range(len(lines))}
+        rows = _result_rows(start, len(lines), valid, pred, errors, kept, scored)
+        out = encode(rows, out_format, header=first)
+        start += len(lines)
+        first = False
+        return out
+
+    try:
+        async for line in iter_lines(chunks, max_line_bytes):
+            if in_format == "csv" and header is None:
+                header = line
+                continue
+            block.append(line)
+            if len(block) >= chunk_rows:
+                yield await score(block)
+                block = []
+        if block:
+            yield await score(block)
+    except ValueError as e:  # ligne trop longue : flux interrompu
+        if block:
+            yield await score(block)
+        yield encode(_result_rows(start, 1, [], None, {0: str(e)}, {c: [] for c in keep}), out_format, header=first)
+
+
+async def spool(agen, max_memory: int = SPOOL_MEMORY_BYTES):
+    """
+    Relaie le générateur d'octets `agen` via un fichier temporaire : `agen` est consommé dans une
+    tâche à part et continue d'avancer même quand le lecteur (l'envoi au client) est bloqué. Le
+    fichier est vidé dès que le lecteur a tout lu.
+    """
+    f = tempfile.SpooledTemporaryFile(max_size=max_memory)
+    ready = asyncio.Event()
+    written = read = 0
+    done = False
+
+    async def produce():
+        nonlocal written, done
+        try:
+            async for chunk in agen:
+                f.seek(written)
+                f.write(chunk)
+                written += len(chunk)
+                ready.set()
+        finally:
+            done = True
+            ready.set()
+
+    task = asyncio.get_running_loop().create_task(produce())
+    try:
+        while True:
+            if read == written:
+                if done:
+                    break
+                if written:  # tout est envoyé : le fichier repart de zéro
+                    f.seek(0)
+                    f.truncate()
+                    written = read = 0
+                ready.clear()
+                await ready.wait()
+                continue
+            f.seek(read)
+            data = f.read(min(written - read, SPOOL_READ_BYTES))
+            read += len(data)
+            yield data
+        await task  # propage une erreur du producteur
+    finally:
+        task.cancel()
+        f.close()
+
+
+class BodyStreamingResponse(StreamingResponse):
+    """
+    StreamingResponse dont le générateur lit lui-même le corps de la requête. Sans tâche d'écoute de
+    déconnexion concurrente : sous ASGI < 2.4 (uvicorn), elle consommerait les messages http.request
+    destinés à request.stream(). Une déconnexion du client interrompt la lecture ou l'envoi.
+    """
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await self.stream_response(send)
+        except OSError:
+            raise ClientDisconnect()
+        if self.background is not None:
+            await self.background()
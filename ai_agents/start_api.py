@@ -11,16 +11,10 @@ from dotenv import load_dotenv
 load_dotenv()
 
 if __name__ == "__main__":
-    # Check if required environment variables are set
-    if not os.getenv("OPENAI_API_KEY"):
-        print("❌ Error: OPENAI_API_KEY is not set in environment variables")
-        print("Please create a .env file with your OpenAI API key")
-        exit(1)
-    
-    if not os.getenv("PERPLEXITY_API_KEY"):
-        print("❌ Error: PERPLEXITY_API_KEY is not set in environment variables")
-        print("Please create a .env file with your Perplexity API key")
-        exit(1)
+    # Agent routes need both keys; without them the ML routes still start (agent routes answer 503)
+    missing = [k for k in ("OPENAI_API_KEY", "PERPLEXITY_API_KEY") if not os.getenv(k)]
+    if missing:
+        print(f"⚠️  {', '.join(missing)} not set: agent routes disabled (add them to your .env file)")
     
     print("🚀 Starting Johannes Kepler AI Agent API...")
     print("📡 API will be available at: http://localhost:8000")
@@ -0,0 +1,49 @@
+# conftest.py
+# Fixtures communes des tests : ai_agents/ dans sys.path, jeu harmonisé synthétique (catalogues de
+# classifiers.synthetic passés par harmonize_*) construit une seule fois par session et par taille.
+#
+# Les tests lisent le jeu partagé sans le modifier (copy / assign avant toute écriture).
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import pandas as pd
+import pytest
+
+HARM_ROWS = 3000
+
+
+def harmonized(n_rows: int, seed: int = 0) -> pd.DataFrame:
+    """Catalogues synthétiques KOI / K2 / TOI harmonisés puis concaténés."""
+    from classifiers.exoplanet_classifier import harmonize_koi, harmonize_k2, harmonize_toi
+    from classifiers.synthetic import synthetic_catalogs
+
+    cats = synthetic_catalogs(n_rows, seed=seed)
+    return pd.concat([harmonize_koi(cats["koi"]), harmonize_k2(cats["k2"]), harmonize_toi(cats["toi"])],
+                     ignore_index=True)
+
+
+@pytest.fixture(scope="session")
+def make_harm():
+    """make(n_rows, seed=0, keep=True) → jeu harmonisé, gardé pour la session sauf keep=False
+    (gros jeux écrits sur disque puis oubliés)."""
+    built = {}
+
+    def make(n_rows: int = HARM_ROWS, seed: int = 0, keep: bool = True) -> pd.DataFrame:
+        if (n_rows, seed) in built:
+            return built[n_rows, seed]
+        harm = harmonized(n_rows, seed)
+        if keep:
+            built[n_rows, seed] = harm
+        return harm
+
+    return make
+
+
+@pytest.fixture(scope="session")
+def harm(request, make_harm):
+    """Jeu harmonisé partagé de HARM_ROWS lignes ; un module en choisit la taille avec
+    @pytest.mark.parametrize("harm", [n_rows], indirect=True)."""
+    return make_harm(getattr(request, "param", HARM_ROWS))
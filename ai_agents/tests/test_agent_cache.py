@@ -0,0 +1,199 @@
+# test_agent_cache.py
+# Cache des réponses des agents (serving.agent_cache) : clés normalisées, TTL, LRU, coalescence
+# des requêtes identiques, échecs et réponses dégradées (outil en erreur) non mis en cache, routes
+# Kepler et statistiques /agents/cache.
+#
+# Usage (depuis ai_agents/) :
+#   python -m pytest tests/test_agent_cache.py -q
+
+import asyncio
+from types import SimpleNamespace
+
+import httpx
+import pytest
+
+from serving.agent_cache import AgentAnswerCache
+from serving.metrics import timed_tool
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def _runner(calls, answer="ok", pause=0.0, error=None):
+    async def run():
+        calls.append(answer)
+        await asyncio.sleep(pause)
+        if error:
+            raise RuntimeError(error)
+        return {"result": answer, "tools_used": []}
+    return run
+
+
+@timed_tool(is_error=lambda r: r.startswith("Error"))
+async def lookup(planet_name, fail=False):
+    """Outil façon sonar_intelligence_research : l'erreur est renvoyée au modèle, pas levée."""
+    return "Error: Perplexity API unavailable" if fail else f"{planet_name}: G5 host star"
+
+
+class FakeRun:
+    """Imite RunResultStreaming : un appel d'outil puis la réponse en deux deltas."""
+
+    def __init__(self, tool_fails=False):
+        self.is_complete, self.tool_fails = False, tool_fails
+
+    async def stream_events(self):
+        # comme le SDK, l'outil tourne dans une tâche créée pendant le run (contexte copié)
+        await asyncio.ensure_future(lookup("Kepler-22 b", fail=self.tool_fails))
+        yield SimpleNamespace(type="run_item_stream_event",
+                              item=SimpleNamespace(type="tool_call_item", raw_item=SimpleNamespace(name="lookup")))
+        for text in ("Kepler-22 b ", "orbits a G5 star."):
+            await asyncio.sleep(0.01)
+            yield SimpleNamespace(type="raw_response_event",
+                                  data=SimpleNamespace(type="response.output_text.delta", delta=text))
+        self.is_complete = True
+
+
+def test_keys_are_normalized():
+    key = AgentAnswerCache.key
+    assert key("kepler", "Kepler-22 b", None, "v1") == key("kepler", " kepler_22B", "", "v1")
+    assert key("kepler", "TRAPPIST-1 e", "  Host   star? ", "v1") == key("kepler", "trappist1e", "Host star?", "v1")
+    assert key("kepler", "Kepler-22 b", None, "v1") != key("kepler", "Kepler-22 b", None, "v2")
+    assert key("kepler", "Kepler-22 b", None, "v1") != key("bibliographic", "Kepler-22 b", None, "v1")
+
+
+def test_ttl_and_lru_eviction():
+    clock, calls = Clock(), []
+    cache = AgentAnswerCache(max_entries=2, ttl_seconds=60, clock=clock)
+
+    async def main():
+        for name in ("a", "b", "a", "c", "a", "b"):  # c évince b (le moins récemment utilisé)
+            await cache.get_or_run(("kepler", name), _runner(calls, name))
+        clock.now = 61
+        await cache.get_or_run(("kepler", "a"), _runner(calls, "a"))
+
+    asyncio.run(main())
+    assert calls == ["a", "b", "c", "b", "a"]
+    stats = cache.stats()
+    assert stats["hits"] == 2 and stats["misses"] == 5 and stats["evictions"] == 2 and stats["expirations"] == 1
+    assert stats["endpoints"]["kepler"]["hit_rate"] == pytest.approx(2 / 7)
+
+
+def test_identical_requests_share_one_run():
+    cache, calls = AgentAnswerCache(), []
+
+    async def main():
+        same = [cache.get_or_run(("kepler", "k22b"), _runner(calls, "k22b", pause=0.05)) for _ in range(5)]
+        other = cache.get_or_run(("kepler", "t1e"), _runner(calls, "t1e", pause=0.05))
+        return await asyncio.gather(*same, other)
+
+    answers = asyncio.run(main())
+    assert calls == ["k22b", "t1e"] and [a["result"] for a in answers] == ["k22b"] * 5 + ["t1e"]
+    stats = cache.stats()
+    assert (stats["misses"], stats["coalesced"], stats["inflight"]) == (2, 4, 0)
+    assert stats["runs_saved_rate"] == pytest.approx(4 / 6)
+
+
+def test_failures_reach_all_waiters_and_are_not_cached():
+    cache, calls = AgentAnswerCache(), []
+
+    async def main():
+        waiters = [cache.get_or_run(("kepler", "x"), _runner(calls, pause=0.02, error="rate limited"))
+                   for _ in range(3)]
+        results = await asyncio.gather(*waiters, return_exceptions=True)
+        assert all(isinstance(r, RuntimeError) for r in results)
+        return await cache.get_or_run(("kepler", "x"), _runner(calls))
+
+    assert asyncio.run(main())["result"] == "ok" and len(calls) == 2
+
+
+def test_cancelled_request_does_not_cancel_shared_run():
+    cache, calls = AgentAnswerCache(), []
+
+    async def main():
+        first = asyncio.ensure_future(cache.get_or_run(("kepler", "x"), _runner(calls, pause=0.05)))
+        second = asyncio.ensure_future(cache.get_or_run(("kepler", "x"), _runner(calls)))
+        await asyncio.sleep(0.01)
+        first.cancel()  # déconnexion du premier client
+        answer = await second
+        return answer, await cache.get_or_run(("kepler", "x"), _runner(calls))
+
+    answer, cached = asyncio.run(main())
+    assert answer == cached == {"result": "ok", "tools_used": []} and len(calls) == 1
+
+
+def test_kepler_routes_use_cache(monkeypatch):
+    import api
+    runs = []
+
+    def run_streamed(agent, chat_history):
+        runs.append(chat_history[0]["content"])
+        return FakeRun()
+
+    kepler = SimpleNamespace(create_agent=lambda: None, Runner=SimpleNamespace(run_streamed=run_streamed))
+
+    async def fake_agent(name):
+        return kepler
+
+    monkeypatch.setattr(api, "_agent", fake_agent)
+    monkeypatch.setattr(api, "_agent_versions", {"kepler": "v1"})
+    monkeypatch.setattr(api, "_answer_cache", AgentAnswerCache())
+
+    async def main():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=api.app), base_url="http://t") as c:
+            first = await asyncio.gather(*[c.post("/kepler/analyze", json={"planet_name": name})
+                                           for name in ("Kepler-22 b", "Kepler-22b", "kepler-22 B")])
+            stream = await c.post("/kepler/analyze/stream", json={"planet_name": "KEPLER-22b"})
+            api._agent_versions["kepler"] = "v2"  # nouvelle version de l'agent : pas de réponse héritée
+            await c.post("/kepler/analyze", json={"planet_name": "Kepler-22 b"})
+            return first, stream, (await c.get("/agents/cache")).json()
+
+    first, stream, stats = asyncio.run(main())
+    assert len(runs) == 2 and all(r.json()["result"] == "Kepler-22 b orbits a G5 star." for r in first)
+    assert stream.text == ('event: delta\ndata: {"text":"Kepler-22 b orbits a G5 star."}\n\n'
+                           'event: done\ndata: {"success":true,"tools_used":["lookup"],"tool_errors":[],'
+                           '"cached":true}\n\n')
+    kepler_stats = stats["endpoints"]["kepler"]
+    assert (kepler_stats["misses"], kepler_stats["coalesced"], kepler_stats["hits"]) == (2, 2, 1)
+
+
+def test_answers_with_tool_errors_are_not_cached():
+    cache = AgentAnswerCache()
+    cache.put(("kepler", "x"), {"result": "partial", "tools_used": ["lookup"], "tool_errors": ["lookup"]})
+    assert cache.get(("kepler", "x")) is None and cache.stats()["degraded"] == 1
+
+
+def test_tool_error_value_makes_next_request_rerun(monkeypatch):
+    import api
+    runs, failing = [], [True, True, False]
+
+    def run_streamed(agent, chat_history):
+        runs.append(chat_history[0]["content"])
+        return FakeRun(tool_fails=failing[len(runs) - 1])
+
+    kepler = SimpleNamespace(create_agent=lambda: None, Runner=SimpleNamespace(run_streamed=run_streamed))
+
+    async def fake_agent(name):
+        return kepler
+
+    monkeypatch.setattr(api, "_agent", fake_agent)
+    monkeypatch.setattr(api, "_agent_versions", {"kepler": "v1"})
+    monkeypatch.setattr(api, "_answer_cache", AgentAnswerCache())
+
+    async def main():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=api.app), base_url="http://t") as c:
+            body = {"planet_name": "Kepler-22 b"}
+            degraded = await c.post("/kepler/analyze", json=body)
+            stream = await c.post("/kepler/analyze/stream", json=body)  # relance : rien en cache
+            recovered = await c.post("/kepler/analyze", json=body)  # relance, cette fois mise en cache
+            cached = await c.post("/kepler/analyze", json=body)
+            return degraded, stream, recovered, cached, (await c.get("/agents/cache")).json()
+
+    degraded, stream, recovered, cached, stats = asyncio.run(main())
+    assert len(runs) == 3 and degraded.json()["success"] and cached.json() == recovered.json()
+    assert 'data: {"success":true,"tools_used":["lookup"],"tool_errors":["lookup"]}' in stream.text
+    assert stats["degraded"] == 2 and stats["endpoints"]["kepler"]["hits"] == 1
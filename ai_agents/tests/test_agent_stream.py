@@ -0,0 +1,144 @@
+# test_agent_stream.py
+# Réponses des agents en Server-Sent Events (serving.agent_stream) : format des événements,
+# réponse JSON assemblée, annulation du run à la déconnexion du client, routes /analyze/stream.
+#
+# Usage (depuis ai_agents/) :
+#   python -m pytest tests/test_agent_stream.py -q
+
+import asyncio
+import json
+from types import SimpleNamespace
+
+import httpx
+from fastapi import FastAPI
+
+from serving.agent_cache import AgentAnswerCache
+from serving.agent_stream import collect, sse_response
+
+
+def delta(text):
+    return SimpleNamespace(type="raw_response_event",
+                           data=SimpleNamespace(type="response.output_text.delta", delta=text))
+
+
+def tool_call(name):
+    return SimpleNamespace(type="run_item_stream_event",
+                           item=SimpleNamespace(type="tool_call_item", raw_item=SimpleNamespace(name=name)))
+
+
+class FakeRun:
+    """Imite RunResultStreaming : stream_events() et cancel()."""
+
+    def __init__(self, events, pause=0.0, fail_after=None):
+        self.events, self.pause, self.fail_after = events, pause, fail_after
+        self.sent, self.cancelled, self.is_complete = 0, False, False
+
+    async def stream_events(self):
+        for event in self.events:
+            if self.fail_after is not None and self.sent == self.fail_after:
+                raise RuntimeError("model overloaded")
+            await asyncio.sleep(self.pause)
+            self.sent += 1
+            yield event
+        self.is_complete = True
+
+    def cancel(self):
+        self.cancelled = True
+
+
+EVENTS = [tool_call("get_exoplanet_data"), SimpleNamespace(type="agent_updated_stream_event"),
+          delta("Kepler-22 b "), delta("orbits a G5 star."), tool_call("get_exoplanet_data")]
+
+
+def parse_sse(text):
+    out = []
+    for block in text.split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.splitlines() if not line.startswith(":"))
+        if lines:
+            out.append((lines["event"], json.loads(lines["data"])))
+    return out
+
+
+def _post(app, path, **kwargs):
+    async def main():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://t") as c:
+            return await c.post(path, **kwargs)
+    return asyncio.run(main())
+
+
+def test_collect_joins_deltas_and_dedups_tools():
+    answer = asyncio.run(collect(FakeRun(EVENTS)))
+    assert answer == {"result": "Kepler-22 b orbits a G5 star.", "tools_used": ["get_exoplanet_data"],
+                      "tool_errors": []}
+
+
+def test_sse_events_heartbeat_and_errors():
+    app = FastAPI()
+    runs = {"ok": FakeRun(EVENTS, pause=0.03), "fail": FakeRun(EVENTS, fail_after=3)}
+
+    @app.post("/{name}")
+    async def stream(name: str):
+        return sse_response(lambda: runs[name], heartbeat=0.01)
+
+    r = _post(app, "/ok")
+    assert r.headers["content-type"].startswith("text/event-stream") and ": ping" in r.text
+    assert parse_sse(r.text) == [("tool_call", {"name": "get_exoplanet_data"}),
+                                 ("delta", {"text": "Kepler-22 b "}), ("delta", {"text": "orbits a G5 star."}),
+                                 ("tool_call", {"name": "get_exoplanet_data"}),
+                                 ("done", {"success": True, "tools_used": ["get_exoplanet_data"],
+                                           "tool_errors": []})]
+    assert not runs["ok"].cancelled
+
+    events = parse_sse(_post(app, "/fail").text)
+    assert events[-1] == ("error", {"success": False, "error": "model overloaded"})
+    assert [e for e, _ in events].count("delta") == 1 and runs["fail"].cancelled
+
+
+def test_client_disconnect_cancels_run():
+    run = FakeRun([delta(str(i)) for i in range(100)], pause=0.01)
+    response = sse_response(lambda: run, heartbeat=1)
+    sent, first_chunk = [], asyncio.Event()
+
+    async def receive():
+        await first_chunk.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        sent.append(message)
+        if message.get("body"):
+            first_chunk.set()
+
+    scope = {"type": "http", "asgi": {"version": "3.0", "spec_version": "2.3"}}
+    asyncio.run(asyncio.wait_for(response(scope, receive, send), 5))
+    assert run.cancelled and run.sent < 100
+
+
+def test_api_stream_routes(monkeypatch):
+    import api
+
+    runs = []
+
+    def run_streamed(agent, chat_history):
+        runs.append((agent, chat_history))
+        return FakeRun(EVENTS)
+
+    kepler = SimpleNamespace(create_agent=lambda: "kepler-agent", Runner=SimpleNamespace(run_streamed=run_streamed))
+    grace_hopper = SimpleNamespace(ExoplanetCharacteristics=lambda **kw: kw,
+                                   run_grace_hopper_streamed=lambda c, q: FakeRun([delta(f"{c['period']} {q}")]))
+
+    async def fake_agent(name):
+        return {"kepler": kepler, "grace_hopper": grace_hopper}[name]
+
+    monkeypatch.setattr(api, "_agent", fake_agent)
+    monkeypatch.setattr(api, "_answer_cache", AgentAnswerCache(max_entries=0))
+
+    events = parse_sse(_post(api.app, "/kepler/analyze/stream", json={"planet_name": "Kepler-22 b"}).text)
+    assert events[-1][0] == "done" and "Kepler-22 b" in runs[-1][1][0]["content"]
+    buffered = _post(api.app, "/bibliographic/analyze", json={"planet_name": "WASP-39 b"}).json()
+    assert buffered["success"] and buffered["result"] == "Kepler-22 b orbits a G5 star."
+    assert runs[-1][1][0]["content"].startswith("Conduct a comprehensive bibliographic research on: WASP-39 b")
+
+    body = {"characteristics": {"period": 3.5}, "query": "plausible?"}
+    events = parse_sse(_post(api.app, "/grace-hopper/analyze/stream", json=body).text)
+    assert events == [("delta", {"text": "3.5 plausible?"}),
+                      ("done", {"success": True, "tools_used": [], "tool_errors": []})]
@@ -0,0 +1,100 @@
+# test_artifact.py
+# Artefact répertoire (classifiers.artifact) : manifest, tableaux relus en np.memmap lecture seule,
+# prédictions identiques au bundle source, remplacement atomique d'un artefact existant.
+#
+# Usage (depuis ai_agents/) :
+#   python -m pytest tests/test_artifact.py -q
+
+import json
+from pathlib import Path
+
+import joblib
+import numpy as np
+import pytest
+
+from classifiers.artifact import (
+    ARTIFACT_SCHEMA_VERSION, MANIFEST_NAME, convert_bundle, is_artifact, load_artifact, read_manifest,
+    save_artifact,
+)
+from classifiers.compiled import compile_bundle
+from classifiers.exoplanet_classifier import (
+    LABEL_MAP, load_model, train_final_model_and_save, _feature_engineering,
+)
+
+SNAPSHOTS = {"koi": "koi-0123456789abcdef", "k2": "k2-0123456789abcdef"}
+
+
+@pytest.fixture(scope="module")
+def bundle_path(harm, tmp_path_factory):
+    return train_final_model_and_save(harm, model_dir=str(tmp_path_factory.mktemp("models")),
+                                      snapshot_ids=SNAPSHOTS, hgb_params={"max_iter": 20})
+
+
+def _inputs(harm, all_num_cols, cat_cols):
+    return _feature_engineering(harm.sample(300, random_state=0))[all_num_cols + cat_cols]
+
+
+def test_manifest_describes_bundle(bundle_path, tmp_path):
+    out = convert_bundle(bundle_path, str(tmp_path / "model"))
+    assert is_artifact(out) and not is_artifact(bundle_path)
+    manifest = read_manifest(out)
+    bundle = joblib.load(bundle_path)
+    assert manifest["schema_version"] == ARTIFACT_SCHEMA_VERSION
+    assert manifest["all_num_cols"] == bundle["all_num_cols"] and manifest["cat_cols"] == bundle["cat_cols"]
+    assert manifest["label_map"] == LABEL_MAP and manifest["snapshot_ids"] == SNAPSHOTS
+    assert manifest["lineage"] == bundle["lineage"]
+    files = {p.name for p in Path(out).iterdir()}
+    assert files == {MANIFEST_NAME} | {spec["file"] for spec in manifest["arrays"].values()}
+    for name, spec in manifest["arrays"].items():
+        arr = np.load(Path(out) / spec["file"], allow_pickle=False)
+        assert (arr.dtype.str, list(arr.shape)) == (spec["dtype"], spec["shape"]), name
+
+    # version de schéma inconnue : refus explicite
+    manifest["schema_version"] = ARTIFACT_SCHEMA_VERSION + 1
+    (Path(out) / MANIFEST_NAME).write_text(json.dumps(manifest), encoding="utf-8")
+    with pytest.raises(ValueError):
+        load_artifact(out)
+
+
+def test_round_trip_is_memory_mapped_and_identical(harm, bundle_path, tmp_path):
+    out = convert_bundle(bundle_path, str(tmp_path / "model"))
+    model = load_artifact(out)
+    assert model.arrays and all(isinstance(a, np.memmap) and a.mode == "r" for a in model.arrays.values())
+    assert model.snapshot_ids == SNAPSHOTS
+    with pytest.raises(ValueError):
+        next(iter(model.arrays.values()))[...] = 0  # lecture seule
+
+    pipe, all_num_cols, cat_cols, _ = load_model(bundle_path)
+    X = _inputs(harm, all_num_cols, cat_cols)
+    source = compile_bundle(joblib.load(bundle_path))
+    np.testing.assert_array_equal(model.predict_proba(X), source.predict_proba(X))
+    np.testing.assert_allclose(model.predict_proba(X), pipe.predict_proba(X), rtol=0, atol=1e-9)
+    # load_model sert l'artefact comme le bundle
+    served, cols, cats, label_map = load_model(out)
+    assert (cols, cats, label_map) == (all_num_cols, cat_cols, LABEL_MAP)
+    np.testing.assert_array_equal(served.predict(X), pipe.predict(X))
+    copied = load_artifact(out, mmap=False)
+    assert not any(isinstance(a, np.memmap) for a in copied.arrays.values())
+
+
+def test_existing_artifact_is_replaced_atomically(harm, bundle_path, tmp_path):
+    out = tmp_path / "model"
+    convert_bundle(bundle_path, str(out))
+    (out / "stale.npy").write_bytes(b"old")
+    model = load_artifact(out)
+
+    save_artifact(model, str(out), snapshot_ids={"koi": "koi-fedcba9876543210"})
+    assert not (out / "stale.npy").exists()
+    assert read_manifest(out)["snapshot_ids"] == {"koi": "koi-fedcba9876543210"}
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["model"]  # ni .tmp ni .old
+
+    # échec en cours d'écriture : l'artefact en place reste intact
+    model.arrays["bad"] = np.array([object()], dtype=object)
+    with pytest.raises(ValueError):
+        save_artifact(model, str(out))
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["model"]
+    assert "bad" not in read_manifest(out)["arrays"]
+    pipe, all_num_cols, cat_cols, _ = load_model(bundle_path)
+    X = _inputs(harm, all_num_cols, cat_cols)
+    source = compile_bundle(joblib.load(bundle_path))
+    np.testing.assert_array_equal(load_artifact(out).predict_proba(X), source.predict_proba(X))
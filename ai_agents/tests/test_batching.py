@@ -0,0 +1,76 @@
+# test_batching.py
+# Micro-batching (serving.batching) : regroupement, bornes, une ligne par appelant, erreurs isolées.
+#
+# Usage (depuis ai_agents/) :
+#   python -m pytest tests/test_batching.py -q
+
+import asyncio
+
+import numpy as np
+
+from serving.batching import MicroBatcher
+from serving.histogram import Histogram
+
+
+def _echo(calls):
+    def predict(df):
+        calls.append(len(df))
+        if (df["x"] < 0).any():
+            raise ValueError("negative x")
+        return {"x2": df["x"].to_numpy() * 2, "n": np.full(len(df), len(df))}
+    return predict
+
+
+def test_concurrent_requests_are_coalesced():
+    calls = []
+    batcher = MicroBatcher(_echo(calls), max_batch_size=16, max_wait_ms=20)
+
+    async def main():
+        out = await asyncio.gather(*[batcher.submit({"x": i}) for i in range(40)])
+        await batcher.stop()
+        return out
+
+    out = asyncio.run(main())
+    assert [r["x2"] for r in out] == [2 * i for i in range(40)]
+    assert max(calls) <= 16 and len(calls) < 40
+    stats = batcher.stats()
+    assert stats["batch_size"]["count"] == len(calls)
+    assert stats["queue_wait_ms"]["count"] == 40
+
+
+def test_single_request_does_not_wait():
+    batcher = MicroBatcher(_echo([]), max_batch_size=8, max_wait_ms=500)
+
+    async def main():
+        loop = asyncio.get_running_loop()
+        t0 = loop.time()
+        r = await batcher.submit({"x": 1})
+        await batcher.stop()
+        return r, loop.time() - t0
+
+    r, elapsed = asyncio.run(main())
+    assert r["x2"] == 2 and r["n"] == 1
+    assert elapsed < 0.5
+
+
+def test_invalid_row_only_fails_its_caller():
+    batcher = MicroBatcher(_echo([]), max_batch_size=8, max_wait_ms=20)
+
+    async def main():
+        out = await asyncio.gather(*[batcher.submit({"x": x}) for x in (1, -1, 3)], return_exceptions=True)
+        await batcher.stop()
+        return out
+
+    ok1, err, ok3 = asyncio.run(main())
+    assert ok1["x2"] == 2 and ok3["x2"] == 6
+    assert isinstance(err, ValueError)
+
+
+def test_histogram_buckets():
+    h = Histogram([1, 10, 100])
+    for v in (0.5, 5, 50, 500):
+        h.observe(v)
+    snap = h.snapshot()
+    assert snap["buckets"] == {"1": 1, "10": 2, "100": 3, "+Inf": 4}
+    assert snap["count"] == 4 and snap["sum"] == 555.5
+    assert h.quantile(0.5) == 10
@@ -0,0 +1,74 @@
+# test_bench_load.py
+# Générateur de charge (benchmarks/bench_load.py) : mix de routes, lignes synthétiques, rapport.
+#
+# Usage (depuis ai_agents/) :
+#   python -m pytest tests/test_bench_load.py -q
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "benchmarks"))
+
+import asyncio
+
+import httpx
+import pytest
+from fastapi import Body, FastAPI, HTTPException
+
+from bench_load import drive, parse_mix, summarize, synthetic_rows
+
+
+def test_parse_mix():
+    assert parse_mix("predict=0.8, batch=0.2") == {"predict": 0.8, "batch": 0.2}
+    assert parse_mix("batch") == {"batch": 1.0}
+    for bad in ("stream=1", "predict=0", ""):
+        with pytest.raises(ValueError):
+            parse_mix(bad)
+
+
+def test_synthetic_rows_are_valid_inputs():
+    rows = synthetic_rows(500, seed=2)
+    assert len(rows) == 500
+    assert all(r["mission"] in ("KEPLER", "K2", "TESS") for r in rows)
+    assert all(r.get("depth", 1) >= 1 and r.get("duration", 1) >= 0.05 for r in rows)
+    assert not any(v != v for r in rows for v in r.values())  # NaN omis
+
+
+def test_summarize_percentiles_and_errors():
+    samples = [("predict", 200, i / 1000, 1) for i in range(1, 101)] + [("batch", 503, 0.5, 10)]
+    report = summarize(samples, elapsed=2.0)
+    predict = report["routes"]["predict"]
+    assert predict["requests"] == 100 and predict["throughput_rps"] == 50
+    assert predict["p50_ms"] == pytest.approx(50.5) and predict["p99_ms"] == pytest.approx(99.01)
+    assert report["routes"]["batch"]["errors"] == {"503": 1} and report["routes"]["batch"]["rows_per_second"] == 0
+    assert report["total"]["error_rate"] == pytest.approx(1 / 101)
+
+
+def test_drive_against_app():
+    app = FastAPI()
+    seen = {"predict": 0, "batch": 0}
+
+    @app.post("/predict")
+    async def predict(row: dict):
+        seen["predict"] += 1
+        return {"pred_label": "CANDIDATE"}
+
+    @app.post("/predict/batch")
+    async def batch(rows: list = Body(...)):
+        seen["batch"] += 1
+        if len(rows) > 5:
+            raise HTTPException(status_code=503)
+        return {"results": []}
+
+    rows = [{"period": float(i)} for i in range(20)]
+
+    async def main():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://t") as client:
+            return await drive(client, rows, concurrency=4, duration=0.3, mix={"predict": 1, "batch": 1},
+                               batch_sizes=[2, 10])
+
+    report = asyncio.run(main())
+    assert report["total"]["requests"] == seen["predict"] + seen["batch"] > 0
+    batch = report["routes"]["batch"]
+    assert set(batch["errors"]) <= {"503"} and batch["p95_ms"] is not None
+    assert report["routes"]["predict"]["error_rate"] == 0
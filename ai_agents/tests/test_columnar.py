@@ -0,0 +1,109 @@
+# test_columnar.py
+# Formats binaires en colonnes (serving.columnar) : lecture Arrow IPC / .npz, écriture des prédictions,
+# contrôles d'entrée de /predict/columnar (lignes invalides refusées avec leurs indices).
+#
+# Usage (depuis ai_agents/) :
+#   python -m pytest tests/test_columnar.py -q
+
+import asyncio
+import io
+
+import httpx
+import numpy as np
+import pyarrow as pa
+import pytest
+
+from serving.columnar import detect_format, read_columns, write_columns
+
+COLUMNS = ["mission", "period", "duration", "depth"]
+
+
+def _arrow(table: pa.Table) -> bytes:
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+def test_read_arrow_columns():
+    table = pa.table({"mission": ["TESS", None, "KEPLER"], "period": [1.5, 2.5, 3.5],
+                      "depth": pa.array([100, None, 300], pa.int64()), "other": [1, 2, 3]})
+    data = read_columns(_arrow(table), "arrow", COLUMNS)
+    assert set(data) == {"mission", "period", "depth"}
+    assert list(data["mission"].astype(object)[[0, 2]]) == ["TESS", "KEPLER"]
+    assert data["mission"].isna()[1]
+    np.testing.assert_array_equal(data["period"], [1.5, 2.5, 3.5])
+    np.testing.assert_array_equal(data["depth"], [100.0, np.nan, 300.0])
+
+
+def test_read_npz_columns():
+    buf = io.BytesIO()
+    np.savez(buf, mission=np.array(["K2", "TESS"]), period=np.array([1.0, 2.0]))
+    data = read_columns(buf.getvalue(), "npz", COLUMNS)
+    assert list(data) == ["mission", "period"]
+
+
+def test_read_rejects_bad_bodies():
+    buf = io.BytesIO()
+    np.savez(buf, period=np.array([1.0, 2.0]), depth=np.array([1.0]))
+    with pytest.raises(ValueError):
+        read_columns(buf.getvalue(), "npz", COLUMNS)
+    with pytest.raises(ValueError):
+        read_columns(b"not a zip", "npz", COLUMNS)
+    with pytest.raises(ValueError):
+        read_columns(_arrow(pa.table({"x": [1]})), "arrow", COLUMNS)
+
+
+def test_write_round_trip():
+    pred = {"pred_label": np.array(["CANDIDATE", "CONFIRMED"], dtype=object),
+            "p_CONFIRMED": np.array([0.25, 0.75])}
+    table = pa.ipc.open_stream(write_columns(pred, "arrow")).read_all()
+    assert pa.types.is_dictionary(table.schema.field("pred_label").type)
+    assert table.column("pred_label").to_pylist() == ["CANDIDATE", "CONFIRMED"]
+    with np.load(io.BytesIO(write_columns(pred, "npz"))) as npz:
+        assert npz["pred_label"].dtype.kind == "U"
+        np.testing.assert_array_equal(npz["p_CONFIRMED"], [0.25, 0.75])
+
+
+def test_detect_format():
+    assert detect_format("application/vnd.apache.arrow.stream") == "arrow"
+    assert detect_format("application/x-npz") == "npz"
+    assert detect_format("application/json") is None
+
+
+def test_input_checks_on_columns():
+    from api import input_row_errors
+    table = pa.table({"mission": ["TESS", None, "CHEOPS", "K2", "KEPLER"],
+                      "duration": [2.5, 0.02, None, -1.0, 3.0],
+                      "depth": pa.array([300, 500, 300, 0, None], pa.int64())})
+    errors = input_row_errors(read_columns(_arrow(table), "arrow", COLUMNS))
+    assert errors[0] is None and errors[4] is None
+    assert "heures" in errors[1] and "`mission`" in errors[2]
+    assert "`duration` doit être >= 0" in errors[3] and "`depth` doit être > 0" in errors[3]
+
+    buf = io.BytesIO()
+    np.savez(buf, mission=np.array(["K2", "kepler"]), depth=np.array([0.5, 800.0]))
+    errors = input_row_errors(read_columns(buf.getvalue(), "npz", COLUMNS))
+    assert "ppm" in errors[0] and "`mission`" in errors[1]
+
+
+def test_columnar_route_refuses_invalid_rows(monkeypatch):
+    import api
+
+    class NoModel:
+        def use(self, name):
+            raise AssertionError("invalid rows must not be scored")
+
+    monkeypatch.setattr(api, "_registry", NoModel())
+    table = pa.table({"mission": ["TESS", "TESS", "CHEOPS"], "period": [3.0, 4.0, 5.0],
+                      "duration": [2.0, 0.01, 2.0], "depth": [400.0, 400.0, 400.0]})
+
+    async def main():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=api.app), base_url="http://t") as c:
+            return await c.post("/predict/columnar", content=_arrow(table),
+                                headers={"content-type": "application/vnd.apache.arrow.stream"})
+
+    response = asyncio.run(main())
+    assert response.status_code == 400
+    detail = response.json()["detail"]
+    assert detail["rows"] == [1, 2] and "heures" in detail["errors"][0] and "`mission`" in detail["errors"][1]
@@ -0,0 +1,94 @@
+# test_compiled.py
+# Modèle compilé (classifiers.compiled) : port NumPy de ndtri, parité de predict_proba avec le
+# Pipeline sklearn (NaN, valeurs hors des tables de quantiles, mission manquante ou inconnue),
+# descente des arbres avec valeurs manquantes, aller-retour .npz.
+#
+# Usage (depuis ai_agents/) :
+#   python -m pytest tests/test_compiled.py -q
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from classifiers.compiled import compile_pipeline, load_compiled, ndtri
+from classifiers.exoplanet_classifier import train_final_model_and_save, load_model, _feature_engineering
+from classifiers.inference import design
+
+
+@pytest.fixture(scope="module")
+def bundle(harm, tmp_path_factory):
+    return load_model(train_final_model_and_save(harm, model_dir=str(tmp_path_factory.mktemp("model")),
+                                                 hgb_params={"max_iter": 40}))
+
+
+@pytest.fixture(scope="module")
+def compiled(bundle):
+    return compile_pipeline(*bundle)
+
+
+def _edge_rows(harm) -> pd.DataFrame:
+    """Lignes réelles, puis NaN partout (mission None), valeurs hors des tables de quantiles, mission
+    NaN et mission inconnue."""
+    rows = harm.sample(200, random_state=0).reset_index(drop=True)
+    empty = rows.head(5).copy()
+    num = [c for c in empty.columns if c not in ("mission", "label_raw") and pd.api.types.is_numeric_dtype(empty[c])]
+    empty[num] = np.nan
+    empty["mission"] = None
+    low, high = rows.head(5).copy(), rows.head(5).copy()
+    for c in ("period", "duration", "depth", "snr", "st_teff", "st_rad"):
+        if c in rows:
+            low[c] = rows[c].min() - 1e6
+            high[c] = rows[c].max() * 1e6
+    nan_mission = rows.head(5).astype({"mission": object}).assign(mission=np.nan)
+    unseen = rows.head(5).assign(mission="CHEOPS")
+    return pd.concat([rows, empty, low, high, nan_mission, unseen], ignore_index=True)
+
+
+def test_ndtri_matches_scipy():
+    from scipy.special import ndtri as scipy_ndtri
+    p = np.concatenate([
+        np.linspace(0, 1, 10_001),
+        [np.exp(-2) - 1e-12, np.exp(-2) + 1e-12, 1 - np.exp(-2)],  # bornes zone centrale / queues
+        np.logspace(-300, -1, 400), 1 - np.logspace(-16, -1, 200),  # queues, dont x >= 8
+        [np.nan, -0.5, 1.5],
+    ])
+    expected = scipy_ndtri(p)
+    got = ndtri(p)
+    np.testing.assert_array_equal(np.isnan(got), np.isnan(expected))
+    ok = ~np.isnan(expected)
+    np.testing.assert_allclose(got[ok], expected[ok], rtol=1e-14, atol=0)
+
+
+def test_predict_proba_matches_pipeline_on_edge_rows(harm, bundle, compiled):
+    model, all_num_cols, cat_cols, _ = bundle
+    X = design(model, all_num_cols, cat_cols, _edge_rows(harm))  # entrée du service
+    assert X[all_num_cols].isna().all(axis=1).any()
+    np.testing.assert_allclose(compiled.transform(X), model.named_steps["pre"].transform(X), rtol=0, atol=1e-9)
+    np.testing.assert_allclose(compiled.predict_proba(X), model.predict_proba(X), rtol=0, atol=1e-9)
+    assert (compiled.predict(X) == model.predict(X)).all()
+
+
+def test_tree_traversal_sends_missing_values_like_sklearn(harm, bundle, compiled):
+    # le préprocesseur impute tout : on injecte des NaN directement dans la matrice transformée
+    model, all_num_cols, cat_cols, _ = bundle
+    Z = model.named_steps["pre"].transform(_feature_engineering(harm.head(300))[all_num_cols + cat_cols])
+    Z[np.random.default_rng(0).random(Z.shape) < 0.3] = np.nan
+    np.testing.assert_allclose(compiled.raw_predict(Z), model.named_steps["clf"]._raw_predict(Z), rtol=0, atol=1e-9)
+    # découpage en blocs de la descente : même résultat
+    np.testing.assert_array_equal(compiled.raw_predict(Z, chunk_size=7), compiled.raw_predict(Z))
+
+
+def test_missing_mission_as_none_or_nan(bundle, compiled):
+    # dict de colonnes (routes colonnaires) : None et NaN sont tous deux imputés
+    model, all_num_cols, cat_cols, _ = bundle
+    data = {"mission": np.array([None, np.nan], dtype=object), "period": [3.0, 3.0], "depth": [500.0, 500.0]}
+    X = design(model, all_num_cols, cat_cols, data)
+    for proba in (model.predict_proba(X), compiled.predict_proba(X)):
+        np.testing.assert_allclose(proba[0], proba[1], rtol=0, atol=1e-12)
+
+
+def test_npz_round_trip(harm, bundle, compiled, tmp_path):
+    model, all_num_cols, cat_cols, _ = bundle
+    X = design(model, all_num_cols, cat_cols, _edge_rows(harm))
+    loaded = load_compiled(compiled.save(str(tmp_path / "model.npz")))
+    np.testing.assert_array_equal(loaded.predict_proba(X), compiled.predict_proba(X))
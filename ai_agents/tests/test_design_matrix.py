@@ -0,0 +1,86 @@
+# test_design_matrix.py
+# Matrice de design (classifiers.design_matrix) : bloc float32 avec le code mission en dernière
+# colonne, take / observed_features, version du jeu harmonisé, cache mémoire de 4 entrées.
+#
+# Usage (depuis ai_agents/) :
+#   python -m pytest tests/test_design_matrix.py -q
+
+import numpy as np
+import pytest
+
+from classifiers import design_matrix
+from classifiers.design_matrix import build_design_matrix, dataset_version, get_design_matrix
+from classifiers.exoplanet_classifier import (
+    BASE_NUM_COLS_ALL, DERIVED_COLS, LABEL_MAP, _feature_engineering,
+)
+
+
+@pytest.fixture(autouse=True)
+def empty_cache():
+    design_matrix.clear_cache()
+    yield
+    design_matrix.clear_cache()
+
+
+def test_block_layout(harm):
+    dm = build_design_matrix(harm)
+    labelled = harm.loc[harm["label_raw"].isin(LABEL_MAP.keys())].reset_index(drop=True)
+    assert dm.X.dtype == np.float32 and dm.X.flags["C_CONTIGUOUS"]
+    assert dm.X.shape == (len(labelled), dm.n_features + 1) and dm.mission_col == dm.n_features
+    assert dm.feature_names == [c for c in BASE_NUM_COLS_ALL if c in harm.columns] + DERIVED_COLS
+
+    # dernière colonne : code mission (index dans dm.missions)
+    np.testing.assert_array_equal(dm.X[:, -1], dm.mission)
+    assert [dm.missions[c] for c in dm.mission] == labelled["mission"].astype(str).tolist()
+    np.testing.assert_array_equal(dm.y, labelled["label_raw"].map(LABEL_MAP).to_numpy(dtype=np.int8))
+
+    # features : mêmes valeurs que _feature_engineering, stockées en float32
+    expected = _feature_engineering(labelled)[dm.feature_names].to_numpy(dtype=np.float64, na_value=np.nan)
+    np.testing.assert_allclose(dm.X[:, :-1], expected.astype(np.float32), rtol=1e-6, equal_nan=True)
+
+
+def test_take_and_observed_features(harm):
+    dm = build_design_matrix(harm)
+    rows = np.array([5, 0, 17, 5])
+    block = dm.take(rows)
+    assert block.dtype == np.float32 and not np.shares_memory(block, dm.X)
+    np.testing.assert_array_equal(block, dm.X[rows])
+
+    # une feature sans aucune valeur dans le bloc est écartée du fit
+    block[:, dm.feature_names.index("snr")] = np.nan
+    observed = dm.observed_features(block)
+    assert dm.feature_names.index("snr") not in observed
+    assert observed == [j for j in range(dm.n_features) if not np.isnan(block[:, j]).all()]
+    assert dm.mission_col not in observed
+
+    frame = dm.frame(rows)
+    assert list(frame.columns) == dm.feature_names + ["mission"]
+    assert frame["mission"].tolist() == [dm.missions[c] for c in dm.mission[rows]]
+
+
+def test_version_follows_content(harm):
+    version = dataset_version(harm)
+    assert dataset_version(harm.copy()) == version
+    changed = harm.copy()
+    changed.loc[3, "period"] = changed.loc[3, "period"] + 1
+    assert dataset_version(changed) != version
+    assert dataset_version(harm.rename(columns={"mag": "magnitude"})) != version
+    assert dataset_version(harm.iloc[:-1]) != version
+
+
+def test_memory_cache_keeps_four_versions(harm):
+    def variant(i):
+        v = harm.copy()
+        v.loc[i, "period"] = v.loc[i, "period"] + 1
+        return v
+
+    dm = get_design_matrix(harm)
+    assert get_design_matrix(harm.copy()) is dm  # même contenu : même objet
+    variants = [variant(i) for i in range(4)]
+    cached = [get_design_matrix(v) for v in variants[:3]]
+    assert all(c is not dm for c in cached)
+    assert get_design_matrix(harm) is dm  # relu : devient le plus récent
+    get_design_matrix(variants[3])  # 5e version : la moins récemment lue (variants[0]) est évincée
+    assert len(design_matrix._CACHE) == 4
+    assert get_design_matrix(harm) is dm and get_design_matrix(variants[1]) is cached[1]
+    assert get_design_matrix(variants[0]) is not cached[0]
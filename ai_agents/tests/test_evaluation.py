@@ -0,0 +1,73 @@
+# test_evaluation.py
+# Évaluation parallèle (classifiers.evaluation) : mêmes métriques par fold en séquentiel et sur le
+# pool de processus, splits Leave-One-Mission-Out planifiés, rapport JSON et save_report.
+#
+# Usage (depuis ai_agents/) :
+#   python -m pytest tests/test_evaluation.py -q
+
+import json
+import os
+
+import numpy as np
+import pytest
+
+from classifiers.design_matrix import build_design_matrix
+from classifiers.evaluation import evaluate, plan_jobs, save_report
+
+SMALL_HGB = {"max_iter": 20, "learning_rate": 0.2, "random_state": 42}
+FOLD_METRICS = ("n_train", "n_test", "num_cols", "f1_macro", "balanced_accuracy", "n_iter")
+
+pytestmark = pytest.mark.parametrize("harm", [1500], indirect=True)
+
+
+@pytest.fixture(scope="module")
+def reports(harm):
+    kwargs = dict(clf_params=SMALL_HGB, n_splits=3, min_test_size=20)
+    return evaluate(harm, n_jobs=1, **kwargs), evaluate(harm, n_jobs=2, **kwargs)
+
+
+def test_plan_jobs_cv_then_lomo(harm):
+    dm = build_design_matrix(harm)
+    jobs = plan_jobs(dm.y, dm.groups_star, dm.mission, n_splits=3, min_test_size=20, mission_names=dm.missions)
+    cv = [j for j in jobs if j["kind"] == "cv"]
+    lomo = [j for j in jobs if j["kind"] == "lomo"]
+    assert [j["name"] for j in cv] == ["fold_1", "fold_2", "fold_3"] and all(j["use_cat"] for j in cv)
+    # chaque ligne est testée une fois, jamais avec une étoile vue à l'entraînement
+    np.testing.assert_array_equal(np.sort(np.concatenate([j["test_idx"] for j in cv])), np.arange(len(dm)))
+    for j in cv:
+        assert not set(dm.groups_star[j["train_idx"]]) & set(dm.groups_star[j["test_idx"]])
+    assert sorted(j["name"] for j in lomo) == ["K2", "KEPLER", "TESS"]
+    for j in lomo:
+        assert not j["use_cat"]
+        assert set(dm.mission[j["test_idx"]]) == {dm.missions.index(j["name"])}
+        assert dm.missions.index(j["name"]) not in set(dm.mission[j["train_idx"]])
+
+
+def test_parallel_folds_match_sequential(reports):
+    seq, par = reports
+    assert par["timings"]["n_jobs"] == 2 and seq["timings"]["n_jobs"] == 1
+    for section, key in (("cv", "folds"), ("lomo", "splits")):
+        a, b = seq[section][key], par[section][key]
+        assert [r["name"] for r in a] == [r["name"] for r in b]
+        for ra, rb in zip(a, b):
+            assert {m: ra[m] for m in FOLD_METRICS} == {m: rb[m] for m in FOLD_METRICS}, ra["name"]
+    assert [r["name"] for r in par["lomo"]["splits"]] == ["K2", "KEPLER", "TESS"]
+    # fits du pool exécutés hors du processus principal
+    assert os.getpid() not in {r["pid"] for r in par["cv"]["folds"] + par["lomo"]["splits"]}
+    assert par["cv"]["f1_macro_mean"] == pytest.approx(seq["cv"]["f1_macro_mean"])
+
+
+def test_report_and_save_report(harm, reports, tmp_path):
+    _, report = reports
+    assert set(report) == {"dataset", "cv", "lomo", "timings"}
+    dataset = report["dataset"]
+    assert dataset["n_rows"] == sum(dataset["label_counts"].values()) == len(build_design_matrix(harm))
+    assert dataset["cat_cols"] == ["mission"] and "log_period" in dataset["num_cols"]
+    cv = report["cv"]
+    assert cv["n_splits"] == 3 and len(cv["folds"]) == 3
+    assert cv["f1_macro_mean"] == pytest.approx(np.mean([f["f1_macro"] for f in cv["folds"]]))
+    assert set(report["timings"]) >= {"wall_seconds", "sum_fit_seconds", "max_fit_seconds", "threads_per_worker"}
+
+    path = save_report(report, str(tmp_path / "reports" / "eval.json"))
+    with open(path, encoding="utf-8") as f:
+        assert json.load(f) == json.loads(json.dumps(report))
@@ -0,0 +1,108 @@
+# test_executor.py
+# Exécuteur d'inférence (serving.executor) : modes thread / process, attente d'une place,
+# saturation, run_predict.
+#
+# Usage (depuis ai_agents/) :
+#   python -m pytest tests/test_executor.py -q
+
+import asyncio
+
+import numpy as np
+import pytest
+
+from classifiers.exoplanet_classifier import train_final_model_and_save, load_model
+from classifiers.inference import predict_arrays
+from serving.executor import ExecutorBusy, InferenceExecutor, run_predict
+from serving.result_cache import model_version
+
+
+@pytest.fixture(scope="module")
+def bundle(harm, tmp_path_factory):
+    path = train_final_model_and_save(harm, model_dir=str(tmp_path_factory.mktemp("model")))
+    model, all_num_cols, cat_cols, label_map = load_model(path)
+    loaded = {"path": path, "version": model_version(path), "model": model, "all_num_cols": all_num_cols,
+              "cat_cols": cat_cols, "label_map": label_map}
+    return loaded, harm.head(200)
+
+
+@pytest.mark.parametrize("mode", ["thread", "process"])
+def test_modes_match_direct_prediction(bundle, mode):
+    loaded, df = bundle
+    expected = predict_arrays(loaded["model"], loaded["all_num_cols"], loaded["cat_cols"], df, loaded["label_map"])
+    executor = InferenceExecutor(mode, workers=1)
+    executor.start(loaded["path"], loaded["version"])
+    try:
+        out = asyncio.run(executor.predict(loaded, df))
+    finally:
+        executor.shutdown()
+    assert (out["pred_label"] == expected["pred_label"]).all()
+    np.testing.assert_allclose(out["p_CONFIRMED"], expected["p_CONFIRMED"], rtol=0, atol=1e-12)
+    assert executor.stats()["completed"] == 1
+
+
+def test_concurrent_batches_beyond_capacity_wait_for_a_slot(bundle):
+    loaded, df = bundle
+    executor = InferenceExecutor("thread", workers=1, queue_depth=2)
+
+    async def main():
+        return await asyncio.gather(*[executor.predict(loaded, df) for _ in range(12)])
+
+    try:
+        out = asyncio.run(main())
+    finally:
+        executor.shutdown()
+    assert len(out) == 12 and all(len(o["pred_label"]) == len(df) for o in out)
+    stats = executor.stats()
+    assert stats["rejected"] == 0 and stats["completed"] == 12 and stats["waiting"] == stats["inflight"] == 0
+
+
+def test_queue_timeout_bounds_the_wait(monkeypatch):
+    import time
+    import serving.executor as executor_module
+
+    def slow_predict(loaded, data):
+        time.sleep(0.2)
+        return {"pred_label": np.array(["CANDIDATE"], dtype=object)}, {}
+
+    monkeypatch.setattr(executor_module, "_thread_predict", slow_predict)
+    executor = InferenceExecutor("thread", workers=1, queue_depth=1, queue_timeout=0.05)
+
+    async def main():
+        return await asyncio.gather(*[executor.predict({}, None) for _ in range(2)],
+                                    executor.predict({}, None, wait=True), return_exceptions=True)
+
+    try:
+        out = asyncio.run(main())
+    finally:
+        executor.shutdown()
+    assert [isinstance(r, ExecutorBusy) for r in out] == [False, True, False]
+
+
+def test_saturated_executor_rejects(bundle):
+    loaded, df = bundle
+    executor = InferenceExecutor("thread", workers=1, queue_depth=2, queue_timeout=0)
+
+    async def main():
+        return await asyncio.gather(*[executor.predict(loaded, df) for _ in range(4)], return_exceptions=True)
+
+    try:
+        out = asyncio.run(main())
+    finally:
+        executor.shutdown()
+    assert sum(isinstance(r, ExecutorBusy) for r in out) == 2
+    assert executor.stats()["rejected"] == 2 and executor.stats()["inflight"] == 0
+
+
+def test_run_predict_accepts_functions_and_coroutines():
+    async def coro(x):
+        return x + 1
+
+    async def main():
+        return await run_predict(lambda x: x * 2, 3), await run_predict(coro, 3)
+
+    assert asyncio.run(main()) == (6, 4)
+
+
+def test_unknown_mode():
+    with pytest.raises(ValueError):
+        InferenceExecutor("gpu")
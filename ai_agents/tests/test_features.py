@@ -0,0 +1,121 @@
+# test_features.py
+# Parité du noyau classifiers.features avec l'ancien _feature_engineering (copie de référence ci-dessous).
+#
+# Usage (depuis ai_agents/) :
+#   python -m pytest tests/test_features.py -q
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from classifiers.exoplanet_classifier import (
+    BASE_NUM_COLS_ALL, DERIVED_COLS, CAT_COLS, _feature_engineering,
+)
+from classifiers.features import compute_features, feature_frame, feature_names
+
+
+def reference_feature_engineering(df: pd.DataFrame) -> pd.DataFrame:
+    """Implémentation d'origine, conservée telle quelle comme référence."""
+    eps = 1e-6
+    df = df.copy()
+    for c in ["period","duration","depth"]:
+        if c in df.columns:
+            df.loc[(~df[c].isna()) & (df[c].astype(float) <= 0), c] = np.nan
+    df["log_period"]          = np.log10(df["period"].astype(float)   + eps)
+    df["log_duration_h"]      = np.log10(df["duration"].astype(float) + eps)
+    df["log_depth_ppm"]       = np.log10(df["depth"].astype(float)    + eps)
+    df["depth_over_duration"] = df["depth"].astype(float) / (df["duration"].astype(float) + eps)
+    return df
+
+
+@pytest.fixture
+def edge_frame():
+    return pd.DataFrame({
+        "period":   [3.5, 0.0, -1.0, np.nan, 1e-9, 400.0],
+        "duration": [2.0, 1.5, 0.0, 3.0, np.nan, -2.0],
+        "depth":    [500.0, np.nan, 120.0, 0.0, 80.0, 1e5],
+        "snr":      [10.0, 5.0, np.nan, 7.0, 1.0, 2.0],
+        "mission":  ["KEPLER", "K2", "TESS", None, "KEPLER", "TESS"],
+    })
+
+
+def _assert_same(expected: pd.DataFrame, actual: pd.DataFrame, cols):
+    for c in cols:
+        np.testing.assert_array_equal(expected[c].to_numpy(dtype=np.float64, na_value=np.nan),
+                                      actual[c].to_numpy(dtype=np.float64, na_value=np.nan), err_msg=c)
+
+
+def test_feature_engineering_parity_edge_cases(edge_frame):
+    expected = reference_feature_engineering(edge_frame)
+    actual = _feature_engineering(edge_frame)
+    _assert_same(expected, actual, ["period", "duration", "depth"] + DERIVED_COLS)
+    # colonnes non concernées et entrée inchangées
+    _assert_same(edge_frame, actual, ["snr"])
+    assert edge_frame["period"].iloc[1] == 0.0
+
+
+def test_feature_engineering_parity_harmonized(harm):
+    expected = reference_feature_engineering(harm)
+    actual = _feature_engineering(harm)
+    _assert_same(expected, actual, BASE_NUM_COLS_ALL + DERIVED_COLS)
+
+
+def test_non_numeric_values_become_nan():
+    df = pd.DataFrame({"period": ["3.5", "abc", None], "duration": [1, 2, 3], "depth": [10, -5, 20]})
+    block = compute_features(df, ["period", "duration", "depth"])
+    assert block[0, 0] == 3.5
+    assert np.isnan(block[1, 0]) and np.isnan(block[2, 0])
+    assert np.isnan(block[1, 2])  # depth <= 0
+
+
+def test_missing_columns_are_nan(edge_frame):
+    block = compute_features(edge_frame[["period"]], BASE_NUM_COLS_ALL)
+    names = feature_names(BASE_NUM_COLS_ALL)
+    assert block.shape == (len(edge_frame), len(names))
+    for c in ["duration", "depth", "log_duration_h", "log_depth_ppm", "depth_over_duration"]:
+        assert np.isnan(block[:, names.index(c)]).all(), c
+    expected = np.log10(edge_frame["period"].where(edge_frame["period"] > 0) + 1e-6).to_numpy()
+    np.testing.assert_array_equal(block[:, names.index("log_period")], expected)
+
+
+def test_dict_input_matches_frame(edge_frame):
+    cols = ["period", "duration", "depth", "snr"]
+    from_frame = compute_features(edge_frame, cols)
+    from_dict = compute_features({c: edge_frame[c].to_numpy() for c in cols}, cols)
+    np.testing.assert_array_equal(from_frame, from_dict)
+
+
+def test_float64_input_is_not_modified():
+    period = np.array([1.0, -2.0, 0.0, 5.0])
+    compute_features({"period": period, "duration": period, "depth": period}, ["period"])
+    np.testing.assert_array_equal(period, [1.0, -2.0, 0.0, 5.0])
+
+
+def test_design_matrix_uses_same_values(harm):
+    from classifiers.design_matrix import build_design_matrix
+    from classifiers.exoplanet_classifier import LABEL_MAP
+
+    dm = build_design_matrix(harm)
+    labelled = harm[harm["label_raw"].isin(LABEL_MAP.keys())]
+    expected = reference_feature_engineering(labelled)
+    for j, c in enumerate(dm.feature_names):
+        np.testing.assert_array_equal(
+            dm.X[:, j], expected[c].to_numpy(dtype=np.float64, na_value=np.nan).astype(np.float32), err_msg=c)
+
+
+def test_feature_frame_matches_reference(harm):
+    all_num_cols = BASE_NUM_COLS_ALL + DERIVED_COLS
+    X = feature_frame(harm, all_num_cols, CAT_COLS)
+    expected = reference_feature_engineering(harm)
+    assert list(X.columns) == all_num_cols + CAT_COLS
+    _assert_same(expected, X, all_num_cols)
+    assert (X["mission"].to_numpy() == harm["mission"].astype(object).to_numpy()).all()
+
+
+def test_feature_frame_missing_and_reordered_columns(edge_frame):
+    cols = ["log_period", "depth", "period", "fpflag_nt"]
+    X = feature_frame(edge_frame.drop(columns="mission"), cols, ["mission"])
+    assert list(X.columns) == cols + ["mission"]
+    expected = reference_feature_engineering(edge_frame)
+    _assert_same(expected, X, ["log_period", "depth", "period"])
+    assert X["fpflag_nt"].isna().all() and X["mission"].isna().all()
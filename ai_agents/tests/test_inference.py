@@ -0,0 +1,69 @@
+# test_inference.py
+# Moteur d'inférence unique (classifiers.inference) : une évaluation, mêmes sorties que predict().
+#
+# Usage (depuis ai_agents/) :
+#   python -m pytest tests/test_inference.py -q
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from classifiers.exoplanet_classifier import (
+    train_final_model_and_save, load_model, INV_LABEL_MAP, LABEL_MAP, _feature_engineering,
+)
+from classifiers.inference import OUTPUT_COLS, predict_arrays, predict_frame
+
+
+@pytest.fixture(scope="module")
+def bundle(harm, tmp_path_factory):
+    return load_model(train_final_model_and_save(harm, model_dir=str(tmp_path_factory.mktemp("model"))))
+
+
+def test_pipeline_matches_predict(harm, bundle):
+    model, all_num_cols, cat_cols, label_map = bundle
+    out = predict_arrays(model, all_num_cols, cat_cols, harm, label_map)
+    X = _feature_engineering(harm)[all_num_cols + cat_cols]
+    expected = pd.Series(model.predict(X)).map(INV_LABEL_MAP).to_numpy()
+    assert (out["pred_label"] == expected).all()
+    proba = model.predict_proba(X)
+    for col, label in zip(OUTPUT_COLS[1:], ["FALSE POSITIVE", "CANDIDATE", "CONFIRMED"]):
+        np.testing.assert_allclose(out[col], proba[:, LABEL_MAP[label]], rtol=0, atol=1e-12)
+
+
+
+def test_stage_timings_pipeline_and_compiled(harm, bundle):
+    from classifiers.compiled import compile_pipeline
+
+    model, all_num_cols, cat_cols, label_map = bundle
+    compiled = compile_pipeline(model, all_num_cols, cat_cols, label_map)
+    outs = []
+    for m in (model, compiled):
+        timings = {}
+        outs.append(predict_arrays(m, all_num_cols, cat_cols, harm, label_map, timings))
+        assert set(timings) == {"features", "preprocess", "trees"} and min(timings.values()) >= 0
+    for col in OUTPUT_COLS[1:]:
+        np.testing.assert_allclose(outs[1][col], outs[0][col], rtol=0, atol=1e-9)
+
+def test_predict_frame_keeps_input(harm, bundle):
+    model, all_num_cols, cat_cols, label_map = bundle
+    df = harm.head(10)[["mission", "period", "duration", "depth"]]
+    out = predict_frame(model, all_num_cols, cat_cols, df, label_map)
+    assert list(out.columns) == list(df.columns) + OUTPUT_COLS
+    assert "pred_label" not in df.columns
+    np.testing.assert_allclose(out[OUTPUT_COLS[1:]].sum(axis=1), 1.0)
+
+
+def test_legacy_dummies_model(harm):
+    from sklearn.ensemble import RandomForestClassifier
+
+    fe = _feature_engineering(harm)
+    X = pd.get_dummies(fe[["period", "duration", "depth", "mission"]].astype({"mission": str}),
+                       columns=["mission"]).fillna(0)
+    y = harm["label_raw"].astype(object).fillna("CANDIDATE")
+    rf = RandomForestClassifier(n_estimators=5, random_state=0).fit(X, y)
+
+    df = harm.head(50)[["mission", "period", "duration", "depth"]]
+    out = predict_arrays(rf, ["period", "duration", "depth"], ["mission"], df)
+    Xn = pd.get_dummies(_feature_engineering(df)[["period", "duration", "depth", "mission"]].astype({"mission": str}),
+                        columns=["mission"]).reindex(columns=rf.feature_names_in_, fill_value=False).fillna(0)
+    assert (out["pred_label"] == rf.predict(Xn)).all()
@@ -0,0 +1,86 @@
+# test_metrics.py
+# Métriques Prometheus (serving.metrics) : exposition texte, middleware HTTP, outils des agents.
+#
+# Usage (depuis ai_agents/) :
+#   python -m pytest tests/test_metrics.py -q
+
+import asyncio
+import inspect
+
+import httpx
+import pytest
+from fastapi import FastAPI, HTTPException
+
+from serving.metrics import Registry, MetricsMiddleware, TOOL_DURATION, TOOL_ERRORS, timed_tool
+
+
+def test_render_counters_and_histograms():
+    registry = Registry()
+    hits = registry.counter("cache_hits", "Cache hits.", ("cache",))
+    hits.labels("rows").inc()
+    hits.labels("rows").inc(2)
+    latency = registry.histogram("latency_seconds", 'Latency "quoted".', buckets=(0.1, 1))
+    latency.observe(0.05)
+    latency.observe(5)
+    text = registry.render()
+    assert '# TYPE cache_hits_total counter\ncache_hits_total{cache="rows"} 3\n' in text
+    assert 'latency_seconds_bucket{le="0.1"} 1\nlatency_seconds_bucket{le="1"} 1\nlatency_seconds_bucket{le="+Inf"} 2\n' in text
+    assert "latency_seconds_sum 5.05\nlatency_seconds_count 2\n" in text
+    assert registry.counter("cache_hits", "Cache hits.", ("cache",)) is hits
+    with pytest.raises(ValueError):
+        registry.histogram("cache_hits", "Cache hits.")
+    with pytest.raises(ValueError):
+        hits.labels("a", "b")
+
+
+def test_middleware_labels_by_route_template():
+    app = FastAPI()
+
+    @app.get("/items/{item_id}")
+    def item(item_id: int):
+        if item_id == 0:
+            raise HTTPException(status_code=404)
+        return {"id": item_id}
+
+    registry = Registry()
+    app.add_middleware(MetricsMiddleware, registry=registry)
+
+    async def main():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://t") as c:
+            for path in ("/items/1", "/items/2", "/items/0", "/nowhere"):
+                await c.get(path)
+
+    asyncio.run(main())
+    text = registry.render()
+    assert 'http_requests_total{method="GET",route="/items/{item_id}",status="200"} 2' in text
+    assert 'http_requests_total{method="GET",route="/items/{item_id}",status="404"} 1' in text
+    assert 'http_requests_total{method="GET",route="<unmatched>",status="404"} 1' in text
+    assert 'http_request_duration_seconds_count{method="GET",route="/items/{item_id}"} 3' in text
+
+
+def test_timed_tool_counts_raised_and_returned_errors():
+    @timed_tool(is_error=lambda r: r.startswith("Error"))
+    async def lookup_tool_a(query: str, n: int = 3) -> str:
+        """Doc de l'outil."""
+        if query == "boom":
+            raise RuntimeError(query)
+        return "Error: no key" if query == "nokey" else "ok"
+
+    @timed_tool()
+    def lookup_tool_b(query: str) -> str:
+        return query
+
+    async def main():
+        assert await lookup_tool_a("x") == "ok"
+        await lookup_tool_a("nokey")
+        with pytest.raises(RuntimeError):
+            await lookup_tool_a("boom")
+
+    asyncio.run(main())
+    lookup_tool_b("y")
+    assert list(inspect.signature(lookup_tool_a).parameters) == ["query", "n"]
+    assert lookup_tool_a.__doc__ == "Doc de l'outil." and inspect.iscoroutinefunction(lookup_tool_a)
+    assert TOOL_DURATION.labels("lookup_tool_a").snapshot()["count"] == 3
+    assert TOOL_ERRORS.labels("lookup_tool_a").value == 2
+    assert TOOL_ERRORS.labels("lookup_tool_b").value == 0
+
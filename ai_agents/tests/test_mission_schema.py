@@ -0,0 +1,144 @@
+# test_mission_schema.py
+# Harmonisation déclarative (classifiers.mission_schema) : mêmes valeurs que les anciens
+# harmonize_koi / harmonize_k2 / harmonize_toi (copies de référence ci-dessous), types compacts
+# par colonne, et apply_dtypes après un aller-retour en types génériques.
+#
+# Usage (depuis ai_agents/) :
+#   python -m pytest tests/test_mission_schema.py -q
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from classifiers.mission_schema import (
+    FLAG_COLS, HARMONIZED_COLS, LABEL_DTYPE, MEASURE_COLS, MISSION_DTYPE, apply_dtypes, harmonize,
+)
+from classifiers.synthetic import synthetic_catalogs
+
+
+# --- Implémentations d'origine, conservées telles quelles comme référence ---
+
+def reference_harmonize_koi(df):
+    return pd.DataFrame({
+        "object_id": df.get("kepoi_name", df.index.astype(str)),
+        "mission": "KEPLER",
+        "star_id": df.get("kepid"),
+        "period": df.get("koi_period"),
+        "duration": df.get("koi_duration"),
+        "depth": df.get("koi_depth"),
+        "snr": df.get("koi_model_snr"),
+        "st_teff": df.get("koi_steff"),
+        "st_logg": df.get("koi_slogg"),
+        "st_rad": df.get("koi_srad"),
+        "mag": df.get("koi_kepmag"),
+        "fpflag_nt": df.get("koi_fpflag_nt"),
+        "fpflag_ss": df.get("koi_fpflag_ss"),
+        "fpflag_co": df.get("koi_fpflag_co"),
+        "fpflag_ec": df.get("koi_fpflag_ec"),
+        "label_raw": df.get("koi_disposition"),
+    })
+
+
+def reference_harmonize_k2(df):
+    return pd.DataFrame({
+        "object_id": df.get("object_id").astype(str),
+        "mission": "K2",
+        "star_id": df.get("star_id").astype(str),
+        "period": df.get("period"),
+        "duration": df.get("duration_h"),
+        "depth": df.get("depth"),
+        "snr": df.get("snr"),
+        "st_teff": df.get("st_teff"),
+        "st_logg": df.get("st_logg"),
+        "st_rad": df.get("st_rad"),
+        "mag": df.get("mag"),
+        "fpflag_nt": df.get("fpflag_nt"),
+        "fpflag_ss": df.get("fpflag_ss"),
+        "fpflag_co": df.get("fpflag_co"),
+        "fpflag_ec": df.get("fpflag_ec"),
+        "label_raw": df.get("Archive_Disposition"),
+    })
+
+
+def reference_harmonize_toi(df):
+    def map_toi_label(x):
+        if pd.isna(x):
+            return None
+        x = str(x).upper()
+        if x in {"KP", "CP", "CONFIRMED"}:
+            return "CONFIRMED"
+        if x in {"PC", "APC", "CANDIDATE"}:
+            return "CANDIDATE"
+        if x in {"FP", "FALSE POSITIVE"}:
+            return "FALSE POSITIVE"
+        return None
+
+    return pd.DataFrame({
+        "object_id": df.get("toi").astype(str),
+        "mission": "TESS",
+        "star_id": df.get("TIC_ID"),
+        "period": df.get("Period_days"),
+        "duration": df.get("Duration_hours"),
+        "depth": df.get("Depth_ppm"),
+        "snr": df.get("SNR"),
+        "st_teff": df.get("st_teff"),
+        "st_logg": df.get("st_logg"),
+        "st_rad": df.get("st_rad"),
+        "mag": df.get("TESS_Mag"),
+        "fpflag_nt": df.get("fpflag_nt"),
+        "fpflag_ss": df.get("fpflag_ss"),
+        "fpflag_co": df.get("fpflag_co"),
+        "fpflag_ec": df.get("fpflag_ec"),
+        "label_raw": df.get("TFOPWG_Disposition").map(map_toi_label),
+    })
+
+
+REFERENCE = {"koi": reference_harmonize_koi, "k2": reference_harmonize_k2, "toi": reference_harmonize_toi}
+
+
+@pytest.fixture(scope="module")
+def cats():
+    return synthetic_catalogs(3000, seed=9)
+
+
+def _text(col: pd.Series) -> list:
+    return [None if pd.isna(v) else str(v) for v in col.astype(object)]
+
+
+def _assert_compact_dtypes(harm: pd.DataFrame):
+    assert list(harm.columns) == HARMONIZED_COLS
+    assert harm["mission"].dtype == MISSION_DTYPE and harm["label_raw"].dtype == LABEL_DTYPE
+    for c in MEASURE_COLS:
+        assert harm[c].dtype == np.float32, c
+    for c in FLAG_COLS:
+        assert harm[c].dtype == pd.Int8Dtype(), c
+
+
+@pytest.mark.parametrize("catalog", ["koi", "k2", "toi"])
+def test_matches_reference_harmonization(cats, catalog):
+    raw = cats[catalog]
+    expected, got = REFERENCE[catalog](raw), harmonize(raw, catalog)
+    _assert_compact_dtypes(got)
+    assert len(got) == len(expected)
+    for c in ("object_id", "mission", "star_id", "label_raw"):
+        assert _text(got[c]) == _text(expected[c]), c
+    for c in MEASURE_COLS:
+        # référence float64 ramenée en float32 ; colonne absente = NaN partout
+        ref = pd.to_numeric(expected[c], errors="coerce").to_numpy(dtype=np.float64, na_value=np.nan)
+        np.testing.assert_array_equal(got[c].to_numpy(), ref.astype(np.float32), err_msg=c)
+    for c in FLAG_COLS:
+        ref = pd.to_numeric(expected[c], errors="coerce").astype("Int8")
+        pd.testing.assert_series_equal(got[c], ref, check_names=False)
+
+
+def test_concat_and_apply_dtypes_keep_compact_types(cats):
+    harm = pd.concat([harmonize(cats[c], c) for c in ("koi", "k2", "toi")], ignore_index=True)
+    _assert_compact_dtypes(harm)
+    assert set(harm["mission"]) == {"KEPLER", "K2", "TESS"}
+
+    # état relu sans ses types (Parquet, concat d'anciens états) : texte et float64
+    generic = harm.astype({"mission": object, "label_raw": object,
+                           **{c: np.float64 for c in MEASURE_COLS}, **{c: object for c in FLAG_COLS}})
+    restored = apply_dtypes(generic)
+    _assert_compact_dtypes(restored)
+    pd.testing.assert_frame_equal(restored, harm)
@@ -0,0 +1,94 @@
+# test_model_registry.py
+# Registre des modèles (serving.model_registry) : découverte, chargement paresseux, bascule du
+# défaut pendant une requête, redéploiement, éviction sous plafond mémoire.
+#
+# Usage (depuis ai_agents/) :
+#   python -m pytest tests/test_model_registry.py -q
+
+import asyncio
+import os
+import shutil
+from pathlib import Path
+
+import pytest
+
+from classifiers.exoplanet_classifier import train_final_model_and_save
+from serving.model_registry import ModelRegistry, UnknownModel
+
+
+@pytest.fixture(scope="module")
+def bundle(harm, tmp_path_factory):
+    return train_final_model_and_save(harm, model_dir=str(tmp_path_factory.mktemp("model")))
+
+
+@pytest.fixture
+def model_dir(bundle, tmp_path):
+    for name in ("alpha", "beta", "gamma"):
+        shutil.copy(bundle, tmp_path / f"{name}.pkl")
+    (tmp_path / "notes.txt").write_text("ignored")
+    return tmp_path
+
+
+def test_discovery_and_lazy_loading(model_dir):
+    registry = ModelRegistry(str(model_dir), default="beta")
+    assert registry.names() == ["alpha", "beta", "gamma"]
+    assert not any(m["loaded"] for m in registry.stats()["models"])
+    entry = registry.get()
+    assert entry["name"] == "beta" and entry["loaded"] and entry["model"] is not None
+    stats = {m["name"]: m for m in registry.stats()["models"]}
+    assert stats["beta"]["load_seconds"] > 0 and stats["beta"]["default"]
+    assert not stats["alpha"]["loaded"]
+    with pytest.raises(UnknownModel):
+        registry.get("delta")
+
+
+def test_default_path_outside_model_dir(bundle, tmp_path):
+    registry = ModelRegistry(str(tmp_path / "empty"), default=bundle)
+    assert registry.names() == [Path(bundle).stem] == [registry.default]
+
+
+def test_swap_keeps_inflight_requests_on_their_model(model_dir):
+    registry = ModelRegistry(str(model_dir), default="alpha")
+
+    async def main():
+        async with registry.use() as before:
+            await asyncio.to_thread(registry.set_default, "beta")
+            async with registry.use() as after:
+                assert after["name"] == "beta"
+            assert before["name"] == "alpha" and before["model"] is not None
+        return registry.stats()
+
+    stats = {m["name"]: m for m in asyncio.run(main())["models"]}
+    assert stats["alpha"]["requests"] == 1 and stats["alpha"]["inflight"] == 0
+    assert stats["beta"]["default"]
+
+
+def test_refresh_replaces_redeployed_models(model_dir, bundle):
+    registry = ModelRegistry(str(model_dir), default="alpha")
+    old = registry.get("gamma")
+    (model_dir / "gamma.pkl").write_bytes(Path(bundle).read_bytes() + b"\0")
+    os.remove(model_dir / "beta.pkl")
+    shutil.copy(bundle, model_dir / "delta.pkl")
+    assert registry.refresh() == {"added": ["delta"], "updated": ["gamma"], "removed": ["beta"]}
+    new = registry.get("gamma")
+    assert new is not old and new["version"] != old["version"]
+    assert old["model"] is not None  # toujours utilisable par les requêtes qui le tiennent
+
+
+def test_idle_models_evicted_under_memory_cap(model_dir):
+    size = (model_dir / "alpha.pkl").stat().st_size
+    registry = ModelRegistry(str(model_dir), default="alpha", memory_cap_bytes=2 * size)
+
+    async def main():
+        async with registry.use("beta"):
+            async with registry.use("gamma"):  # modèles en cours d'utilisation : rien n'est déchargé
+                assert registry.stats()["loaded_bytes"] == 3 * size
+            # gamma, inactif, est déchargé dès la fin de sa requête ; alpha (défaut) est protégé
+            assert registry.stats()["evictions"] == 1
+
+    registry.get()
+    asyncio.run(main())
+    registry.get("gamma")  # rechargé : beta, le moins récemment utilisé, est déchargé
+    loaded = {m["name"] for m in registry.stats()["models"] if m["loaded"]}
+    assert loaded == {"alpha", "gamma"}
+    assert registry.stats()["evictions"] == 2 and registry.stats()["loaded_bytes"] == 2 * size
@@ -0,0 +1,81 @@
+# test_out_of_core.py
+# Entraînement hors mémoire (classifiers.out_of_core) : pic mémoire indépendant du nombre de
+# lignes, table du QuantileTransformer identique à celle du pipeline en mémoire (NaN imputés).
+#
+# Usage (depuis ai_agents/) :
+#   python -m pytest tests/test_out_of_core.py -q
+
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from classifiers.design_matrix import build_design_matrix
+from classifiers.exoplanet_classifier import BASE_NUM_COLS_ALL, CAT_COLS, _build_preprocessor
+from classifiers.out_of_core import QuantileSketch, _imputed_quantiles, harmonized_batches, train_out_of_core
+
+ROOT = Path(__file__).resolve().parents[1]
+SMALL_HGB = {"max_iter": 5, "random_state": 42}
+
+
+def _projected(harm: pd.DataFrame) -> pd.DataFrame:
+    """Colonnes lues par l'entraînement hors mémoire."""
+    return harm[[c for c in BASE_NUM_COLS_ALL if c in harm] + ["mission", "label_raw"]]
+
+
+def _peak_rss_mb(path: Path, model_dir: Path) -> float:
+    """Pic RSS (Mo) d'un entraînement hors mémoire lancé dans un processus neuf."""
+    # VmHWM plutôt que ru_maxrss, qui hérite du pic du processus parent (pytest) au fork
+    code = (
+        "import json\n"
+        "from classifiers.out_of_core import harmonized_batches, train_out_of_core\n"
+        f"train_out_of_core(harmonized_batches({str(path)!r}, 20_000), model_dir={str(model_dir)!r},\n"
+        f"                  max_train_rows=20_000, hgb_params={SMALL_HGB!r})\n"
+        "status = dict(line.split(':', 1) for line in open('/proc/self/status'))\n"
+        "print(json.dumps(int(status['VmHWM'].split()[0]) / 1024))\n"
+    )
+    out = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def test_peak_memory_does_not_grow_with_rows(make_harm, tmp_path):
+    peaks = {}
+    for n_rows in (100_000, 1_000_000):
+        path = tmp_path / f"h{n_rows}.parquet"
+        _projected(make_harm(n_rows, keep=False)).to_parquet(path, index=False, row_group_size=20_000)
+        peaks[n_rows] = _peak_rss_mb(path, tmp_path / "models")
+    # 10x plus de lignes : seuls les sketches grandissent (O(k log n)), quelques Mo au plus
+    assert peaks[1_000_000] - peaks[100_000] < 20, peaks
+
+
+def test_quantile_table_matches_in_memory_pipeline(harm, tmp_path):
+    harm = _projected(harm)
+    path = tmp_path / "h.parquet"
+    harm.to_parquet(path, index=False)
+    # sketch_k plus grand que le jeu : aucune compaction, quantiles exacts
+    bundle = joblib.load(train_out_of_core(harmonized_batches(str(path), 1000), model_dir=str(tmp_path),
+                                           sketch_k=100_000, hgb_params=SMALL_HGB))
+    dm = build_design_matrix(harm)
+    assert np.isnan(dm.X).mean(axis=0).max() > 0.05  # des colonnes ont des valeurs manquantes
+    pre = _build_preprocessor(dm.feature_names, CAT_COLS).fit(dm.frame())
+
+    def quantiles(p):
+        return p.named_transformers_["num"].named_steps["qt"].quantiles_
+
+    expected, got = quantiles(pre), quantiles(bundle["pipeline"].named_steps["pre"])
+    spread = expected[-1] - expected[0]
+    assert np.all(np.abs(got - expected) <= 0.01 * spread + 1e-9)
+
+
+def test_imputed_quantiles_match_median_imputed_column():
+    rng = np.random.default_rng(3)
+    levels = np.linspace(0, 1, 1000)
+    for values in (rng.normal(size=401), rng.normal(size=400), (rng.random(300) < 0.25).astype(float)):
+        for n_missing in (0, 1, 357):
+            imputed = np.concatenate([values, np.full(n_missing, np.median(values))])
+            got = _imputed_quantiles(QuantileSketch(k=10_000).update(values), n_missing, levels)
+            np.testing.assert_allclose(got, np.quantile(imputed, levels), rtol=0, atol=1e-12)
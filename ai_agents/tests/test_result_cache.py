@@ -0,0 +1,80 @@
+# test_result_cache.py
+# Cache des prédictions (serving.result_cache) : canonisation, lots partiels, LRU, invalidation.
+#
+# Usage (depuis ai_agents/) :
+#   python -m pytest tests/test_result_cache.py -q
+
+import numpy as np
+import pandas as pd
+
+from serving.result_cache import PredictionCache, model_version
+
+COLUMNS = ["mission", "period", "depth", "snr"]
+
+
+def _predict(calls):
+    def predict(df):
+        calls.append(len(df))
+        period = pd.to_numeric(df["period"], errors="coerce").fillna(-1).to_numpy(dtype=float)
+        return {"pred_label": np.where(period > 10, "CONFIRMED", "CANDIDATE").astype(object),
+                "p_CONFIRMED": period / 100}
+    return predict
+
+
+def test_batch_only_sends_missing_rows():
+    calls = []
+    cache = PredictionCache(COLUMNS, max_entries=100)
+    cache.bind("v1")
+    first = cache.predict(pd.DataFrame({"period": [1.0, 20.0], "mission": ["TESS", "K2"]}), _predict(calls))
+    out = cache.predict(pd.DataFrame({"period": [20.0, 3.0, 1.0, 3.0], "mission": ["K2", "TESS", "TESS", "TESS"]}),
+                        _predict(calls))
+    assert calls == [2, 1]  # seule la ligne 3.0 est nouvelle, calculée une fois malgré le doublon
+    assert list(out["pred_label"]) == ["CONFIRMED", "CANDIDATE", "CANDIDATE", "CANDIDATE"]
+    np.testing.assert_array_equal(out["p_CONFIRMED"], [0.2, 0.03, 0.01, 0.03])
+    assert list(first["pred_label"]) == ["CANDIDATE", "CONFIRMED"]
+    stats = cache.stats()
+    assert stats["hits"] == 2 and stats["misses"] == 4 and stats["entries"] == 3
+
+
+def test_equivalent_inputs_share_an_entry():
+    cache = PredictionCache(COLUMNS)
+    a = pd.DataFrame({"period": [2], "depth": [-5.0], "snr": [np.nan]})
+    b = pd.DataFrame({"period": [2.0], "depth": [0.0], "mission": [None]})
+    assert cache.keys(a) == cache.keys(b)
+    assert cache.keys(a) != cache.keys(pd.DataFrame({"period": [2.0], "depth": [1.0]}))
+
+
+def test_lru_eviction():
+    calls = []
+    cache = PredictionCache(COLUMNS, max_entries=2)
+    cache.bind("v1")
+    for p in (1.0, 2.0, 1.0, 3.0):  # 2.0 est le moins récemment utilisé quand 3.0 arrive
+        cache.predict(pd.DataFrame({"period": [p]}), _predict(calls))
+    cache.predict(pd.DataFrame({"period": [1.0]}), _predict(calls))
+    assert calls == [1, 1, 1]
+    assert cache.stats()["evictions"] == 1
+
+
+def test_model_swap_invalidates():
+    calls = []
+    cache = PredictionCache(COLUMNS)
+    cache.bind("v1")
+    cache.predict(pd.DataFrame({"period": [1.0]}), _predict(calls))
+    cache.bind("v1")
+    cache.predict(pd.DataFrame({"period": [1.0]}), _predict(calls))
+    cache.bind("v2")
+    cache.predict(pd.DataFrame({"period": [1.0]}), _predict(calls))
+    assert calls == [1, 1]
+    assert cache.stats()["invalidations"] == 1
+
+
+def test_model_version_tracks_content(tmp_path):
+    f = tmp_path / "model.pkl"
+    f.write_bytes(b"abc")
+    v1 = model_version(str(f))
+    f.write_bytes(b"abd")
+    assert model_version(str(f)) != v1
+    d = tmp_path / "artifact"
+    d.mkdir()
+    (d / "manifest.json").write_text("{}")
+    assert model_version(str(d)) != model_version(str(f))
@@ -0,0 +1,81 @@
+# test_retrain.py
+# Ré-entraînement incrémental (classifiers.retrain) : warm start quand les données ne dérivent pas
+# (préprocesseur et arbres du parent conservés), refit complet sur dérive ou changement de
+# features, lignée des bundles versionnés.
+#
+# Usage (depuis ai_agents/) :
+#   python -m pytest tests/test_retrain.py -q
+
+from pathlib import Path
+
+import joblib
+import numpy as np
+import pandas as pd
+import pytest
+
+from classifiers.exoplanet_classifier import train_final_model_and_save
+from classifiers.retrain import feature_drift, incremental_retrain
+
+SMALL_HGB = {"max_iter": 15, "early_stopping": False, "random_state": 42}
+
+
+@pytest.fixture(scope="module")
+def parent(harm, tmp_path_factory):
+    model_dir = tmp_path_factory.mktemp("models")
+    return harm, train_final_model_and_save(harm, model_dir=str(model_dir), hgb_params=SMALL_HGB)
+
+
+def _qt(bundle):
+    return bundle["pipeline"].named_steps["pre"].named_transformers_["num"].named_steps["qt"]
+
+
+def test_no_drift_warm_starts_from_parent(parent, make_harm, tmp_path):
+    harm, parent_path = parent
+    augmented = pd.concat([harm, make_harm(1500, seed=2)], ignore_index=True)
+    lineage = incremental_retrain(augmented, parent_path, model_dir=str(tmp_path), extra_iter=5)
+
+    assert lineage["mode"] == "warm_start" and max(lineage["drift"].values()) <= 0.1
+    assert (lineage["version"], lineage["parent"]) == (2, Path(parent_path).name)
+    assert lineage["parent_n_iter"] == 15 and lineage["n_iter"] == 20
+    old, new = joblib.load(parent_path), joblib.load(lineage["path"])
+    assert Path(lineage["path"]).name == Path(parent_path).stem + "-v2.pkl"
+    assert new["lineage"]["mode"] == "warm_start"
+    # préprocesseur conservé, arbres du parent inchangés, nouvelles itérations ajoutées
+    np.testing.assert_array_equal(_qt(new).quantiles_, _qt(old).quantiles_)
+    old_trees, new_trees = old["pipeline"].named_steps["clf"]._predictors, new["pipeline"].named_steps["clf"]._predictors
+    assert len(new_trees) == 20
+    for a, b in zip(old_trees, new_trees[:15]):
+        assert all(np.array_equal(x.nodes, y.nodes) for x, y in zip(a, b))
+
+
+def test_drift_forces_full_refit(parent, tmp_path):
+    harm, parent_path = parent
+    shifted = harm.assign(period=harm["period"] * 50, depth=harm["depth"] * 20)
+    lineage = incremental_retrain(shifted, parent_path, model_dir=str(tmp_path), drift_threshold=0.1)
+
+    assert lineage["mode"] == "full_refit" and lineage["reason"] == "drift above threshold"
+    assert lineage["drift"]["period"] > 0.1
+    new = joblib.load(lineage["path"])
+    assert new["lineage"]["version"] == 2 and new["lineage"]["mode"] == "full_refit"
+    assert not np.array_equal(_qt(new).quantiles_, _qt(joblib.load(parent_path)).quantiles_)
+
+    # la lignée continue depuis une version déjà suffixée
+    again = incremental_retrain(shifted, lineage["path"], model_dir=str(tmp_path))
+    assert again["version"] == 3 and Path(again["path"]).name == Path(parent_path).stem + "-v3.pkl"
+
+
+def test_feature_set_change_forces_full_refit(parent, tmp_path):
+    harm, parent_path = parent
+    lineage = incremental_retrain(harm.drop(columns=["snr"]), parent_path, model_dir=str(tmp_path))
+    assert lineage["mode"] == "full_refit" and lineage["reason"] == "feature set changed"
+    assert lineage["drift"] is None
+    assert "snr" not in joblib.load(lineage["path"])["all_num_cols"]
+
+
+def test_feature_drift_is_zero_on_training_data(parent):
+    harm, parent_path = parent
+    from classifiers.design_matrix import build_design_matrix
+    bundle = joblib.load(parent_path)
+    dm = build_design_matrix(harm)
+    drift = feature_drift(bundle["pipeline"].named_steps["pre"], dm.frame(), bundle["all_num_cols"])
+    assert set(drift) <= set(bundle["all_num_cols"]) and max(drift.values()) < 0.01
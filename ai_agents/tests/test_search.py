@@ -0,0 +1,33 @@
+# test_search.py
+# Recherche d'hyperparamètres (classifiers.search) : budget de temps respecté (workers arrêtés),
+# journal de reprise.
+#
+# Usage (depuis ai_agents/) :
+#   python -m pytest tests/test_search.py -q
+
+import multiprocessing
+import time
+
+import pytest
+
+from classifiers.search import successive_halving
+
+
+@pytest.mark.parametrize("harm", [1500], indirect=True)
+def test_budget_stops_running_fits_and_checkpoint_resumes(harm, tmp_path):
+    checkpoint = str(tmp_path / "search.jsonl")
+    kwargs = dict(n_candidates=9, min_resource=5, max_resource=2000, eta=3, n_splits=3,
+                  checkpoint=checkpoint, n_jobs=2)
+
+    t0 = time.perf_counter()
+    first = successive_halving(harm, budget_seconds=4.0, **kwargs)
+    elapsed = time.perf_counter() - t0
+    assert not first["completed"]
+    assert elapsed < 4.0 + 3.0  # matrice de design + arrêt des workers
+    assert multiprocessing.active_children() == []  # aucun fit ne continue en arrière-plan
+
+    with open(checkpoint, encoding="utf-8") as f:
+        n_done = sum(1 for line in f if line.strip())
+    assert n_done > 0
+    second = successive_halving(harm, budget_seconds=0.5, **kwargs)
+    assert second["n_trials_resumed"] == n_done
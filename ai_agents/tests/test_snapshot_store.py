@@ -0,0 +1,108 @@
+# test_snapshot_store.py
+# Snapshots des catalogues (classifiers.snapshot_store) : ID par contenu, immuabilité, manifest,
+# latest() après un retour à un contenu antérieur, projection / prédicats à la lecture, et
+# load_catalog avec un dossier local à la place de l'archive.
+#
+# Usage (depuis ai_agents/) :
+#   python -m pytest tests/test_snapshot_store.py -q
+
+import os
+import stat
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from classifiers import exoplanet_classifier
+from classifiers.exoplanet_classifier import load_catalog
+from classifiers.snapshot_store import SnapshotStore
+
+
+@pytest.fixture(scope="module")
+def koi():
+    """Extrait KOI factice (colonnes de fetch_koi)."""
+    rng = np.random.default_rng(4)
+    n = 600
+    kepid = 757_000 + rng.integers(0, 450, n)
+    return pd.DataFrame({
+        "kepid": kepid,
+        "kepoi_name": [f"K{k}.{i % 3 + 1:02d}" for i, k in enumerate(kepid)],
+        "koi_disposition": rng.choice(["CONFIRMED", "CANDIDATE", "FALSE POSITIVE"], n),
+        "koi_period": np.exp(rng.normal(2.3, 1.3, n)),
+        "koi_duration": np.exp(rng.normal(1.2, 0.5, n)),
+        "koi_depth": np.where(rng.random(n) < 0.05, np.nan, np.exp(rng.normal(6.0, 1.4, n))),
+        "koi_fpflag_nt": rng.integers(0, 2, n),
+        "mission": "KEPLER",
+    })
+
+
+def test_put_is_content_addressed_and_immutable(tmp_path, koi):
+    store = SnapshotStore(str(tmp_path))
+    sid = store.put("koi", koi, source="test")
+    assert sid.startswith("koi-") and store.put("koi", koi.copy()) == sid  # même contenu : même ID
+    assert len(list((tmp_path / "koi").glob("*.parquet"))) == 1
+
+    path = tmp_path / store.info(sid)["path"]
+    assert not os.stat(path).st_mode & (stat.S_IWUSR | stat.S_IWGRP | stat.S_IWOTH)
+    assert store.info(sid)["n_rows"] == len(koi) and store.info(sid)["source"] == "test"
+
+    changed = store.put("koi", koi.head(100))
+    assert changed != sid and store.latest("koi") == changed
+    assert [m["id"] for m in store.list("koi")] == [sid, changed] and store.list("toi") == []
+    pd.testing.assert_frame_equal(store.read(sid), koi.reset_index(drop=True), check_dtype=False)
+
+
+def test_reverted_content_becomes_latest_again(tmp_path, koi):
+    store = SnapshotStore(str(tmp_path))
+    first = store.put("koi", koi)
+    created = store.info(first)["created_at"]
+    second = store.put("koi", koi.head(100))
+    assert store.latest("koi") == second
+
+    # retour au contenu d'origine : même ID, redevenu le plus récent, date de création conservée
+    assert store.put("koi", koi.copy()) == first
+    assert store.latest("koi") == first
+    assert [m["id"] for m in store.list("koi")] == [second, first]
+    info = store.info(first)
+    assert info["created_at"] == created and info["last_put_at"] > store.info(second)["last_put_at"]
+    assert len(list((tmp_path / "koi").glob("*.parquet"))) == 2
+
+
+def test_mixed_type_columns_are_stored_as_text(tmp_path):
+    store = SnapshotStore(str(tmp_path))
+    df = pd.DataFrame({"star_id": pd.Series([101, "TIC 7", None], dtype=object), "period": [1.0, 2.0, 3.0]})
+    back = store.read(store.put("mixed", df))
+    assert back["star_id"].iloc[:2].tolist() == ["101", "TIC 7"] and pd.isna(back["star_id"].iloc[2])
+
+
+def test_read_with_projection_and_filters(tmp_path, koi):
+    store = SnapshotStore(str(tmp_path))
+    sid = store.put("koi", koi)
+    df = store.read(sid, columns=["kepoi_name", "koi_disposition"],
+                    filters=[("koi_disposition", "in", ["CONFIRMED", "CANDIDATE"])])
+    assert list(df.columns) == ["kepoi_name", "koi_disposition"]
+    expected = koi[koi["koi_disposition"].isin(["CONFIRMED", "CANDIDATE"])]
+    assert 0 < len(df) == len(expected) < len(koi)
+
+
+def test_load_catalog_uses_local_store_instead_of_archive(tmp_path, koi, monkeypatch):
+    store = SnapshotStore(str(tmp_path))
+    fetched = []
+
+    def fetch():
+        fetched.append("koi")
+        return koi
+
+    monkeypatch.setitem(exoplanet_classifier.CATALOG_FETCHERS, "koi", fetch)
+    df, sid = load_catalog("koi", store)  # non épinglé : archive, puis snapshot
+    assert fetched == ["koi"] and store.info(sid)["source"] == "nasa_exoplanet_archive"
+
+    def offline():
+        raise AssertionError("the archive must not be queried for a pinned snapshot")
+
+    monkeypatch.setitem(exoplanet_classifier.CATALOG_FETCHERS, "koi", offline)
+    pinned, same = load_catalog("koi", SnapshotStore(str(tmp_path)), snapshot_id=sid)
+    assert same == sid
+    pd.testing.assert_frame_equal(pinned, df.reset_index(drop=True), check_dtype=False)
+    with pytest.raises(KeyError):
+        load_catalog("koi", store, snapshot_id="koi-0000000000000000")
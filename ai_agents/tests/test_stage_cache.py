@@ -0,0 +1,95 @@
+# test_stage_cache.py
+# Cache des étapes (classifiers.stage_cache) : enchaînement des clés features → fits de fold →
+# modèle final ; une relance avec un paramètre ou un module modifié ne recalcule que l'aval ; une
+# entrée illisible est un absent, supprimée du disque.
+#
+# Usage (depuis ai_agents/) :
+#   python -m pytest tests/test_stage_cache.py -q
+
+import sys
+import types
+
+import joblib
+import pytest
+
+import classifiers.stage_cache as stage_cache
+from classifiers import design_matrix
+from classifiers.evaluation import evaluate
+from classifiers.exoplanet_classifier import train_final_model_and_save
+from classifiers.stage_cache import StageCache
+
+SMALL_HGB = {"max_iter": 10, "learning_rate": 0.2, "random_state": 42}
+
+# jeu réduit : cinq évaluations complètes par test
+small_harm = pytest.mark.parametrize("harm", [1200], indirect=True)
+
+
+def _run(harm, cache, tmp_path, clf_params=SMALL_HGB):
+    """Évaluation + modèle final ; {étape: (hits, misses)} de cette relance seule."""
+    design_matrix.clear_cache()  # nouveau processus : seul le cache disque subsiste
+    cache.stats = {}
+    evaluate(harm, n_jobs=1, clf_params=clf_params, n_splits=3, min_test_size=20, cache=cache)
+    train_final_model_and_save(harm, model_dir=str(tmp_path), hgb_params=clf_params, cache=cache)
+    return {stage: (s["hits"], s["misses"]) for stage, s in cache.stats.items()}
+
+
+@small_harm
+def test_changes_recompute_only_downstream_stages(harm, tmp_path, monkeypatch):
+    cache = StageCache(str(tmp_path / "cache"))
+    first = _run(harm, cache, tmp_path)
+    assert all(hits == 0 for hits, _ in first.values())
+    n_folds = first["fold_model"][1]
+
+    # relance identique : tout vient du cache
+    again = _run(harm, cache, tmp_path)
+    assert all(misses == 0 for _, misses in again.values())
+
+    # paramètre du HGB : features et préprocesseurs réutilisés, modèles recalculés
+    params = _run(harm, cache, tmp_path, clf_params={**SMALL_HGB, "max_iter": 12})
+    assert params["features"] == (1, 0) and params["fold_preprocessor"] == (n_folds, 0)
+    assert params["fold_model"] == (0, n_folds) and params["final_model"] == (0, 1)
+
+    # module du calcul des colonnes modifié : la matrice et tout ce qui en dépend sont recalculés
+    original = stage_cache._source_digest
+
+    def patched(obj):
+        digest = original(obj)
+        return digest + "-changed" if obj == "classifiers.mission_schema" else digest
+
+    monkeypatch.setattr(stage_cache, "_source_digest", patched)
+    changed = _run(harm, cache, tmp_path)
+    assert changed["features"] == (0, 1)
+    assert changed["fold_preprocessor"] == (0, n_folds) and changed["fold_model"] == (0, n_folds)
+    assert changed["final_model"] == (0, 1)
+
+
+@small_harm
+def test_design_matrix_key_follows_feature_params(harm, monkeypatch):
+    dm = design_matrix.build_design_matrix(harm)
+    assert dm.key == design_matrix.features_key(dm.version)
+    monkeypatch.setitem(design_matrix.FEATURE_PARAMS, "derived", ["log_period"])
+    assert design_matrix.features_key(dm.version) != dm.key
+    assert stage_cache.fingerprint(dm) == "dm:" + dm.key
+
+
+def test_unreadable_entries_are_misses_and_removed(tmp_path, monkeypatch):
+    cache = StageCache(str(tmp_path))
+    paths = {key: cache._path("fit", key) for key in ("truncated", "garbage", "stale")}
+    cache.put("fit", "truncated", list(range(1000)))
+    data = paths["truncated"].read_bytes()
+    paths["truncated"].write_bytes(data[:len(data) // 2])
+    paths["garbage"].write_bytes(b"not a joblib file")
+    # objet d'un module disparu depuis l'écriture
+    gone = types.ModuleType("gone_module")
+    exec("class Model:\n    pass", gone.__dict__)
+    gone.Model.__module__ = "gone_module"
+    monkeypatch.setitem(sys.modules, "gone_module", gone)
+    joblib.dump({"stage": "fit", "created_at": 0.0, "value": gone.Model()}, paths["stale"])
+    monkeypatch.delitem(sys.modules, "gone_module")
+
+    for key, path in paths.items():
+        assert cache.get("fit", key) == (False, None), key
+        assert not path.exists(), key
+    assert cache.stats["fit"] == {"hits": 0, "misses": 3}
+    assert cache.get_or_compute("fit", "garbage", lambda: 42) == 42
+    assert cache.get("fit", "garbage") == (True, 42)
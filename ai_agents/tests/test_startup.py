@@ -0,0 +1,80 @@
+# test_startup.py
+# Démarrage de l'API : import sans dépendances lourdes, routes agents désactivées sans clés,
+# routes ML désactivables indépendamment.
+#
+# Usage (depuis ai_agents/) :
+#   python -m pytest tests/test_startup.py -q
+
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import types
+from pathlib import Path
+
+import httpx
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+
+
+def test_import_does_not_load_heavy_dependencies():
+    env = {k: v for k, v in os.environ.items() if k not in ("OPENAI_API_KEY", "PERPLEXITY_API_KEY")}
+    code = ("import json, sys; import api; print(json.dumps([m for m in "
+            "('sklearn', 'scipy', 'joblib', 'astroquery', 'agents', 'astronomist_agents') if m in sys.modules]))")
+    out = subprocess.run([sys.executable, "-c", code], cwd=ROOT, env=env, capture_output=True, text=True, check=True)
+    assert json.loads(out.stdout.strip().splitlines()[-1]) == []
+
+
+@pytest.fixture
+def api(monkeypatch):
+    for key in ("OPENAI_API_KEY", "PERPLEXITY_API_KEY"):
+        monkeypatch.delenv(key, raising=False)
+    import api
+    return api
+
+
+def _get(app, method, path, **kwargs):
+    async def main():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://t") as c:
+            return await c.request(method, path, **kwargs)
+    return asyncio.run(main())
+
+
+def test_agent_routes_disabled_without_keys(api, monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-test")
+    r = _get(api.app, "POST", "/kepler/analyze", json={"planet_name": "Kepler-22 b"})
+    assert r.status_code == 503 and "PERPLEXITY_API_KEY" in r.json()["detail"]
+    assert "astronomist_agents.johannes_kepler_agent" not in sys.modules
+    health = _get(api.app, "GET", "/grace-hopper/health").json()
+    assert health["status"] == "disabled" and "PERPLEXITY_API_KEY" in health["reason"]
+
+
+def test_ml_routes_disabled_independently(api, monkeypatch):
+    monkeypatch.setattr(api, "API_SUBSYSTEMS", {"agents"})
+    monkeypatch.setattr(api, "_registry", None)
+    api._load_model_on_startup()  # sans effet : aucun modèle chargé
+    assert api._registry is None
+    r = _get(api.app, "POST", "/predict", json={"period": 3.0})
+    assert r.status_code == 503 and r.json()["detail"] == "ML routes disabled"
+    assert _get(api.app, "GET", "/health").json()["subsystems"] == ["agents"]
+
+
+def test_agent_package_exports_resolve_on_first_access(monkeypatch):
+    code = ("import json, sys; import astronomist_agents as pkg; "
+            "print(json.dumps(['create_johannes_kepler_agent' in dir(pkg), "
+            "[m for m in sys.modules if m.startswith('astronomist_agents.') or m == 'agents']]))")
+    out = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, check=True)
+    assert json.loads(out.stdout.strip().splitlines()[-1]) == [True, []]
+
+    import astronomist_agents
+    kepler = types.ModuleType("astronomist_agents.johannes_kepler_agent")
+    kepler.create_agent = object()
+    monkeypatch.setitem(sys.modules, kepler.__name__, kepler)
+    try:
+        assert astronomist_agents.create_johannes_kepler_agent is kepler.create_agent
+    finally:
+        vars(astronomist_agents).pop("create_johannes_kepler_agent", None)
+    with pytest.raises(AttributeError):
+        astronomist_agents.create_hubble_agent
@@ -0,0 +1,146 @@
+# test_streaming.py
+# Prédiction en flux (serving.streaming) : découpage en lignes / blocs, NDJSON et CSV, erreurs,
+# contrôles d'ExoplanetInput par ligne, spool.
+#
+# Usage (depuis ai_agents/) :
+#   python -m pytest tests/test_streaming.py -q
+
+import asyncio
+import io
+import json
+
+import numpy as np
+import pandas as pd
+
+from serving.streaming import detect_format, iter_lines, spool, stream_predictions
+
+COLUMNS = ["mission", "period", "depth"]
+
+
+async def _chunks(data: bytes, size: int):
+    for i in range(0, len(data), size):
+        yield data[i:i + size]
+
+
+def _predict(calls):
+    def predict(df):
+        calls.append(len(df))
+        period = pd.to_numeric(df["period"], errors="coerce").to_numpy(dtype=float)
+        return {"pred_label": np.where(period > 10, "CONFIRMED", "CANDIDATE"),
+                "p_FALSE_POSITIVE": np.zeros(len(df)), "p_CANDIDATE": np.zeros(len(df)),
+                "p_CONFIRMED": period / 100}
+    return predict
+
+
+def _collect(agen) -> bytes:
+    async def main():
+        return b"".join([chunk async for chunk in agen])
+    return asyncio.run(main())
+
+
+def test_iter_lines_across_chunk_boundaries():
+    async def main():
+        return [line async for line in iter_lines(_chunks(b"a,b\r\n\n12,3\n45,6", 3))]
+    assert asyncio.run(main()) == [b"a,b", b"12,3", b"45,6"]
+
+
+def test_ndjson_in_chunks_with_invalid_line():
+    body = b"".join(json.dumps({"id": f"o{i}", "period": i, "mission": "TESS"}).encode() + b"\n"
+                    for i in range(25))
+    body = body.replace(b'{"id": "o7"', b'oops{"id": "o7"', 1)
+    calls = []
+    out = _collect(stream_predictions(_chunks(body, 64), _predict(calls), COLUMNS, chunk_rows=10, keep=["id"]))
+    rows = [json.loads(line) for line in out.splitlines()]
+    assert [r["row"] for r in rows] == list(range(25))
+    assert calls == [9, 10, 5]
+    assert "error" in rows[7] and "pred_label" not in rows[7]
+    assert rows[20] == {"row": 20, "id": "o20", "pred_label": "CONFIRMED", "p_FALSE_POSITIVE": 0.0,
+                        "p_CANDIDATE": 0.0, "p_CONFIRMED": 0.2}
+
+
+def test_csv_in_csv_out():
+    body = b"mission,period,depth,extra\n" + b"".join(f"KEPLER,{i},100,x\n".encode() for i in range(30))
+    calls = []
+    out = _collect(stream_predictions(_chunks(body, 50), _predict(calls), COLUMNS, in_format="csv",
+                                      out_format="csv", chunk_rows=12))
+    df = pd.read_csv(io.BytesIO(out))
+    assert list(df.columns) == ["row", "pred_label", "p_FALSE_POSITIVE", "p_CANDIDATE", "p_CONFIRMED", "error"]
+    assert len(df) == 30 and calls == [12, 12, 6]
+    np.testing.assert_allclose(df["p_CONFIRMED"], np.arange(30) / 100)
+    assert df["error"].isna().all()
+
+
+def test_overlong_line_stops_stream():
+    body = b'{"period": 1}\n' + b"x" * 5000
+    out = _collect(stream_predictions(_chunks(body, 100), _predict([]), COLUMNS, max_line_bytes=1000))
+    rows = [json.loads(line) for line in out.splitlines()]
+    assert rows[0]["pred_label"] == "CANDIDATE"
+    assert "longer than" in rows[-1]["error"]
+
+
+def test_rows_failing_input_checks_are_reported_not_scored():
+    from api import INPUT_COLUMNS, input_row_errors
+    rows = [{"id": "ok", "mission": "TESS", "period": 12, "duration": 2.5, "depth": 300},
+            {"id": "minutes", "mission": "TESS", "period": 12, "duration": 0.02},
+            {"id": "mission", "mission": "CHEOPS", "period": 12},
+            {"id": "both", "mission": "kepler", "period": 12, "duration": -1, "depth": 0.001},
+            {"id": "missing", "period": 12, "duration": "n/a"}]
+    body = b"".join(json.dumps(r).encode() + b"\n" for r in rows)
+    calls = []
+    out = _collect(stream_predictions(_chunks(body, 40), _predict(calls), INPUT_COLUMNS, keep=["id"],
+                                      validate_fn=input_row_errors))
+    rows = [json.loads(line) for line in out.splitlines()]
+    assert calls == [2] and [r["id"] for r in rows] == ["ok", "minutes", "mission", "both", "missing"]
+    assert [("pred_label" in r, "error" in r) for r in rows] == [(True, False), (False, True), (False, True),
+                                                                 (False, True), (True, False)]
+    assert rows[1]["error"] == "`duration` attend des heures (si minutes, divise par 60)."
+    assert "`mission`" in rows[3]["error"] and "`duration`" in rows[3]["error"] and "`depth`" in rows[3]["error"]
+
+
+def test_spool_is_recycled_when_reader_keeps_up(monkeypatch):
+    import tempfile
+    peaks = []
+
+    class Recorder(tempfile.SpooledTemporaryFile):
+        def write(self, data):
+            n = super().write(data)
+            peaks.append(self.tell())
+            return n
+
+    monkeypatch.setattr("serving.streaming.tempfile.SpooledTemporaryFile", Recorder)
+
+    async def producer():
+        for i in range(200):
+            yield b"x" * 1000
+            await asyncio.sleep(0)
+
+    data = _collect(spool(producer(), max_memory=16))
+    assert len(data) == 200_000 and max(peaks) <= 2000  # le disque ne garde que le retard du lecteur
+
+
+def test_spool_keeps_producing_while_reader_waits():
+    produced = []
+
+    async def producer():
+        for i in range(50):
+            produced.append(i)
+            yield b"%d\n" % i
+            await asyncio.sleep(0)
+
+    async def main():
+        it = spool(producer(), max_memory=16)
+        first = await it.__anext__()
+        await asyncio.sleep(0.05)  # lecteur bloqué : le producteur avance quand même
+        ahead = len(produced)
+        rest = b"".join([c async for c in it])
+        return first + rest, ahead
+
+    data, ahead = asyncio.run(main())
+    assert ahead == 50
+    assert data == b"".join(b"%d\n" % i for i in range(50))
+
+
+def test_detect_format():
+    assert detect_format("text/csv; charset=utf-8") == "csv"
+    assert detect_format("application/x-ndjson") == "ndjson"
+    assert detect_format(None) == "ndjson"
@@ -0,0 +1,57 @@
+# test_synthetic.py
+# Catalogues synthétiques (classifiers.synthetic) : mêmes colonnes que fetch_koi / fetch_k2 /
+# fetch_toi (archive remplacée par une table vide aux colonnes du select), déterministes par graine.
+#
+# Usage (depuis ai_agents/) :
+#   python -m pytest tests/test_synthetic.py -q
+
+import sys
+import types
+
+import pandas as pd
+import pytest
+
+from classifiers import exoplanet_classifier
+from classifiers.synthetic import SYNTHETIC_FETCHERS, synthetic_catalogs
+
+FETCHERS = {"koi": exoplanet_classifier.fetch_koi, "k2": exoplanet_classifier.fetch_k2,
+            "toi": exoplanet_classifier.fetch_toi}
+
+
+class _EmptyTable:
+    def __init__(self, columns):
+        self.columns = columns
+
+    def to_pandas(self):
+        return pd.DataFrame({c: pd.Series(dtype=float) for c in self.columns})
+
+
+class _Archive:
+    @staticmethod
+    def query_criteria(table, select, cache=True):
+        return _EmptyTable([c.strip() for c in select.split(",")])
+
+
+@pytest.fixture
+def offline_archive(monkeypatch):
+    module = types.ModuleType("astroquery.nasa_exoplanet_archive")
+    module.NasaExoplanetArchive = _Archive
+    monkeypatch.setitem(sys.modules, "astroquery", types.ModuleType("astroquery"))
+    monkeypatch.setitem(sys.modules, "astroquery.nasa_exoplanet_archive", module)
+
+
+@pytest.mark.parametrize("catalog", ["koi", "k2", "toi"])
+def test_columns_match_fetch(offline_archive, catalog):
+    fetched = FETCHERS[catalog]()
+    synthetic = SYNTHETIC_FETCHERS[catalog](50)
+    assert sorted(synthetic.columns) == sorted(fetched.columns)
+
+
+def test_same_seed_same_catalogs():
+    a, b = synthetic_catalogs(500, seed=4), synthetic_catalogs(500, seed=4)
+    other = synthetic_catalogs(500, seed=5)
+    assert set(a) == {"koi", "k2", "toi"}
+    for name in a:
+        pd.testing.assert_frame_equal(a[name], b[name])
+        assert not a[name].equals(other[name]), name
+    assert sum(len(df) for df in a.values()) == 500